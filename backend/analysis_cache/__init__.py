@@ -0,0 +1,2 @@
+from .analysis_cache import AnalysisCache, CACHE_STAGES, STAGE_INPUTS, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, code_digest
+"""Content-addressed cache of analysis stage results."""
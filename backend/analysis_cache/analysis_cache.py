@@ -0,0 +1,171 @@
+"""Content-addressed, size-bounded cache of per-stage analysis results."""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+
+# Analysis stages in run order, and the stages each one's output is derived from.
+# Tracks in keyframe mode also derive from camera motion (see stage_keys).
+CACHE_STAGES = ("detections", "tracks", "positions", "camera", "transform", "speed", "teams",
+                "possession", "feedback", "render")
+STAGE_INPUTS = {
+    "detections": (),
+    "tracks": ("detections",),
+    "positions": ("tracks",),
+    "camera": (),
+    "transform": ("positions", "camera"),
+    "speed": ("transform",),
+    "teams": ("tracks",),
+    "possession": ("tracks", "teams"),
+    "feedback": ("speed", "teams", "possession"),
+    "render": ("speed", "teams", "possession", "camera"),
+}
+DEFAULT_CACHE_DIR = "stubs/cache"
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+# Source files (or packages) whose code produces each stage; editing them changes the
+# stage's code version and so its keys.
+STAGE_SOURCES = {
+    "detections": ("trackers/inference.py",),
+    "tracks": ("trackers",),
+    "positions": ("trackers/tracker.py", "utils/bbox_utils.py"),
+    "camera": ("camera_movement_estimator",),
+    "transform": ("pipeline/geometry.py", "view_transformer", "utils/bbox_utils.py"),
+    "speed": ("speed_and_distance_estimator",),
+    "teams": ("team_assigner",),
+    "possession": ("player_ball_assigner",),
+    "feedback": ("player_feedback.py",),
+    "render": ("trackers/tracker.py", "camera_movement_estimator/camera_movement_estimator.py",
+               "speed_and_distance_estimator", "pipeline/streaming.py", "utils/video_utils.py"),
+}
+
+def code_digest(*sources):
+    # SHA-256 over the .py files of the given backend-relative files and packages.
+    digest = hashlib.sha256()
+    for source in sources:
+        path = BACKEND_DIR / source
+        for file_path in sorted(path.glob("*.py")) if path.is_dir() else [path]:
+            digest.update(str(file_path.relative_to(BACKEND_DIR)).encode())
+            digest.update(file_path.read_bytes())
+    return digest.hexdigest()
+
+class AnalysisCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        # Entries are pickles named <stage>-<key>.pkl under cache_dir. A key hashes the
+        # video content, the stage's parameters (model weights digest, thresholds,
+        # methods), its code version and the keys of the stages it is derived from
+        # (STAGE_INPUTS), so renamed uploads still hit and a change to one stage
+        # misses only that stage and the ones after it. Reads refresh an
+        # entry's mtime and writes evict least recently used entries until the
+        # directory holds at most max_bytes.
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        # (path, size, mtime) -> content digest, so a file is hashed once per change.
+        self._file_digests = {}
+        self._code_digests = {}
+        self._lock = threading.Lock()
+
+    def file_digest(self, path):
+        # SHA-256 of a file's content, read in 1 MiB blocks.
+        stat = os.stat(path)
+        signature = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._file_digests.get(signature)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+            digest = self._file_digests[signature] = hasher.hexdigest()
+        return digest
+
+    def key(self, stage, video_digest, params=None, parent=None):
+        # Key of one stage's result for a video, its parameters and upstream key(s).
+        if stage not in self._code_digests:
+            self._code_digests[stage] = code_digest(*STAGE_SOURCES.get(stage, ()))
+        description = {"stage": stage, "video": video_digest, "params": params or {},
+                       "code": self._code_digests[stage], "parent": parent}
+        return hashlib.sha256(json.dumps(description, sort_keys=True, default=str).encode()).hexdigest()
+
+    def stage_key(self, stage, keys, params=None):
+        # Key of a stage from the keys of its STAGE_INPUTS (keys["video"] is the video
+        # digest), so changing any upstream parameter changes every key after it.
+        return self.key(stage, keys["video"], params, [keys[name] for name in STAGE_INPUTS[stage]])
+
+    def stage_keys(self, video_path, tracker, keyframes=None, stage_params=None, video_digest=None):
+        # Keys of the analysis stages up to possession. stage_params maps a stage to
+        # its parameters; detector and tracker parameters come from the tracker.
+        # Feedback and render keys are derived later with stage_key, once their
+        # parameters are known. video_digest, when given, is used instead of hashing
+        # video_path.
+        stage_params = stage_params or {}
+        keys = {"video": video_digest or self.file_digest(video_path)}
+        detector_params = dict(tracker.engine.cache_params(), weights=self.file_digest(tracker.engine.model_path))
+        keys["detections"] = self.stage_key("detections", keys, detector_params)
+        keys["camera"] = self.stage_key("camera", keys, stage_params.get("camera"))
+        tracks_params = {"tracker": tracker.cache_params(),
+                         "keyframes": keyframes.cache_params() if keyframes is not None else None}
+        tracks_parent = [keys["detections"], keys["camera"]] if keyframes is not None else [keys["detections"]]
+        keys["tracks"] = self.key("tracks", keys["video"], tracks_params, tracks_parent)
+        for stage in ("positions", "transform", "speed", "teams", "possession"):
+            keys[stage] = self.stage_key(stage, keys, stage_params.get(stage))
+        return keys
+
+    def _path(self, key, stage):
+        return self.cache_dir / f"{stage}-{key}.pkl"
+
+    def get(self, key, stage):
+        # Cached value, or None on a miss (including an entry evicted meanwhile).
+        path = self._path(key, stage)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key, stage, value):
+        # Write atomically (temp file + rename) so readers never see a partial entry.
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key, stage))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        # Remove least recently used entries until the cache fits in max_bytes.
+        with self._lock:
+            entries = []
+            for path in self.cache_dir.glob("*.pkl"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def size_bytes(self):
+        return sum(path.stat().st_size for path in self.cache_dir.glob("*.pkl"))
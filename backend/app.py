@@ -1,25 +1,34 @@
 """Flask web app for football video analysis with async processing."""
 
+import math
 import os
-import subprocess
-import uuid
+import queue
 import threading
-from datetime import datetime, timezone
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from flask import Flask, request, send_file, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 
-from utils import read_video, save_video
-from trackers import Tracker
-from team_assigner import TeamAssigner
-from player_ball_assigner import PlayerBallAssigner
-from camera_movement_estimator import CameraMovementEstimator
-from view_transformer import ViewTransformer
+from werkzeug.security import safe_join
+from utils import get_video_fps, get_video_frame_count, HLS_MASTER_PLAYLIST
+from trackers import KeyframeDetector, ModelPool
+from pipeline import StreamingPipeline, DEFAULT_CHUNK_SIZE
 from speed_and_distance_estimator import SpeedAndDistance_Estimator
-from player_feedback import generate_player_feedback
-import numpy as np
-import cv2
+from player_ball_assigner import PlayerBallAssigner
+from camera_movement_estimator import SegmentedCameraMovement
+from analysis_cache import AnalysisCache, DEFAULT_MAX_BYTES
+from player_feedback import generate_player_feedback, save_player_feedback
+from track_table import save_track_file, load_track_file, TRACK_FILE_SUFFIX
+from job_queue import JobStore, JobScheduler, in_job_process
+from media_server import send_media, DEFAULT_MAX_AGE as MEDIA_DEFAULT_MAX_AGE
+from artifact_store import (ArtifactStore, send_cached, write_section, write_tracks, artifacts_dir,
+                            ARTIFACT_SECTIONS, DEFAULT_CACHE_BYTES as ARTIFACT_DEFAULT_CACHE_BYTES)
+from resumable_upload import (write_chunk, file_checksum, parse_checksum, decodable_prefix, iter_growing_video_frames,
+                              ChecksumMismatch, DEFAULT_CHUNK_SIZE as UPLOAD_DEFAULT_CHUNK_SIZE)
 import json
+import numpy as np
 
 app = Flask(__name__)
 CORS(app)
@@ -36,54 +45,136 @@ app.config["MAX_CONTENT_LENGTH"] = 500 * 1024 * 1024  # 500 MB
 
 ALLOWED_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
 
-# In-memory job status tracker: { videoId: { status, progress, currentStep, error } }
-jobs = {}
+# Seconds browsers may reuse cached byte ranges of a rendered video before revalidating.
+MEDIA_MAX_AGE = int(os.getenv("MEDIA_MAX_AGE", str(MEDIA_DEFAULT_MAX_AGE)))
+
+# UI artifact sections (and track windows) kept encoded in memory by the API process.
+ARTIFACT_CACHE_MB = int(os.getenv("ARTIFACT_CACHE_MB", str(ARTIFACT_DEFAULT_CACHE_BYTES // (1024 * 1024))))
+artifact_store = ArtifactStore(OUTPUT_FOLDER, max_bytes=ARTIFACT_CACHE_MB * 1024 * 1024)
+
+# Adaptive streaming: HLS_RENDITIONS="1080:5000,720:2800,360:800" (height:kbit/s) also
+# renders each video as HLS in those renditions (taller than the source are skipped),
+# segment by segment while the MP4 is rendered; empty disables it.
+HLS_RENDITIONS = [tuple(int(value) for value in rendition.split(":"))
+                  for rendition in os.getenv("HLS_RENDITIONS", "").split(",") if rendition.strip()]
+
+# Chunked resumable uploads (/api/uploads): largest video accepted, chunk size
+# suggested to clients, and how long a job reading an upload still in progress waits
+# for more bytes before failing.
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "4096"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(UPLOAD_DEFAULT_CHUNK_SIZE)))
+UPLOAD_STALL_TIMEOUT = float(os.getenv("UPLOAD_STALL_TIMEOUT", "300"))
+# One writer per upload at a time (chunks of different uploads are written in parallel).
+_upload_locks = {}
+_upload_locks_guard = threading.Lock()
+
+# Frames decoded and held in memory at once; peak memory scales with this, not video length.
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
+# Run decode/detect/track/camera/annotate/encode in overlapping worker threads.
+PIPELINE_THREADED = os.getenv("PIPELINE_THREADED", "1") != "0"
+
+# Detector runtime for GPU-less workers: DETECTOR_BACKEND=onnx|openvino, a smaller
+# DETECTOR_IMGSZ and DETECTOR_BATCH_SIZE=auto all raise CPU throughput.
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "torch")
+DETECTOR_IMGSZ = int(os.getenv("DETECTOR_IMGSZ", "0")) or None
+DETECTOR_BATCH_SIZE = os.getenv("DETECTOR_BATCH_SIZE", "20")
+DETECTOR_HALF = os.getenv("DETECTOR_HALF", "0") == "1"
+# Keyframe mode: detect every N frames (plus fast pans) and interpolate boxes between.
+KEYFRAME_INTERVAL = int(os.getenv("KEYFRAME_INTERVAL", "1"))
+KEYFRAME_CAMERA_THRESHOLD = float(os.getenv("KEYFRAME_CAMERA_THRESHOLD", "0")) or None
+KEYFRAME_SPEED_THRESHOLD = float(os.getenv("KEYFRAME_SPEED_THRESHOLD", "0")) or None
+# Player speed: SPEED_SMOOTHING=window|savgol|kalman, always at the source video's FPS.
+SPEED_SMOOTHING = os.getenv("SPEED_SMOOTHING", "window")
+SPEED_WINDOW = int(os.getenv("SPEED_WINDOW", "5"))
+SPEED_SMOOTHING_WINDOW = int(os.getenv("SPEED_SMOOTHING_WINDOW", "11"))
+# Jersey color method for team assignment: kmeans, histogram or median.
+TEAM_COLOR_METHOD = os.getenv("TEAM_COLOR_METHOD", "kmeans")
+# Camera motion estimator: max (original), median, affine or homography.
+CAMERA_METHOD = os.getenv("CAMERA_METHOD", "max")
+# Processes estimating camera motion over video segments alongside detection (1 = serial).
+CAMERA_WORKERS = int(os.getenv("CAMERA_WORKERS", "1"))
+# Possession hysteresis: frames a new possessor must hold the ball, and frames the
+# ball may be loose before the current possessor loses it (1 and 0 disable it).
+POSSESSION_MIN_FRAMES = int(os.getenv("POSSESSION_MIN_FRAMES", "1"))
+POSSESSION_RELEASE_FRAMES = int(os.getenv("POSSESSION_RELEASE_FRAMES", "0"))
+# Detections, tracks, camera motion and teams are cached by video content and
+# settings, so re-analyzing an identical upload skips inference (0 MB disables it).
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", str(BASE_DIR / "stubs" / "cache"))
+ANALYSIS_CACHE_MAX_MB = int(os.getenv("ANALYSIS_CACHE_MAX_MB", str(DEFAULT_MAX_BYTES // (1024 * 1024))))
+analysis_cache = (AnalysisCache(ANALYSIS_CACHE_DIR, max_bytes=ANALYSIS_CACHE_MAX_MB * 1024 * 1024)
+                  if ANALYSIS_CACHE_MAX_MB > 0 else None)
+
+# Job status by video id ({ status, progress, currentStep, error, ... }), persisted in
+# SQLite so it survives restarts. JOB_WORKERS analyses run at once (each loads its own
+# detector); at most JOB_MAX_QUEUED more wait, beyond that /api/process answers 429.
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", str(BASE_DIR / "jobs.sqlite3"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "8"))
+# JOB_EXECUTOR=process (default) runs each job in one of JOB_WORKERS worker processes,
+# so analysis never holds the GIL of the process serving the API; thread runs jobs in
+# this process.
+JOB_EXECUTOR = os.getenv("JOB_EXECUTOR", "process")
+jobs = JobStore(JOB_DB_PATH)
+# Detector replicas loaded (and warmed up with one inference) once per process and
+# shared by all its jobs: one per concurrent job in thread mode, one per job process.
+MODEL_REPLICAS = int(os.getenv("MODEL_REPLICAS", str(JOB_WORKERS if JOB_EXECUTOR == "thread" else 1)))
+# Jobs publish progress at most every PROGRESS_EVENT_INTERVAL seconds to
+# /api/events/<video_id> (server-sent events), which polls the job store every
+# EVENT_POLL_INTERVAL seconds and sends a keep-alive comment every EVENT_KEEPALIVE.
+PROGRESS_EVENT_INTERVAL = float(os.getenv("PROGRESS_EVENT_INTERVAL", "0.5"))
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.25"))
+EVENT_KEEPALIVE = float(os.getenv("EVENT_KEEPALIVE", "15"))
+model_pool = ModelPool(
+    MODEL_PATH,
+    replicas=MODEL_REPLICAS,
+    backend=DETECTOR_BACKEND,
+    imgsz=DETECTOR_IMGSZ,
+    batch_size=DETECTOR_BATCH_SIZE if DETECTOR_BATCH_SIZE == "auto" else int(DETECTOR_BATCH_SIZE),
+    half=DETECTOR_HALF,
+)
 
 
 def allowed_file(filename):
     return Path(filename).suffix.lower() in ALLOWED_EXTENSIONS
 
 
-def _build_tracks_for_ui(tracks, frame_shape, fps, sample_step=5):
+def _build_tracks_for_ui(table, frame_shape, fps, sample_step=5):
+    # Box centers on every sample_step-th frame, normalized to the frame size: one
+    # track per player (in order of first appearance), then the ball.
     height, width = frame_shape[:2]
     if width <= 0 or height <= 0:
         return []
 
-    def clamp01(value):
-        return max(0.0, min(1.0, value))
-
-    def add_tracks(track_frames, cls_name, id_prefix=None, fixed_id=None):
-        output = {}
-        for frame_idx, frame_tracks in enumerate(track_frames):
-            if sample_step > 1 and frame_idx % sample_step != 0:
-                continue
-            timestamp = round(frame_idx / fps, 2)
-            for track_id, track_info in frame_tracks.items():
-                bbox = track_info.get("bbox")
-                if not bbox or len(bbox) < 4:
-                    continue
-                x1, y1, x2, y2 = bbox
-                cx = clamp01(((x1 + x2) / 2) / width)
-                cy = clamp01(((y1 + y2) / 2) / height)
-                ui_id = fixed_id or f"{id_prefix}{track_id}"
-                if ui_id not in output:
-                    output[ui_id] = {
-                        "id": ui_id,
-                        "class": cls_name,
-                        "positions": [],
-                    }
-                output[ui_id]["positions"].append(
-                    {
-                        "timestamp": timestamp,
-                        "x": round(cx, 4),
-                        "y": round(cy, 4),
-                        "confidence": 1.0,
-                    }
-                )
-        return list(output.values())
-
-    players = add_tracks(tracks.get("players", []), "person", id_prefix="p_")
-    ball = add_tracks(tracks.get("ball", []), "sports_ball", fixed_id="ball")
+    columns = table.columns
+
+    def add_tracks(object_name, cls_name, id_prefix=None, fixed_id=None):
+        rows = table.object_rows(object_name)
+        frames = columns["frame"][rows]
+        bboxes = columns["bbox"][rows].astype(np.float64)
+        keep = np.flatnonzero((frames % sample_step == 0) & ~np.isnan(bboxes).any(axis=1))
+        frames, bboxes, track_ids = frames[keep], bboxes[keep], columns["track_id"][rows][keep]
+        xs = np.clip((bboxes[:, 0] + bboxes[:, 2]) / 2 / width, 0.0, 1.0).tolist()
+        ys = np.clip((bboxes[:, 1] + bboxes[:, 3]) / 2 / height, 0.0, 1.0).tolist()
+        timestamps = (frames / fps).tolist()
+
+        # Rows are in frame order, so a stable sort groups them per track in time order.
+        if fixed_id is not None:
+            groups = [(fixed_id, np.arange(len(keep)))]
+        else:
+            ids, first, track_index = np.unique(track_ids, return_index=True, return_inverse=True)
+            order = np.argsort(track_index, kind="stable")
+            bounds = np.r_[0, np.cumsum(np.bincount(track_index, minlength=len(ids)))]
+            groups = [(f"{id_prefix}{ids[i]}", order[bounds[i]:bounds[i + 1]]) for i in np.argsort(first).tolist()]
+
+        return [{
+            "id": ui_id,
+            "class": cls_name,
+            "positions": [{"timestamp": round(timestamps[i], 2), "x": round(xs[i], 4), "y": round(ys[i], 4),
+                           "confidence": 1.0} for i in group.tolist()],
+        } for ui_id, group in groups if len(group)]
+
+    players = add_tracks("players", "person", id_prefix="p_")
+    ball = add_tracks("ball", "sports_ball", fixed_id="ball")
     return players + ball
 
 
@@ -177,31 +268,32 @@ def _build_insights_from_feedback(feedback):
     return insights
 
 
-def _build_events_and_risk(tracks, fps, frame_shape, team_ball_control):
+def _build_events_and_risk(table, fps, frame_shape, team_ball_control):
     height, width = frame_shape[:2]
     if width <= 0 or height <= 0 or fps <= 0:
         return [], {"riskScores": [], "topRiskMoments": []}
 
+    columns = table.columns
+
     def clamp01(value):
         return max(0.0, min(1.0, value))
 
     def ball_position(frame_idx):
-        ball_frame = tracks.get("ball", [])[frame_idx]
-        if 1 not in ball_frame:
+        rows = table.frame_rows("ball", frame_idx)
+        balls = np.flatnonzero(columns["track_id"][rows] == 1)
+        if len(balls) == 0:
             return None
-        bbox = ball_frame[1].get("bbox")
-        if not bbox:
+        x1, y1, x2, y2 = columns["bbox"][rows.start + balls[0]].tolist()
+        if x1 != x1:
             return None
-        x1, y1, x2, y2 = bbox
         return (clamp01(((x1 + x2) / 2) / width), clamp01(((y1 + y2) / 2) / height))
 
     def player_positions(frame_idx, team=None):
         positions = []
-        for pid, pdata in tracks.get("players", [])[frame_idx].items():
-            if team is not None and pdata.get("team") != team:
-                continue
-            bbox = pdata.get("bbox")
-            if not bbox:
+        rows = table.frame_rows("players", frame_idx)
+        for pid, pteam, bbox in zip(columns["track_id"][rows].tolist(), columns["team"][rows].tolist(),
+                                    columns["bbox"][rows].tolist()):
+            if team is not None and pteam != team:
                 continue
             x1, y1, x2, y2 = bbox
             positions.append({
@@ -228,7 +320,7 @@ def _build_events_and_risk(tracks, fps, frame_shape, team_ball_control):
 
     # Build per-second risk signal
     step = max(int(fps), 1)
-    for frame_idx in range(0, len(tracks.get("players", [])), step):
+    for frame_idx in range(0, table.num_frames, step):
         t = round(frame_idx / fps, 2)
         ball_pos = ball_position(frame_idx)
         risk = 0.15
@@ -253,7 +345,7 @@ def _build_events_and_risk(tracks, fps, frame_shape, team_ball_control):
         risk_scores.append({"timestamp": t, "score": round(risk, 2), "factors": factors})
 
     # Events based on actual movement + possession
-    for frame_idx in range(0, len(tracks.get("players", [])), 3):
+    for frame_idx in range(0, table.num_frames, 3):
         t = round(frame_idx / fps, 2)
         ball_pos = ball_position(frame_idx)
         team_in_control = team_ball_control[frame_idx] if frame_idx < len(team_ball_control) else 0
@@ -328,132 +420,170 @@ def _build_events_and_risk(tracks, fps, frame_shape, team_ball_control):
     return events, {"riskScores": risk_scores, "topRiskMoments": top_moments}
 
 
+def init_job_process():
+    """Load the detector once in each job process, before its first job."""
+    model_pool.warm()
+
+
+def run_job(video_id):
+    """Run a queued job on a scheduler worker (thread or job process)."""
+    run_pipeline(video_id, jobs[video_id]["input_path"], str(OUTPUT_FOLDER / f"{video_id}_analyzed.mp4"))
+
+
 def run_pipeline(video_id, input_path, output_path):
-    """Run the full analysis pipeline in a background thread."""
+    """Run the full analysis pipeline on a job worker."""
     try:
         # --- Detecting ---
         jobs[video_id]["status"] = "detecting"
         jobs[video_id]["progress"] = 10
         jobs[video_id]["currentStep"] = "Reading video and detecting objects"
 
-        video_frames = read_video(input_path)
-        if len(video_frames) == 0:
-            raise ValueError(f"No frames read from video: {input_path}")
-
-        tracker = Tracker(str(MODEL_PATH))
-        tracks = tracker.get_object_tracks(video_frames, read_from_stub=False, stub_path=None)
-        tracker.add_position_to_tracks(tracks)
-
-        jobs[video_id]["progress"] = 30
-
-        # --- Tracking ---
-        jobs[video_id]["status"] = "tracking"
-        jobs[video_id]["currentStep"] = "Tracking camera and player movement"
-
-        camera_movement_estimator = CameraMovementEstimator(video_frames[0])
-        camera_movement_per_frame = camera_movement_estimator.get_camera_movement(
-            video_frames, read_from_stub=False, stub_path=None
-        )
-        camera_movement_estimator.add_adjust_positions_to_tracks(tracks, camera_movement_per_frame)
-
-        view_transformer = ViewTransformer()
-        view_transformer.add_transformed_position_to_tracks(tracks)
-
-        tracks["ball"] = tracker.interpolate_ball_positions(tracks["ball"])
-
-        jobs[video_id]["progress"] = 50
-
-        # --- Analyzing ---
-        jobs[video_id]["status"] = "analyzing"
-        jobs[video_id]["currentStep"] = "Analyzing speed, teams, and possession"
-
-        speed_and_distance_estimator = SpeedAndDistance_Estimator()
-        speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
-
-        team_assigner = TeamAssigner()
-        first_players_frame = next(
-            (i for i, players in enumerate(tracks["players"]) if len(players) > 0), None
-        )
-        if first_players_frame is not None:
-            team_assigner.assign_team_color(
-                video_frames[first_players_frame], tracks["players"][first_players_frame]
+        fps = get_video_fps(input_path)
+        total_frames = get_video_frame_count(input_path)
+
+        # A job queued while its upload is still arriving decodes frames as their bytes
+        # arrive, and keys the analysis cache by the SHA-256 declared for the upload
+        # (the upload is verified against it before the last frames are read).
+        upload = jobs[video_id].get("upload")
+        frame_source = video_digest = None
+        if upload is not None and not upload["complete"]:
+            frame_source = lambda path: iter_growing_video_frames(
+                path, lambda: upload_progress(video_id), stall_timeout=UPLOAD_STALL_TIMEOUT)
+            video_digest = upload["sha256"]
+
+        def scaled_progress(start, end, phase):
+            # Map frames processed in a streaming pass onto a slice of the progress bar,
+            # and publish frame counts, throughput and ETA to event stream clients.
+            phase_start = time.perf_counter()
+            last_event = [0.0]
+
+            def on_progress(frames_done):
+                if total_frames > 0:
+                    fraction = min(frames_done / total_frames, 1.0)
+                    jobs[video_id]["progress"] = int(start + (end - start) * fraction)
+                now = time.perf_counter()
+                if now - last_event[0] < PROGRESS_EVENT_INTERVAL and frames_done < total_frames:
+                    return
+                last_event[0] = now
+                elapsed = now - phase_start
+                frame_rate = frames_done / elapsed if elapsed > 0 else 0.0
+                jobs.publish(video_id, "progress", {
+                    "phase": phase,
+                    "frames": frames_done,
+                    "totalFrames": total_frames,
+                    "progress": int(start + (end - start) * min(frames_done / total_frames, 1.0))
+                    if total_frames > 0 else start,
+                    "fps": round(frame_rate, 2),
+                    "etaSeconds": round((total_frames - frames_done) / frame_rate, 1)
+                    if frame_rate > 0 and total_frames > frames_done else 0.0,
+                })
+            return on_progress
+
+        # Frames are decoded in chunks of STREAM_CHUNK_SIZE and never held all at once.
+        # The detector comes from the process-wide pool of warm replicas; only the
+        # job's Tracker (ByteTrack state) is new. The replica returns to the pool once
+        # detection is done, before feedback and rendering.
+        with model_pool.tracker() as tracker:
+            keyframes = None
+            if KEYFRAME_INTERVAL > 1:
+                keyframes = KeyframeDetector(
+                    tracker,
+                    interval=KEYFRAME_INTERVAL,
+                    camera_motion_threshold=KEYFRAME_CAMERA_THRESHOLD,
+                    track_speed_threshold=KEYFRAME_SPEED_THRESHOLD,
+                )
+            speed_estimator = SpeedAndDistance_Estimator(
+                frame_window=SPEED_WINDOW,
+                smoothing=SPEED_SMOOTHING,
+                smoothing_window=SPEED_SMOOTHING_WINDOW,
             )
-            for frame_num, player_track in enumerate(tracks["players"]):
-                for player_id, track in player_track.items():
-                    team = team_assigner.get_player_team(
-                        video_frames[frame_num], track["bbox"], player_id
-                    )
-                    tracks["players"][frame_num][player_id]["team"] = team
-                    tracks["players"][frame_num][player_id]["team_color"] = (
-                        team_assigner.team_colors[team]
-                    )
-
-        jobs[video_id]["progress"] = 70
-
-        player_assigner = PlayerBallAssigner()
-        team_ball_control = []
-        for frame_num, player_track in enumerate(tracks["players"]):
-            if 1 not in tracks["ball"][frame_num]:
-                assigned_player = -1
-            else:
-                ball_bbox = tracks["ball"][frame_num][1]["bbox"]
-                assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
-
-            if assigned_player != -1:
-                tracks["players"][frame_num][assigned_player]["has_ball"] = True
-                team_ball_control.append(tracks["players"][frame_num][assigned_player]["team"])
-            else:
-                team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
-        team_ball_control = np.array(team_ball_control)
+            pipeline = StreamingPipeline(
+                tracker, chunk_size=STREAM_CHUNK_SIZE, threaded=PIPELINE_THREADED, keyframes=keyframes,
+                speed_and_distance_estimator=speed_estimator, team_color_method=TEAM_COLOR_METHOD,
+                player_ball_assigner=PlayerBallAssigner(min_possession_frames=POSSESSION_MIN_FRAMES,
+                                                        release_frames=POSSESSION_RELEASE_FRAMES),
+                camera_method=CAMERA_METHOD,
+                camera_segments=SegmentedCameraMovement(CAMERA_METHOD, workers=CAMERA_WORKERS)
+                if CAMERA_WORKERS > 1 and frame_source is None else None,
+                cache=analysis_cache,
+                frame_source=frame_source,
+            )
+            pipeline.analyze(input_path, on_progress=scaled_progress(10, 70, "analyze"), video_digest=video_digest)
+        team_ball_control = pipeline.team_ball_control
+        jobs.publish(video_id, "stages", {"pass": "analyze", "report": pipeline.stage_reports.get("analyze"),
+                                          "cache": pipeline.stages.report})
+
+        # Full-resolution tracks and metrics as a memory-mappable binary file. Feedback,
+        # events and UI tracks read the mapped table, touching only the columns they use.
+        frame_shape = pipeline.frame_shape or (0, 0, 0)
+        track_path = OUTPUT_FOLDER / f"{video_id}{TRACK_FILE_SUFFIX}"
+        save_track_file(track_path, pipeline.table,
+                        arrays={"team_ball_control": np.asarray(team_ball_control, dtype=np.int8)},
+                        metadata={"id": video_id, "fps": fps, "frame_shape": list(frame_shape)})
+        table, _, _ = load_track_file(track_path)
 
         # --- Player Feedback ---
+        jobs[video_id]["status"] = "analyzing"
         jobs[video_id]["progress"] = 82
         jobs[video_id]["currentStep"] = "Generating player feedback"
 
-        cap = cv2.VideoCapture(input_path)
-        fps = cap.get(cv2.CAP_PROP_FPS) or 24.0
-        cap.release()
-
-        feedback = generate_player_feedback(
-            tracks, fps, video_id,
-            output_folder=str(OUTPUT_FOLDER),
+        # Feedback (including the LLM rewrite) is cached with the analysis stages, so
+        # re-uploading an analyzed video does not call the LLM again.
+        llm_model = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
+        feedback = pipeline.run_stage("feedback", lambda: generate_player_feedback(
+            table, fps, video_id,
+            output_folder=None,
             min_presence_sec=10.0,
             use_llm=True,
-            llm_model=os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini"),
+            llm_model=llm_model,
             llm_timeout=30,
-        )
+        ), params={"fps": fps, "min_presence_sec": 10.0, "llm": bool(os.getenv("OPENROUTER_API_KEY")),
+                   "llm_model": llm_model})
+        save_player_feedback(feedback, video_id, str(OUTPUT_FOLDER))
+
+        # Events, predictions, metrics and insights need only the tracks and feedback,
+        # so they are built, written and streamed to clients before the video is rendered.
+        sections_dir = artifacts_dir(OUTPUT_FOLDER, video_id)
+        try:
+            events, predictions = _build_events_and_risk(
+                table, fps, frame_shape, team_ball_control
+            )
+            artifacts = {
+                "events": events,
+                "metrics": _build_metrics_from_feedback(feedback),
+                "predictions": predictions,
+                "insights": _build_insights_from_feedback(feedback),
+            }
+            for name, value in artifacts.items():
+                write_section(sections_dir, name, value)
+                jobs.publish(video_id, "artifact", {"name": name, "value": value})
+        except Exception as e:
+            print(f"Artifacts error: {e}")
 
         jobs[video_id]["progress"] = 85
         jobs[video_id]["currentStep"] = "Rendering annotated video"
 
-        output_video_frames = tracker.draw_annotations(video_frames, tracks, team_ball_control)
-        output_video_frames = camera_movement_estimator.draw_camera_movement(
-            output_video_frames, camera_movement_per_frame
-        )
-        speed_and_distance_estimator.draw_speed_and_distance(output_video_frames, tracks)
-
-        # Save as AVI first then convert to browser-playable MP4
-        avi_path = output_path.replace(".mp4", ".avi")
-        save_video(output_video_frames, avi_path)
-
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", avi_path, "-c:v", "libx264",
-             "-preset", "fast", "-crf", "23", output_path],
-            check=True, capture_output=True,
-        )
-        if os.path.exists(avi_path):
-            os.remove(avi_path)
+        # Annotated frames are piped straight into ffmpeg/libx264 at the source FPS,
+        # producing the browser-playable MP4 in a single encode (and the HLS renditions,
+        # whose playlist can be played as soon as its first segments are written).
+        hls_dir = OUTPUT_FOLDER / f"{video_id}_hls" if HLS_RENDITIONS else None
+        if hls_dir is not None:
+            jobs.publish(video_id, "artifact", {"name": "hls", "value": hls_url(video_id)})
+        pipeline.render(input_path, output_path, fps=fps, encoder="ffmpeg",
+                        on_progress=scaled_progress(85, 100, "render"),
+                        hls_dir=hls_dir, hls_renditions=HLS_RENDITIONS)
+
+        jobs[video_id]["stages"] = pipeline.stage_reports
+        jobs[video_id]["cache"] = pipeline.stages.report
+        jobs[video_id]["models"] = model_pool.stats()
+        jobs.publish(video_id, "stages", {"pass": "render", "report": pipeline.stage_reports.get("render")})
 
         # Write artifacts for frontend UI
         try:
-            frame_shape = video_frames[0].shape if video_frames else (0, 0, 0)
             sample_step = max(int(fps / 5), 1)
-            ui_tracks = _build_tracks_for_ui(tracks, frame_shape, fps, sample_step=sample_step)
-            events, predictions = _build_events_and_risk(
-                tracks, fps, frame_shape, team_ball_control
-            )
+            ui_tracks = _build_tracks_for_ui(table, frame_shape, fps, sample_step=sample_step)
 
-            duration_s = round(len(video_frames) / fps, 2) if fps else 0
+            duration_s = round(pipeline.frame_count / fps, 2) if fps else 0
             meta = {
                 "id": video_id,
                 "filename": jobs[video_id].get("filename", f"{video_id}.mp4"),
@@ -464,20 +594,12 @@ def run_pipeline(video_id, input_path, output_path):
                 "sport": "soccer",
                 "uploadedAt": jobs[video_id].get("uploaded_at", ""),
                 "status": "complete",
+                "hls": hls_url(video_id) if hls_dir is not None else None,
             }
 
-            artifacts = {
-                "meta": meta,
-                "events": events,
-                "metrics": _build_metrics_from_feedback(feedback),
-                "predictions": predictions,
-                "insights": _build_insights_from_feedback(feedback),
-                "tracks": ui_tracks,
-            }
-
-            artifacts_path = OUTPUT_FOLDER / f"{video_id}_artifacts.json"
-            with open(artifacts_path, "w", encoding="utf-8") as f:
-                json.dump(artifacts, f, indent=2)
+            # Tracks are written in time windows, so the UI fetches only what it shows.
+            write_tracks(sections_dir, ui_tracks, duration_s, interval=sample_step / fps)
+            write_section(sections_dir, "meta", meta)
         except Exception as e:
             print(f"Artifacts error: {e}")
 
@@ -535,6 +657,156 @@ def upload():
     return jsonify({"videoId": video_id})
 
 
+def upload_lock(video_id):
+    with _upload_locks_guard:
+        return _upload_locks.setdefault(video_id, threading.Lock())
+
+
+def upload_progress(video_id):
+    """(bytes received, complete) of a chunked upload; raises if it was rejected."""
+    upload = jobs.load(video_id)["upload"]
+    if upload.get("failed"):
+        raise ValueError(upload["failed"])
+    return upload["offset"], upload["complete"]
+
+
+def upload_offset_response(upload, code=200, **fields):
+    response = jsonify({"offset": upload["offset"], "size": upload["size"], "complete": upload["complete"],
+                        **fields})
+    response.headers["Upload-Offset"] = str(upload["offset"])
+    response.headers["Upload-Length"] = str(upload["size"])
+    return response, code
+
+
+@app.route("/api/uploads", methods=["POST"])
+def create_upload():
+    """Start a chunked, resumable upload of {filename, size[, sha256]}; returns a videoId."""
+    body = request.get_json(silent=True) or {}
+    filename = str(body.get("filename") or "")
+    size = body.get("size")
+    sha256 = str(body.get("sha256") or "").lower() or None
+    if not allowed_file(filename):
+        return jsonify({"error": "File type not allowed. Use mp4, avi, mov, or mkv."}), 400
+    if not isinstance(size, int) or size <= 0:
+        return jsonify({"error": "size must be the file size in bytes"}), 400
+    if size > UPLOAD_MAX_MB * 1024 * 1024:
+        return jsonify({"error": f"File is larger than {UPLOAD_MAX_MB} MB"}), 413
+    if sha256 is not None and (len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256)):
+        return jsonify({"error": "sha256 must be a hex SHA-256 digest"}), 400
+
+    video_id = uuid.uuid4().hex[:10]
+    input_path = str(UPLOAD_FOLDER / f"{video_id}{Path(filename).suffix}")
+    open(input_path, "wb").close()
+
+    jobs[video_id] = {
+        "status": "uploading",
+        "progress": 0,
+        "currentStep": "uploading",
+        "error": None,
+        "input_path": input_path,
+        "filename": filename,
+        "uploaded_at": datetime.now(timezone.utc).isoformat(),
+        "upload": {"size": size, "offset": 0, "sha256": sha256, "complete": False, "decodable": False},
+    }
+
+    response, code = upload_offset_response(jobs[video_id]["upload"], 201, videoId=video_id,
+                                            chunkSize=UPLOAD_CHUNK_SIZE)
+    response.headers["Location"] = f"/api/uploads/{video_id}"
+    return response, code
+
+
+@app.route("/api/uploads/<video_id>", methods=["GET"])
+def upload_status(video_id):
+    """Bytes received so far (also in Upload-Offset), where a resumed upload continues."""
+    if video_id not in jobs or jobs[video_id].get("upload") is None:
+        return jsonify({"error": "Upload not found"}), 404
+    return upload_offset_response(jobs[video_id]["upload"])
+
+
+@app.route("/api/uploads/<video_id>", methods=["PATCH"])
+def upload_chunk(video_id):
+    """Append one chunk: the raw request body written at the Upload-Offset header,
+    verified against an optional "Upload-Checksum: sha256 <hex>" header."""
+    if video_id not in jobs or jobs[video_id].get("upload") is None:
+        return jsonify({"error": "Upload not found"}), 404
+    offset = request.headers.get("Upload-Offset", type=int)
+    length = request.content_length
+    if offset is None:
+        return jsonify({"error": "Upload-Offset header required"}), 400
+    if length is None:
+        return jsonify({"error": "Content-Length required"}), 411
+    try:
+        checksum = parse_checksum(request.headers.get("Upload-Checksum"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    with upload_lock(video_id):
+        job = jobs[video_id]
+        upload = job["upload"]
+        if upload["complete"] or job["status"] == "error":
+            return upload_offset_response(upload, 409, error="Upload is already finished")
+        if offset != upload["offset"]:
+            return upload_offset_response(upload, 409, error="Upload-Offset does not match the bytes received")
+        if offset + length > upload["size"]:
+            return upload_offset_response(upload, 413, error="Chunk extends past the declared size")
+        # Written straight into the upload file as the body arrives; a failed chunk
+        # leaves the offset unchanged, so the client resends it.
+        try:
+            write_chunk(job["input_path"], offset, request.stream, length, checksum)
+        except ChecksumMismatch as e:
+            return upload_offset_response(upload, 400, error=str(e))
+        except IOError as e:
+            return upload_offset_response(upload, 400, error=str(e))
+        upload["offset"] = offset + length
+        if not upload["decodable"]:
+            upload["decodable"] = decodable_prefix(job["input_path"], upload["offset"]) is not None
+        job["upload"] = upload
+        start_when_ready(video_id)
+    return upload_offset_response(upload)
+
+
+@app.route("/api/uploads/<video_id>/complete", methods=["POST"])
+def complete_upload(video_id):
+    """Finish an upload once every byte arrived, verifying the declared SHA-256."""
+    if video_id not in jobs or jobs[video_id].get("upload") is None:
+        return jsonify({"error": "Upload not found"}), 404
+    with upload_lock(video_id):
+        job = jobs[video_id]
+        upload = job["upload"]
+        if upload["offset"] != upload["size"]:
+            return upload_offset_response(upload, 409, error="Upload is not finished")
+        if not upload["complete"]:
+            if upload["sha256"] and file_checksum(job["input_path"]) != upload["sha256"]:
+                # A job already reading the upload fails instead of analyzing the wrong bytes.
+                upload["failed"] = "Uploaded file does not match its sha256"
+                jobs.update(video_id, upload=upload, status="error", error=upload["failed"])
+                return upload_offset_response(upload, 422, error=upload["failed"])
+            upload["complete"] = True
+            if job["status"] == "uploading":
+                jobs.update(video_id, upload=upload, status="uploaded", currentStep="uploaded")
+            else:
+                job["upload"] = upload
+        start_when_ready(video_id)
+    return upload_offset_response(upload, videoId=video_id, status=jobs[video_id]["status"])
+
+
+def start_when_ready(video_id):
+    """Queue a job whose processing was requested during its upload once the upload is
+    complete, or earlier when it is decodable while arriving and has a declared
+    SHA-256; a full queue is retried on the next chunk."""
+    job = jobs[video_id]
+    priority = job.get("processWhenReady")
+    upload = job.get("upload") or {}
+    if priority is None or not (upload.get("complete") or (upload.get("decodable") and upload.get("sha256"))):
+        return
+    job["frames"] = get_video_frame_count(job["input_path"])
+    try:
+        scheduler.submit(video_id, priority=priority)
+    except queue.Full:
+        return
+    job["processWhenReady"] = None
+
+
 @app.route("/api/process/<video_id>", methods=["POST"])
 def process(video_id):
     """Kick off background processing for a previously uploaded video."""
@@ -542,21 +814,51 @@ def process(video_id):
         return jsonify({"error": "Video not found"}), 404
 
     job = jobs[video_id]
+    if job["status"] == "uploading":
+        # Queued as soon as the upload can be decoded (see start_when_ready).
+        with upload_lock(video_id):
+            job["processWhenReady"] = request.args.get("priority", 0, type=int)
+            start_when_ready(video_id)
+        return jsonify({"jobId": f"job_{video_id}", "waitingForUpload": jobs[video_id]["status"] == "uploading",
+                        **queue_status(video_id)})
     if job["status"] not in ("uploaded",):
         return jsonify({"error": "Video is already being processed"}), 409
 
-    input_path = job["input_path"]
-    output_path = str(OUTPUT_FOLDER / f"{video_id}_analyzed.mp4")
-
-    job["status"] = "processing"
-    job["progress"] = 5
+    # Frame count sizes the job for start-time estimates; ?priority=N jumps the queue.
+    job["frames"] = get_video_frame_count(job["input_path"])
+    try:
+        scheduler.submit(video_id, priority=request.args.get("priority", 0, type=int))
+    except queue.Full:
+        retry_after = int(scheduler.seconds_per_frame() * job["frames"]) + 1
+        response = jsonify({"error": "Processing queue is full, try again later", "retryAfter": retry_after})
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 429
+
+    return jsonify({"jobId": f"job_{video_id}", **queue_status(video_id)})
+
+
+def queue_status(video_id):
+    """Queue position and estimated start of a waiting job (None once it runs)."""
+    wait = scheduler.estimated_wait(video_id)
+    return {
+        "queuePosition": scheduler.queue_position(video_id),
+        "estimatedStartSeconds": round(wait, 1) if wait is not None else None,
+        "estimatedStartAt": (datetime.now(timezone.utc) + timedelta(seconds=wait)).isoformat()
+        if wait is not None else None,
+    }
 
-    thread = threading.Thread(
-        target=run_pipeline, args=(video_id, input_path, output_path), daemon=True
-    )
-    thread.start()
 
-    return jsonify({"jobId": f"job_{video_id}"})
+def status_payload(video_id):
+    """Status fields of a job as returned by /api/status and the "status" events."""
+    job = jobs.load(video_id)
+    return {
+        "status": job["status"],
+        "progress": job["progress"],
+        "currentStep": job["currentStep"],
+        "error": job.get("error"),
+        "stages": job.get("stages"),
+        **queue_status(video_id),
+    }
 
 
 @app.route("/api/status/<video_id>")
@@ -564,23 +866,76 @@ def status(video_id):
     """Return current processing status for polling."""
     if video_id not in jobs:
         return jsonify({"error": "Video not found"}), 404
+    return jsonify(status_payload(video_id))
 
-    job = jobs[video_id]
-    return jsonify({
-        "status": job["status"],
-        "progress": job["progress"],
-        "currentStep": job["currentStep"],
-        "error": job.get("error"),
-    })
+
+def sse(event_type, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_type}", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@app.route("/api/events/<video_id>")
+def job_events(video_id):
+    """Stream a job's status changes, progress, stage timings and partial artifacts
+    as server-sent events until it completes or fails."""
+    if video_id not in jobs:
+        return jsonify({"error": "Video not found"}), 404
+    # EventSource reconnects with Last-Event-ID, so no stored event is sent twice.
+    after = request.headers.get("Last-Event-ID", request.args.get("after", 0), type=int) or 0
+
+    def stream():
+        nonlocal after
+        last_status = None
+        last_sent = time.monotonic()
+        yield "retry: 3000\n\n"
+        while True:
+            # Status is read before the events, so every event published before a
+            # job finished is sent before its final status.
+            payload = status_payload(video_id)
+            for event_id, event_type, data in jobs.events(video_id, after):
+                after = event_id
+                last_sent = time.monotonic()
+                yield sse(event_type, data, event_id)
+            key = (payload["status"], payload["progress"], payload["currentStep"], payload["queuePosition"])
+            if key != last_status:
+                last_status = key
+                last_sent = time.monotonic()
+                yield sse("status", json.dumps(payload))
+            if payload["status"] in ("complete", "error"):
+                return
+            if time.monotonic() - last_sent >= EVENT_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            time.sleep(EVENT_POLL_INTERVAL)
+
+    return Response(stream_with_context(stream()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 @app.route("/api/video/<video_id>")
 def serve_video(video_id):
-    """Serve the processed MP4 video."""
+    """Serve the processed MP4 video (range requests for seeking, ETag revalidation)."""
     output_path = OUTPUT_FOLDER / f"{video_id}_analyzed.mp4"
     if not output_path.exists():
         return jsonify({"error": "Video not found"}), 404
-    return send_file(output_path, mimetype="video/mp4", as_attachment=False)
+    return send_media(output_path, "video/mp4", max_age=MEDIA_MAX_AGE)
+
+
+def hls_url(video_id):
+    return f"/api/hls/{video_id}/{HLS_MASTER_PLAYLIST}"
+
+
+@app.route("/api/hls/<video_id>/<path:name>")
+def hls(video_id, name):
+    """Serve a video's HLS master playlist, rendition playlists and segments."""
+    path = safe_join(str(OUTPUT_FOLDER / f"{video_id}_hls"), name)
+    if path is None or not os.path.isfile(path):
+        return jsonify({"error": "Stream not found"}), 404
+    if name.endswith(".m3u8"):
+        # Playlists grow while the video renders; segments never change once written.
+        return send_media(path, "application/vnd.apple.mpegurl", max_age=0)
+    return send_media(path, "video/mp2t", max_age=MEDIA_MAX_AGE)
 
 
 @app.route("/api/feedback/<video_id>")
@@ -596,13 +951,53 @@ def feedback(video_id):
 
 @app.route("/api/artifacts/<video_id>")
 def artifacts(video_id):
-    """Serve combined analysis artifacts for the frontend UI."""
-    artifacts_path = OUTPUT_FOLDER / f"{video_id}_artifacts.json"
-    if not artifacts_path.exists():
+    """Serve combined analysis artifacts (every section and all tracks) for the frontend UI."""
+    entry = artifact_store.combined(video_id)
+    if entry is None:
         return jsonify({"error": "Artifacts not found"}), 404
-    with open(artifacts_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    return jsonify(data)
+    return send_cached(entry)
+
+
+@app.route("/api/artifacts/<video_id>/tracks")
+def artifact_tracks(video_id):
+    """Serve track positions from ?t0= up to ?t1= (seconds; whole video by default),
+    optionally only ?ids=p_1,ball and at most ?maxPoints= positions per track."""
+    try:
+        t0, t1 = (float(request.args[name]) if request.args.get(name) else None for name in ("t0", "t1"))
+        max_points = int(request.args["maxPoints"]) if request.args.get("maxPoints") else None
+    except ValueError:
+        return jsonify({"error": "t0, t1 and maxPoints must be numbers"}), 400
+    if any(value is not None and not math.isfinite(value) for value in (t0, t1)):
+        return jsonify({"error": "t0 and t1 must be finite"}), 400
+    if t0 is not None and t1 is not None and t1 < t0:
+        return jsonify({"error": "t1 must not be before t0"}), 400
+    if max_points is not None and max_points < 1:
+        return jsonify({"error": "maxPoints must be positive"}), 400
+    ids = [track_id for track_id in request.args.get("ids", "").split(",") if track_id] or None
+    entry = artifact_store.tracks(video_id, t0, t1, ids=ids, max_points=max_points)
+    if entry is None:
+        return jsonify({"error": "Tracks not found"}), 404
+    return send_cached(entry)
+
+
+@app.route("/api/artifacts/<video_id>/tracks/index")
+def artifact_track_index(video_id):
+    """Serve the track ids and classes, duration and sampling levels of a video's tracks."""
+    entry = artifact_store.track_index_body(video_id)
+    if entry is None:
+        return jsonify({"error": "Tracks not found"}), 404
+    return send_cached(entry)
+
+
+@app.route("/api/artifacts/<video_id>/<section>")
+def artifact_section(video_id, section):
+    """Serve one artifact section as soon as the job has written it."""
+    if section not in ARTIFACT_SECTIONS:
+        return jsonify({"error": f"Unknown section; use one of {', '.join(ARTIFACT_SECTIONS)} or tracks"}), 404
+    entry = artifact_store.section(video_id, section)
+    if entry is None:
+        return jsonify({"error": "Artifact section not found"}), 404
+    return send_cached(entry)
 
 
 @app.route("/api/download/<video_id>")
@@ -611,12 +1006,28 @@ def download_video(video_id):
     output_path = OUTPUT_FOLDER / f"{video_id}_analyzed.mp4"
     if not output_path.exists():
         return jsonify({"error": "Video not found"}), 404
-    return send_file(
-        output_path,
-        mimetype="video/mp4",
-        as_attachment=True,
-        download_name=f"analyzed_{video_id}.mp4",
-    )
+    return send_media(output_path, "video/mp4", download_name=f"analyzed_{video_id}.mp4",
+                      max_age=MEDIA_MAX_AGE)
+
+
+@app.route("/api/models")
+def models():
+    """Detector pool load/warm-up timings and reuse counters of this process (job
+    processes keep their own pools and record them in each job's "models")."""
+    return jsonify(model_pool.stats())
+
+
+# Models load and workers start in the serving process only: with the debug reloader
+# the parent process just watches files, two schedulers would split one store's queue,
+# and job processes import this module only to run jobs.
+scheduler = JobScheduler(jobs, run_job, workers=JOB_WORKERS, max_queued=JOB_MAX_QUEUED,
+                         executor=JOB_EXECUTOR, initializer=init_job_process)
+if (__name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true") and not in_job_process():
+    if JOB_EXECUTOR == "thread":
+        # Warm the detectors in the background so the server answers uploads meanwhile;
+        # a job that starts first waits for (or loads) a replica.
+        threading.Thread(target=model_pool.warm, name="model-warmup", daemon=True).start()
+    scheduler.start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+from .artifact_store import (ArtifactStore, CachedBody, send_cached, write_section, write_tracks, split_tracks,
+                             downsample_tracks, track_level,
+                             artifacts_dir, ARTIFACT_SECTIONS, TRACKS_SECTION, TRACK_WINDOW_SECONDS,
+                             DEFAULT_CACHE_BYTES)
+"""Sectioned UI artifacts served from a compressed in-memory cache."""
@@ -0,0 +1,432 @@
+"""UI artifacts stored per section, with time-windowed tracks and a compressed in-memory cache."""
+
+import gzip
+import hashlib
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Sections written as <id>_artifacts/<section>.json; tracks live in <id>_artifacts/tracks/.
+ARTIFACT_SECTIONS = ("meta", "events", "metrics", "predictions", "insights")
+TRACKS_SECTION = "tracks"
+# Track positions are stored as a pyramid of levels, like map tiles: level 0 holds
+# every UI sample in windows of TRACK_WINDOW_SECONDS (tracks/0/<window>.json), and
+# level k one sample per 2**k sample intervals in windows 2**k times as long, so
+# every window holds about as many positions and a query reads a few of them at
+# whatever level fits the points it asks for.
+TRACK_WINDOW_SECONDS = 10.0
+DEFAULT_SAMPLE_INTERVAL = 0.2
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+# Bodies smaller than this are sent uncompressed.
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# How long a reader waits for write_tracks to finish swapping tracks/ in.
+SWAP_WAIT_SECONDS = 1.0
+
+def _dumps(value):
+    # Compact JSON: indentation made the artifacts several times larger.
+    return json.dumps(value, separators=(",", ":")).encode()
+
+def _write_atomic(path, data):
+    # Temp file + rename, so readers never see a partial section.
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def artifacts_dir(output_folder, video_id):
+    return Path(output_folder) / f"{video_id}_artifacts"
+
+def legacy_artifacts_path(output_folder, video_id):
+    # The single <id>_artifacts.json written before artifacts were sectioned.
+    return Path(output_folder) / f"{video_id}_artifacts.json"
+
+def write_section(directory, name, value):
+    # Write one section as soon as it exists (events before the video is rendered).
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_atomic(directory / f"{name}.json", _dumps(value))
+
+def split_tracks(ui_tracks, window_seconds=TRACK_WINDOW_SECONDS):
+    # {window index: [track with the positions in that window]} for UI tracks
+    # ({"id", "class", "positions": [{"timestamp", ...}]}), positions kept in order.
+    windows = {}
+    for track in ui_tracks:
+        for position in track["positions"]:
+            window = windows.setdefault(int(position["timestamp"] // window_seconds), {})
+            if track["id"] not in window:
+                window[track["id"]] = {"id": track["id"], "class": track["class"], "positions": []}
+            window[track["id"]]["positions"].append(position)
+    return {index: list(window.values()) for index, window in windows.items()}
+
+def sample_interval(ui_tracks):
+    # Seconds between consecutive samples of the tracks (the smallest step seen).
+    steps = [later["timestamp"] - earlier["timestamp"] for track in ui_tracks
+             for earlier, later in zip(track["positions"], track["positions"][1:])
+             if later["timestamp"] > earlier["timestamp"]]
+    return round(min(steps), 6) if steps else DEFAULT_SAMPLE_INTERVAL
+
+def downsample_tracks(ui_tracks, interval):
+    # Keep each track's first position in every interval-long span of time.
+    output = []
+    for track in ui_tracks:
+        positions, last_bucket = [], None
+        for position in track["positions"]:
+            bucket = math.floor(position["timestamp"] / interval + 1e-6)
+            if bucket != last_bucket:
+                positions.append(position)
+                last_bucket = bucket
+        output.append({"id": track["id"], "class": track["class"], "positions": positions})
+    return output
+
+def write_tracks(directory, ui_tracks, duration, interval=None, window_seconds=TRACK_WINDOW_SECONDS):
+    # Write tracks/index.json and the level pyramid of ui_tracks (sampled every
+    # interval seconds; estimated from the timestamps if not given), each level
+    # downsampled from the one below, up to the first level that fits one window.
+    # Everything is written to a temp directory that is swapped in for tracks/ at the end.
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    interval = interval or sample_interval(ui_tracks)
+    temp_dir = Path(tempfile.mkdtemp(dir=directory, prefix=".tracks-"))
+    try:
+        levels = []
+        level_tracks = ui_tracks
+        while True:
+            scale = 2 ** len(levels)
+            if levels:
+                level_tracks = downsample_tracks(level_tracks, interval * scale)
+            windows = split_tracks(level_tracks, window_seconds * scale)
+            count = max(int(math.ceil(duration / (window_seconds * scale))), max(windows, default=-1) + 1, 1)
+            level_dir = temp_dir / str(len(levels))
+            level_dir.mkdir()
+            for index in range(count):
+                _write_atomic(level_dir / f"{index}.json", _dumps(windows.get(index, [])))
+            levels.append({"interval": round(interval * scale, 6), "windowSeconds": window_seconds * scale,
+                           "windows": count})
+            if count == 1:
+                break
+        _write_atomic(temp_dir / "index.json", _dumps({
+            "duration": duration,
+            "levels": levels,
+            "tracks": [{"id": track["id"], "class": track["class"]} for track in ui_tracks],
+        }))
+        # The old tracks/ is renamed aside before the new one is renamed in, so a reader
+        # finds the old tracks, the new ones or (between the renames) none, never a mix.
+        # Readers wait out the gap while the old directory exists, and a reader still
+        # holding the old index misses its next window and reads the new index.
+        target = directory / TRACKS_SECTION
+        old_dir = temp_dir.with_name(temp_dir.name + "-old")
+        if target.exists():
+            os.replace(target, old_dir)
+        try:
+            os.replace(temp_dir, target)
+        except BaseException:
+            if old_dir.exists():
+                os.replace(old_dir, target)
+            raise
+        shutil.rmtree(old_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+def track_level(index, t0=None, t1=None, max_points=None):
+    # Finest level with at most max_points positions per track in [t0, t1); level 0
+    # (every sample) without max_points, the coarsest if none is that sparse.
+    if not max_points:
+        return 0
+    start = max(t0 or 0.0, 0.0)
+    end = index["duration"] if t1 is None else min(t1, index["duration"])
+    for level, info in enumerate(index["levels"]):
+        if (end - start) / info["interval"] <= max_points:
+            return level
+    return len(index["levels"]) - 1
+
+def split_legacy_artifacts(output_folder, video_id):
+    # Convert an <id>_artifacts.json written before sectioning; False if there is none.
+    # The sections are written to a temp directory renamed into place when complete,
+    # so concurrent requests never see half a conversion; if another one got there
+    # first, its directory is kept.
+    path = legacy_artifacts_path(output_folder, video_id)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            artifacts = json.load(f)
+    except FileNotFoundError:
+        return False
+    directory = artifacts_dir(output_folder, video_id)
+    temp_dir = Path(tempfile.mkdtemp(dir=directory.parent, prefix=f".{directory.name}-"))
+    try:
+        for name in ARTIFACT_SECTIONS:
+            if name in artifacts:
+                write_section(temp_dir, name, artifacts[name])
+        write_tracks(temp_dir, artifacts.get(TRACKS_SECTION, []), artifacts.get("meta", {}).get("duration", 0))
+        try:
+            os.replace(temp_dir, directory)
+        except OSError:
+            if not directory.exists():
+                raise
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return True
+
+class CachedBody:
+    # A JSON response body with its ETag and compressed variants, plus the parsed
+    # value when it is needed to assemble other responses (track windows).
+    def __init__(self, body, value=None, compress=True):
+        self.body = body
+        self.value = value
+        self.etag = hashlib.sha1(body).hexdigest()[:20]
+        self.encoded = {}
+        if compress and len(body) >= MIN_COMPRESS_BYTES:
+            self.encoded["gzip"] = gzip.compress(body, GZIP_LEVEL)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    @property
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+class ArtifactStore:
+    # Reads sectioned artifacts from output_folder through a least-recently-used
+    # cache of encoded bodies bounded by max_bytes. Entries are keyed by the
+    # files' size and mtime, so rewritten artifacts are reloaded.
+    def __init__(self, output_folder, max_bytes=DEFAULT_CACHE_BYTES):
+        self.output_folder = Path(output_folder)
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key, load):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = load()
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._size += entry.size
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+        return entry
+
+    def _signature(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _directory(self, video_id):
+        # The artifacts directory, converting a pre-sectioning artifacts file first.
+        directory = artifacts_dir(self.output_folder, video_id)
+        if not directory.exists():
+            split_legacy_artifacts(self.output_folder, video_id)
+        return directory
+
+    def section(self, video_id, name):
+        # CachedBody of one section, or None if it has not been written (yet).
+        path = self._directory(video_id) / f"{name}.json"
+        signature = self._signature(path)
+        if signature is None:
+            return None
+
+        def load():
+            with open(path, 'rb') as f:
+                return CachedBody(f.read())
+        return self._cached((video_id, name, signature), load)
+
+    def _track_index_entry(self, video_id):
+        directory = self._directory(video_id)
+        path = directory / TRACKS_SECTION / "index.json"
+
+        def load():
+            with open(path, 'rb') as f:
+                body = f.read()
+            return CachedBody(body, value=json.loads(body))
+        deadline = None
+        while True:
+            signature = self._signature(path)
+            if signature is not None:
+                try:
+                    return self._cached((video_id, TRACKS_SECTION, signature), load), signature
+                except FileNotFoundError:
+                    pass
+            # Without an index, tracks/ is either not written yet or being swapped by
+            # write_tracks (its old directory is still around); wait for the new one.
+            elif not any(directory.glob(".tracks-*-old")):
+                return None, None
+            if deadline is None:
+                deadline = time.monotonic() + SWAP_WAIT_SECONDS
+            elif time.monotonic() > deadline:
+                return None, None
+            time.sleep(0.005)
+
+    def track_index(self, video_id):
+        # (tracks/index.json: duration, levels, track ids and classes; its signature).
+        entry, signature = self._track_index_entry(video_id)
+        return (None, None) if entry is None else (entry.value, signature)
+
+    def track_index_body(self, video_id):
+        return self._track_index_entry(video_id)[0]
+
+    def _track_window(self, video_id, level, window, signature):
+        tracks_dir = artifacts_dir(self.output_folder, video_id) / TRACKS_SECTION
+        path = tracks_dir / str(level) / f"{window}.json"
+
+        def load():
+            with open(path, 'rb') as f:
+                body = f.read()
+            # A window read after the swap belongs to the new index, not this one.
+            if self._signature(tracks_dir / "index.json") != signature:
+                raise FileNotFoundError(f"tracks of {video_id} were replaced while being read")
+            return CachedBody(body, value=json.loads(body), compress=False)
+        try:
+            return self._cached((video_id, TRACKS_SECTION, signature, level, window), load).value
+        except FileNotFoundError:
+            # The tracks were replaced since their index (and signature) was read.
+            return None
+
+    def track_list(self, video_id, t0=None, t1=None, ids=None, level=0):
+        # Tracks (only those in ids, if given) with their positions in [t0, t1) at a
+        # pyramid level (all of them by default), read from the level's windows
+        # that overlap the range; None without tracks. Tracks replaced while being
+        # read are read again from the new index.
+        for _ in range(2):
+            index, signature = self.track_index(video_id)
+            if index is None:
+                return None
+            track_list = self._read_tracks(video_id, index, signature, t0, t1, ids, level)
+            if track_list is not None:
+                return track_list
+        return None
+
+    def _read_tracks(self, video_id, index, signature, t0, t1, ids, level):
+        # track_list for one index; None if a window is gone (the tracks were replaced).
+        info = index["levels"][level]
+        window_seconds, count = info["windowSeconds"], info["windows"]
+        first = 0 if t0 is None else max(int(t0 // window_seconds), 0)
+        last = count - 1 if t1 is None else min(int(t1 // window_seconds), count - 1)
+        merged = {}
+        for window in range(first, last + 1):
+            window_tracks = self._track_window(video_id, level, window, signature)
+            if window_tracks is None:
+                return None
+            for track in window_tracks:
+                if ids is not None and track["id"] not in ids:
+                    continue
+                positions = [position for position in track["positions"]
+                             if (t0 is None or position["timestamp"] >= t0)
+                             and (t1 is None or position["timestamp"] < t1)]
+                if not positions:
+                    continue
+                if track["id"] not in merged:
+                    merged[track["id"]] = {"id": track["id"], "class": track["class"], "positions": []}
+                merged[track["id"]]["positions"].extend(positions)
+        return list(merged.values())
+
+    def tracks(self, video_id, t0=None, t1=None, ids=None, max_points=None):
+        # CachedBody of {"t0", "t1", "level", "interval", "tracks"} for a time range
+        # (seconds), optionally only some track ids, at the finest level with at
+        # most max_points positions per track. Tracks replaced while being read are
+        # read again from the new index.
+        ids = tuple(sorted(set(ids))) if ids is not None else None
+        for _ in range(2):
+            index, signature = self.track_index(video_id)
+            if index is None:
+                return None
+            level = track_level(index, t0, t1, max_points)
+
+            def load():
+                track_list = self._read_tracks(video_id, index, signature, t0, t1, ids, level)
+                if track_list is None:
+                    raise FileNotFoundError(f"tracks of {video_id} were replaced while being read")
+                return CachedBody(_dumps({
+                    "t0": t0,
+                    "t1": t1,
+                    "level": level,
+                    "interval": index["levels"][level]["interval"],
+                    "tracks": track_list,
+                }))
+            try:
+                return self._cached((video_id, TRACKS_SECTION, signature, t0, t1, ids, level), load)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def combined(self, video_id):
+        # CachedBody of every section plus all tracks (the /api/artifacts response),
+        # or None until the job has written its meta section.
+        directory = self._directory(video_id)
+        for _ in range(2):
+            signatures = tuple(self._signature(directory / f"{name}.json") for name in ARTIFACT_SECTIONS)
+            if signatures[0] is None:
+                return None
+            index, index_signature = self.track_index(video_id)
+            signatures += (index_signature,)
+
+            def load():
+                artifacts = {}
+                for name in ARTIFACT_SECTIONS:
+                    entry = self.section(video_id, name)
+                    if entry is not None:
+                        artifacts[name] = json.loads(entry.body)
+                track_list = [] if index is None else self._read_tracks(video_id, index, index_signature,
+                                                                       None, None, None, 0)
+                if track_list is None:
+                    raise FileNotFoundError(f"tracks of {video_id} were replaced while being read")
+                artifacts[TRACKS_SECTION] = track_list
+                return CachedBody(_dumps(artifacts))
+            try:
+                return self._cached((video_id, "combined", signatures), load)
+            except FileNotFoundError:
+                # The tracks were replaced since their index was read; read the new one.
+                continue
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._size, "maxBytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+def send_cached(entry):
+    # JSON response for a CachedBody: 304 when If-None-Match matches, otherwise the
+    # body in the best encoding the client accepts (brotli, gzip or identity). Each
+    # encoding has its own ETag; clients revalidate on every use (no-cache).
+    encoding = request.accept_encodings.best_match([name for name in ("br", "gzip") if name in entry.encoded])
+    etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+    body = entry.encoded[encoding] if encoding else entry.body
+    headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+    else:
+        response = Response(body, mimetype="application/json", headers=headers)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,180 @@
+"""/api/status latency while analysis jobs run in threads vs worker processes.
+
+Serves a status endpoint backed by the job store (the same response as app.py's)
+with a threaded WSGI server, queues --jobs synthetic jobs on a JobScheduler and
+polls the endpoint from --clients threads until every job has finished. Each job
+walks per-frame track dicts in pure Python (like feedback aggregation and event
+building) for --job-seconds, reporting progress through the store. The run is
+repeated with the thread and the process executor, and reports request latency
+percentiles. Run from the backend directory:
+
+    python benchmarks/api_load_benchmark.py --jobs 4 --workers 2 --clients 8
+
+To poll a running server instead (e.g. while real uploads are processing):
+
+    python benchmarks/api_load_benchmark.py --url http://127.0.0.1:5000 --video-ids abc123 def456 --duration 60
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from job_queue import JobStore, JobScheduler, EXECUTORS
+
+# Job processes find the store through the environment (they are spawned, not forked).
+STORE_ENV = "API_LOAD_BENCHMARK_DB"
+_stores = {}
+
+
+def job_store():
+    path = os.environ[STORE_ENV]
+    if path not in _stores:
+        _stores[path] = JobStore(path)
+    return _stores[path]
+
+
+def synthetic_job(video_id):
+    # Python-bound work over nested track dicts, with progress writes.
+    store = job_store()
+    job = store.load(video_id)
+    store.update(video_id, status="analyzing")
+    frames = [{player_id: {"speed": float(player_id), "position": (player_id, frame_num)}
+               for player_id in range(22)} for frame_num in range(250)]
+    start = time.perf_counter()
+    end = start + job["job_seconds"]
+    while time.perf_counter() < end:
+        totals = {}
+        for frame_tracks in frames:
+            for player_id, track in frame_tracks.items():
+                totals[player_id] = totals.get(player_id, 0.0) + track["speed"] * track["position"][0]
+        progress = int(100 * (time.perf_counter() - start) / job["job_seconds"])
+        if progress != job.get("progress"):
+            job["progress"] = progress
+            store.update(video_id, progress=min(progress, 99))
+    store.update(video_id, status="complete", progress=100)
+
+
+def status_app(store, scheduler):
+    app = Flask(__name__)
+
+    @app.route("/api/status/<video_id>")
+    def status(video_id):
+        if video_id not in store:
+            return jsonify({"error": "Video not found"}), 404
+        job = store.load(video_id)
+        return jsonify({"status": job["status"], "progress": job.get("progress"),
+                        "queuePosition": scheduler.queue_position(video_id) if scheduler else None})
+    return app
+
+
+def poll(base_url, video_ids, stop, latencies):
+    # One client: request the status of each job in turn until stop is set.
+    index = 0
+    while not stop.is_set():
+        url = f"{base_url}/api/status/{video_ids[index % len(video_ids)]}"
+        index += 1
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+        except urllib.error.URLError:
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run_clients(base_url, video_ids, clients, until):
+    # Poll with `clients` threads until until() returns True; latencies in seconds.
+    stop = threading.Event()
+    latencies = []
+    threads = [threading.Thread(target=poll, args=(base_url, video_ids, stop, latencies), daemon=True)
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    while not until():
+        time.sleep(0.05)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return np.asarray(latencies)
+
+
+def report(label, latencies, seconds):
+    if len(latencies) == 0:
+        print(f"{label:<12}no successful requests")
+        return
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"{label:<12}{seconds:>8.1f}{len(latencies) / seconds:>10.1f}{p50:>9.1f}{p95:>9.1f}"
+          f"{p99:>9.1f}{latencies.max() * 1000:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Status endpoint latency under analysis load.")
+    parser.add_argument("--jobs", type=int, default=4, help="Synthetic jobs to queue.")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent jobs (threads or processes).")
+    parser.add_argument("--job-seconds", type=float, default=5.0, help="CPU time of each synthetic job.")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent polling clients.")
+    parser.add_argument("--executors", nargs="+", choices=EXECUTORS, default=list(EXECUTORS),
+                        help="Job executors to compare.")
+    parser.add_argument("--url", default=None, help="Poll this running server instead of the synthetic one.")
+    parser.add_argument("--video-ids", nargs="+", default=None, help="Video ids to poll with --url.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to poll with --url.")
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    header = f"{'executor':<12}{'seconds':>8}{'req/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    if args.url:
+        deadline = time.perf_counter() + args.duration
+        latencies = run_clients(args.url.rstrip("/"), args.video_ids, args.clients,
+                                lambda: time.perf_counter() >= deadline)
+        print(header)
+        report("server", latencies, args.duration)
+        return
+
+    print(f"{args.jobs} jobs x {args.job_seconds:g}s CPU on {args.workers} workers, {args.clients} clients, "
+          f"{os.cpu_count()} CPUs")
+    print(header)
+    with tempfile.TemporaryDirectory() as tmp:
+        for executor in ["idle"] + args.executors:
+            os.environ[STORE_ENV] = os.path.join(tmp, f"{executor}.sqlite3")
+            store = job_store()
+            scheduler = None
+            video_ids = [f"job{index}" for index in range(args.jobs)]
+            for video_id in video_ids:
+                store[video_id] = {"status": "uploaded", "progress": 0, "job_seconds": args.job_seconds}
+            if executor != "idle":
+                scheduler = JobScheduler(store, synthetic_job, workers=args.workers, max_queued=args.jobs,
+                                         executor=executor).start()
+            server = make_server("127.0.0.1", 0, status_app(store, scheduler), threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+
+            start = time.perf_counter()
+            if executor == "idle":
+                # Baseline: no jobs running, polled for one job's duration.
+                until = lambda: time.perf_counter() - start >= args.job_seconds
+            else:
+                for video_id in video_ids:
+                    scheduler.submit(video_id)
+                until = lambda: all(store.load(video_id)["status"] in ("complete", "error")
+                                    for video_id in video_ids)
+            latencies = run_clients(base_url, video_ids, args.clients, until)
+            report(executor, latencies, time.perf_counter() - start)
+            server.shutdown()
+            if scheduler is not None:
+                scheduler.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Bytes and server time per viewer request: the monolithic artifacts file vs. sectioned artifacts.
+
+Writes synthetic UI artifacts for a --minutes long match (22 players and the ball
+sampled at --hz, plus events) both as the previous single <id>_artifacts.json and
+as sections with windowed tracks, and replays what the viewer requests: opening
+the video (meta and events; the legacy endpoint returns everything) and then one
+--window seconds of tracks per step while playing. The legacy path re-reads and
+re-serializes the file on every request as the old endpoint did. Each request is
+made without and then with gzip (the first pass loads and compresses the cache
+entries), and repeated with the client's ETag. Run from the backend directory:
+
+    python benchmarks/artifacts_benchmark.py --minutes 90 --requests 20
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from flask import Flask, jsonify
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from artifact_store import ArtifactStore, send_cached, write_section, write_tracks, artifacts_dir
+
+VIDEO_ID = "match"
+
+
+def synthetic_artifacts(minutes, hz):
+    rng = random.Random(0)
+    duration = minutes * 60.0
+    samples = int(duration * hz)
+    tracks = []
+    for index in range(23):
+        track_id, cls = (f"p_{index}", "person") if index < 22 else ("ball", "sports_ball")
+        tracks.append({"id": track_id, "class": cls, "positions": [
+            {"timestamp": round(sample / hz, 2), "x": round(rng.random(), 4), "y": round(rng.random(), 4),
+             "confidence": 1.0}
+            for sample in range(samples)]})
+    events = [{"id": f"e{index}", "type": "turnover", "timestamp": round(rng.uniform(0, duration), 2),
+               "confidence": 0.8, "players": ["p_1", "p_2"], "description": "Possession lost"}
+              for index in range(int(minutes * 4))]
+    return {
+        "meta": {"id": VIDEO_ID, "filename": "match.mp4", "duration": duration, "width": 1920, "height": 1080,
+                 "fps": 25, "sport": "soccer", "uploadedAt": "", "status": "complete", "hls": None},
+        "events": events,
+        "metrics": [],
+        "predictions": {"riskScores": [{"timestamp": float(t), "score": 0.5, "factors": []}
+                                       for t in range(0, int(duration), 5)], "topRiskMoments": []},
+        "insights": [],
+        "tracks": tracks,
+    }
+
+
+def artifacts_app(output_folder, store):
+    app = Flask(__name__)
+
+    @app.route("/legacy/<video_id>")
+    def legacy(video_id):
+        with open(Path(output_folder) / f"{video_id}_artifacts.json", "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return jsonify(data)
+
+    @app.route("/sections/<video_id>/tracks/<float:t0>/<float:t1>")
+    def tracks(video_id, t0, t1):
+        return send_cached(store.tracks(video_id, t0, t1))
+
+    @app.route("/sections/<video_id>/<section>")
+    def section(video_id, section):
+        return send_cached(store.section(video_id, section))
+    return app
+
+
+def measure(client, urls, gzip):
+    # (bytes, seconds) of fetching urls, then of revalidating them with their ETags
+    # (None, None without ETags: a repeat would be the same full response).
+    headers = {"Accept-Encoding": "gzip"} if gzip else {}
+    total, etags = 0, []
+    start = time.perf_counter()
+    for url in urls:
+        response = client.get(url, headers=headers)
+        total += len(response.data)
+        etags.append(response.headers.get("ETag"))
+    seconds = time.perf_counter() - start
+    if not all(etags):
+        return total, seconds, None, None
+    revalidated = 0
+    start = time.perf_counter()
+    for url, etag in zip(urls, etags):
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        revalidated += len(response.data)
+    return total, seconds, revalidated, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monolithic vs. sectioned UI artifacts.")
+    parser.add_argument("--minutes", type=float, default=90.0, help="Synthetic match length.")
+    parser.add_argument("--hz", type=float, default=5.0, help="Track samples per second.")
+    parser.add_argument("--window", type=float, default=30.0, help="Seconds of tracks the viewer fetches at once.")
+    parser.add_argument("--requests", type=int, default=20, help="Track windows fetched while playing.")
+    args = parser.parse_args()
+
+    artifacts = synthetic_artifacts(args.minutes, args.hz)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(Path(tmp) / f"{VIDEO_ID}_artifacts.json", "w", encoding="utf-8") as f:
+            json.dump(artifacts, f, separators=(",", ":"))
+        directory = artifacts_dir(tmp, VIDEO_ID)
+        for name in ("meta", "events", "metrics", "predictions", "insights"):
+            write_section(directory, name, artifacts[name])
+        write_tracks(directory, artifacts["tracks"], artifacts["meta"]["duration"])
+        store = ArtifactStore(tmp)
+        client = artifacts_app(tmp, store).test_client()
+
+        starts = np.random.default_rng(1).uniform(0, artifacts["meta"]["duration"] - args.window, args.requests)
+        windows = [float(int(t0 // args.window) * args.window) for t0 in starts]
+        open_urls = {"legacy": [f"/legacy/{VIDEO_ID}"],
+                     "sections": [f"/sections/{VIDEO_ID}/{name}" for name in ("meta", "events", "predictions")]}
+        track_urls = {"legacy": [f"/legacy/{VIDEO_ID}"] * args.requests,
+                      "sections": [f"/sections/{VIDEO_ID}/tracks/{t0:.1f}/{t0 + args.window:.1f}"
+                                   for t0 in windows]}
+
+        print(f"{args.minutes:g} min match, {sum(len(t['positions']) for t in artifacts['tracks'])} positions, "
+              f"{args.window:g}s track windows, {args.requests} window requests")
+        print(f"{'mode':<10}{'request':<14}{'encoding':<10}{'KB/req':>10}{'ms/req':>9}{'304 KB':>9}{'304 ms':>9}")
+        for mode in ("legacy", "sections"):
+            for label, urls in (("open", open_urls[mode]), ("track window", track_urls[mode])):
+                for gzip in (False, True):
+                    # The legacy endpoint neither compresses nor validates.
+                    if mode == "legacy" and gzip:
+                        continue
+                    total, seconds, revalidated, revalidate_seconds = measure(client, urls, gzip)
+                    count = len(urls) if label == "track window" else 1
+                    revalidation = (f"{'n/a':>9}{'n/a':>9}" if revalidated is None else
+                                    f"{revalidated / count / 1e3:>9.1f}{revalidate_seconds / count * 1000:>9.1f}")
+                    print(f"{mode:<10}{label:<14}{'gzip' if gzip else 'identity':<10}{total / count / 1e3:>10.1f}"
+                          f"{seconds / count * 1000:>9.1f}{revalidation}")
+        print(store.stats())
+
+
+if __name__ == "__main__":
+    main()
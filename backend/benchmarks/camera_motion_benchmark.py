@@ -0,0 +1,124 @@
+"""Throughput and stabilization error of each camera motion estimation method.
+
+Renders a synthetic broadcast pan: frames are cut from a textured pitch panorama
+along a known camera path (pan, slow zoom and a slight roll) with players
+moving across it. Each CameraMovementEstimator method is timed over the clip,
+and its per-frame motion and accumulated transforms are compared with the
+ground truth. Stabilization error is the mean distance between where the
+estimate and the truth place frame points in the first frame.
+Run from the backend directory:
+
+    python benchmarks/camera_motion_benchmark.py --frames 300
+"""
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from camera_movement_estimator import CameraMovementEstimator, ESTIMATION_METHODS
+from utils import warp_points
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+def panorama(seed=0):
+    # Grass texture with mowing stripes and pitch lines, larger than a frame.
+    rng = np.random.default_rng(seed)
+    size = (HEIGHT * 2, WIDTH * 3)
+    noise = cv2.GaussianBlur(rng.normal(0, 1, size=size).astype(np.float32), (0, 0), 2.0)
+    stripes = ((np.arange(size[1]) // 160) % 2)[None, :] * 12.0
+    green = 110 + 18 * noise + stripes
+    image = np.stack([green * 0.45, green, green * 0.5], axis=2).clip(0, 255).astype(np.uint8)
+    for x in range(300, size[1], 700):
+        cv2.line(image, (x, 0), (x + 250, size[0]), (235, 235, 235), 4)
+    for y in range(250, size[0], 500):
+        cv2.line(image, (0, y), (size[1], y + 60), (235, 235, 235), 4)
+    for _ in range(3000):
+        center = tuple(int(v) for v in rng.uniform([0, 0], [size[1], size[0]]))
+        cv2.circle(image, center, int(rng.integers(3, 9)), tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    return image
+
+
+def camera_path(num_frames, seed=0):
+    # (F, 3, 3) matrices mapping panorama pixels to frame pixels: a back-and-forth pan
+    # of up to ~20 px/frame (inside the panorama) with a slow zoom and a slight roll.
+    rng = np.random.default_rng(seed)
+    t = np.arange(num_frames) + rng.uniform(0, 300)
+    offset = np.stack([WIDTH * 0.9 + 900 * np.sin(2 * np.pi * t / 300),
+                       HEIGHT * 0.5 + 300 * np.sin(2 * np.pi * t / 220)], axis=1)
+    zoom = 1 + 0.06 * np.sin(np.linspace(0, 3, num_frames))
+    roll = np.deg2rad(1.5) * np.sin(np.linspace(0, 5, num_frames))
+    matrices = np.zeros((num_frames, 3, 3))
+    for f in range(num_frames):
+        c, s = zoom[f] * np.cos(roll[f]), zoom[f] * np.sin(roll[f])
+        center = np.array([WIDTH / 2, HEIGHT / 2])
+        rotation = np.array([[c, -s], [s, c]])
+        matrices[f, :2, :2] = rotation
+        matrices[f, :2, 2] = center - rotation @ (offset[f] + center)
+        matrices[f, 2, 2] = 1
+    return matrices
+
+
+def render(pano, matrices, num_players, seed=0):
+    # Frames with players (dark/red blobs) running independently of the camera.
+    rng = np.random.default_rng(seed)
+    players = rng.uniform([0, 0], [WIDTH, HEIGHT], size=(num_players, 2))
+    velocity = rng.normal(0, 6, size=(num_players, 2))
+    frames = []
+    for matrix in matrices:
+        frame = cv2.warpAffine(pano, matrix[:2], (WIDTH, HEIGHT), flags=cv2.INTER_LINEAR)
+        players = (players + velocity) % [WIDTH, HEIGHT]
+        for i, (x, y) in enumerate(players.astype(int).tolist()):
+            cv2.rectangle(frame, (x - 15, y - 60), (x + 15, y), (40, 40, 190) if i % 2 else (20, 20, 20), -1)
+        frames.append(frame)
+    return frames
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera motion estimation methods vs a known camera path.")
+    parser.add_argument("--frames", type=int, default=300, help="Synthetic frames.")
+    parser.add_argument("--players", type=int, default=22, help="Moving players per frame.")
+    args = parser.parse_args()
+
+    matrices = camera_path(args.frames)
+    frames = render(panorama(), matrices, args.players)
+    # Truth: frame f pixels -> previous frame, and -> first frame.
+    inverse = np.linalg.inv(matrices)
+    step = matrices[:-1] @ inverse[1:]
+    cumulative = matrices[0] @ inverse
+    center = np.array([WIDTH / 2, HEIGHT / 2])
+    true_movement = np.array([[0.0, 0.0]] + [(warp_points(center, m)[0] - center).tolist() for m in step])
+    grid = np.stack(np.meshgrid(np.linspace(100, WIDTH - 100, 8), np.linspace(100, HEIGHT - 100, 5)), -1).reshape(-1, 2)
+
+    print(f"{args.frames} frames {WIDTH}x{HEIGHT}, {args.players} moving players")
+    print(f"{'method':<12}{'fps':>8}{'motion err (px)':>17}{'stabilization err (px)':>24}")
+    for method in ESTIMATION_METHODS:
+        estimator = CameraMovementEstimator(frames[0], method=method)
+        movement, seconds = timed(lambda: estimator.get_camera_movement(frames))
+        motion_error = np.linalg.norm(np.asarray(movement, dtype=np.float64) - true_movement, axis=1).mean()
+        transforms = estimator.camera_transforms
+        stabilization_error = np.mean([
+            np.linalg.norm(warp_points(grid, transforms[f]) - warp_points(grid, cumulative[f]), axis=1).mean()
+            for f in range(args.frames)])
+        print(f"{method:<12}{args.frames / seconds:>8.1f}{motion_error:>17.2f}{stabilization_error:>24.1f}")
+
+
+if __name__ == "__main__":
+    main()
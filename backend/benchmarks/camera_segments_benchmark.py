@@ -0,0 +1,89 @@
+"""Scaling of segment-parallel camera motion estimation with the number of workers.
+
+Writes the synthetic pan of camera_motion_benchmark.py to a temporary video, then
+times the serial estimator (decoding in this process) against
+SegmentedCameraMovement with 1, 2, 4 and 8 worker processes. Each run is compared
+with the serial result: frames whose motion is identical, the largest motion
+difference and the mean distance between where the stitched and serial transforms
+place frame points in the first frame.
+Run from the backend directory:
+
+    python benchmarks/camera_segments_benchmark.py --frames 600 --method max
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from camera_movement_estimator import (CameraMovementEstimator, SegmentedCameraMovement, ESTIMATION_METHODS,
+                                       DEFAULT_SEGMENT_FRAMES, DEFAULT_OVERLAP_FRAMES)
+from utils import iter_video_frames, iter_frame_chunks, save_video, warp_points
+from camera_motion_benchmark import WIDTH, HEIGHT, panorama, camera_path, render
+
+
+def serial_camera_movement(video_path, method):
+    # The single-process path: decode and estimate chunk by chunk.
+    estimator = None
+    camera_movement = []
+    for chunk in iter_frame_chunks(iter_video_frames(video_path), 32):
+        if estimator is None:
+            estimator = CameraMovementEstimator(chunk[0], method=method)
+        camera_movement += estimator.update_camera_movement(chunk)
+    return camera_movement, estimator.camera_transforms
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs segment-parallel camera motion.")
+    parser.add_argument("--frames", type=int, default=600, help="Synthetic frames.")
+    parser.add_argument("--method", choices=ESTIMATION_METHODS, default="max", help="Camera motion method.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts to time.")
+    parser.add_argument("--segment-frames", type=int, default=DEFAULT_SEGMENT_FRAMES, help="Frames per segment.")
+    parser.add_argument("--overlap", type=int, default=DEFAULT_OVERLAP_FRAMES, help="Warm-up frames before each segment.")
+    args = parser.parse_args()
+
+    grid = np.stack(np.meshgrid(np.linspace(100, WIDTH - 100, 8), np.linspace(100, HEIGHT - 100, 5)), -1).reshape(-1, 2)
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = os.path.join(tmp, "pan.avi")
+        save_video(render(panorama(), camera_path(args.frames), 22), video_path)
+
+        (expected, expected_transforms), serial_seconds = timed(lambda: serial_camera_movement(video_path, args.method))
+        expected = np.asarray(expected, dtype=np.float64)
+        print(f"{args.frames} frames {WIDTH}x{HEIGHT}, method {args.method}, {os.cpu_count()} CPUs, "
+              f"segments of {args.segment_frames} frames with {args.overlap} warm-up frames")
+        print(f"{'workers':<10}{'seconds':>9}{'fps':>8}{'speedup':>9}{'identical':>11}{'max diff (px)':>15}{'stitch err (px)':>17}")
+        print(f"{'serial':<10}{serial_seconds:>9.2f}{args.frames / serial_seconds:>8.1f}")
+        for workers in args.workers:
+            segmented = SegmentedCameraMovement(args.method, workers=workers, segment_frames=args.segment_frames,
+                                                overlap=args.overlap)
+            camera_movement, seconds = timed(lambda: segmented.submit(video_path, args.frames).result())
+            camera_movement = np.asarray(camera_movement, dtype=np.float64)
+            transforms = segmented.camera_transforms
+            identical = np.all(camera_movement == expected, axis=1).mean()
+            max_diff = np.abs(camera_movement - expected).max()
+            stitch_error = np.mean([
+                np.linalg.norm(warp_points(grid, transforms[f]) - warp_points(grid, expected_transforms[f]), axis=1).mean()
+                for f in range(len(transforms))])
+            print(f"{workers:<10}{seconds:>9.2f}{args.frames / seconds:>8.1f}{serial_seconds / seconds:>8.2f}x"
+                  f"{identical:>11.1%}{max_diff:>15.2f}{stitch_error:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
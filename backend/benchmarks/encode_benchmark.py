@@ -0,0 +1,90 @@
+"""Compare the two-step AVI + ffmpeg re-encode against direct H.264 piping.
+
+Frames are decoded up front so only encoding is timed. Disk I/O is the bytes
+each path writes and re-reads. Run from the backend directory:
+
+    python benchmarks/encode_benchmark.py --video input_videos/08fd33_4.mp4
+"""
+
+import argparse
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import iter_video_frames, get_video_fps, save_video
+
+
+def encode_two_step(frames, output_dir, fps):
+    # Previous run_pipeline behaviour: XVID AVI at a fixed 24 FPS, then libx264 re-encode.
+    avi_path = os.path.join(output_dir, "two_step.avi")
+    mp4_path = os.path.join(output_dir, "two_step.mp4")
+    start = time.perf_counter()
+    save_video(frames, avi_path)
+    subprocess.run(
+        ["ffmpeg", "-y", "-i", avi_path, "-c:v", "libx264",
+         "-preset", "fast", "-crf", "23", mp4_path],
+        check=True, capture_output=True,
+    )
+    elapsed = time.perf_counter() - start
+    avi_bytes = os.path.getsize(avi_path)
+    mp4_bytes = os.path.getsize(mp4_path)
+    return {
+        "path": "avi + re-encode",
+        "seconds": elapsed,
+        "bytes_written": avi_bytes + mp4_bytes,
+        "bytes_reread": avi_bytes,
+        "output_bytes": mp4_bytes,
+    }
+
+
+def encode_direct(frames, output_dir, fps):
+    mp4_path = os.path.join(output_dir, "direct.mp4")
+    start = time.perf_counter()
+    save_video(frames, mp4_path, fps=fps, encoder="ffmpeg")
+    elapsed = time.perf_counter() - start
+    mp4_bytes = os.path.getsize(mp4_path)
+    return {
+        "path": "direct pipe",
+        "seconds": elapsed,
+        "bytes_written": mp4_bytes,
+        "bytes_reread": 0,
+        "output_bytes": mp4_bytes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode time and disk I/O: two-step vs direct H.264.")
+    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Path to input video.")
+    parser.add_argument("--max-frames", type=int, default=300, help="Frames to encode (decoded into memory first).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the fastest is reported.")
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(iter_video_frames(args.video), args.max_frames))
+    if not frames:
+        raise ValueError(f"No frames read from video: {args.video}")
+    fps = get_video_fps(args.video)
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for encode in (encode_two_step, encode_direct):
+            runs = [encode(frames, output_dir, fps) for _ in range(max(args.repeat, 1))]
+            results.append(min(runs, key=lambda run: run["seconds"]))
+
+    mb = 1024 * 1024
+    print(f"{len(frames)} frames {frames[0].shape[1]}x{frames[0].shape[0]} @ {fps:.2f} fps")
+    print(f"{'path':<18}{'time (s)':>10}{'fps':>9}{'written MB':>12}{'re-read MB':>12}{'output MB':>11}")
+    for result in results:
+        print(f"{result['path']:<18}{result['seconds']:>10.2f}{len(frames) / result['seconds']:>9.1f}"
+              f"{result['bytes_written'] / mb:>12.1f}{result['bytes_reread'] / mb:>12.1f}"
+              f"{result['output_bytes'] / mb:>11.1f}")
+    speedup = results[0]["seconds"] / results[1]["seconds"] if results[1]["seconds"] else 0
+    print(f"direct pipe speedup: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Per-detection cost of the per-point geometry stages vs the batched geometry engine.
+
+Builds synthetic tracks (boxes only, spread over and around the pitch polygon)
+and runs position, camera adjust and perspective transform per point and in
+batch, checking that the batched dict output is identical. The TrackTable row
+runs the same arrays without the dict flatten and write-back. Run from the
+backend directory:
+
+    python benchmarks/geometry_benchmark.py --minutes 5
+"""
+
+import argparse
+import copy
+import gc
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import get_center_of_bbox, get_foot_position
+from view_transformer import ViewTransformer
+from pipeline import add_geometry_to_tracks, add_geometry_to_table
+from track_table import TrackTable
+
+
+def synthetic_tracks(num_frames, num_players, num_referees, seed=0):
+    rng = np.random.default_rng(seed)
+    tracks = {"players": [], "referees": [], "ball": []}
+    for _ in range(num_frames):
+        for name, count, first_id in (("players", num_players, 1), ("referees", num_referees, 100), ("ball", 1, 1)):
+            xy = rng.uniform([0, 200], [1920, 1080], size=(count, 2))
+            tracks[name].append({first_id + i: {"bbox": [x - 20.3, y - 80.7, x + 20.1, y]}
+                                 for i, (x, y) in enumerate(xy.tolist())})
+    # Optical flow reports float32 motion; frames below the threshold report 0.
+    camera_movement = rng.normal(0, 3, size=(num_frames, 2)).astype(np.float32)
+    camera_movement[::5] = 0
+    return tracks, [[x, y] for x, y in camera_movement]
+
+
+# --- Previous per-point implementations ---
+
+def per_point_positions(tracks):
+    for object, object_tracks in tracks.items():
+        for frame_num, track in enumerate(object_tracks):
+            for track_id, track_info in track.items():
+                bbox = track_info["bbox"]
+                if object == "ball":
+                    position = get_center_of_bbox(bbox)
+                else:
+                    position = get_foot_position(bbox)
+                track_info["position"] = position
+
+
+def per_point_adjust(tracks, camera_movement_per_frame):
+    for object, object_tracks in tracks.items():
+        for frame_num, track in enumerate(object_tracks):
+            for track_id, track_info in track.items():
+                position = track_info["position"]
+                camera_movement = camera_movement_per_frame[frame_num]
+                track_info["position_adjusted"] = (position[0] - camera_movement[0], position[1] - camera_movement[1])
+
+
+def per_point_transform(tracks, view_transformer):
+    for object, object_tracks in tracks.items():
+        for frame_num, track in enumerate(object_tracks):
+            for track_id, track_info in track.items():
+                position = np.array(track_info["position_adjusted"])
+                position_transformed = view_transformer.transform_point(position)
+                if position_transformed is not None:
+                    position_transformed = position_transformed.squeeze().tolist()
+                track_info["position_transformed"] = position_transformed
+
+
+def per_point_geometry(tracks, camera_movement_per_frame, view_transformer):
+    per_point_positions(tracks)
+    per_point_adjust(tracks, camera_movement_per_frame)
+    per_point_transform(tracks, view_transformer)
+
+
+def mismatches(expected, actual):
+    count = 0
+    for name in expected:
+        for expected_frame, actual_frame in zip(expected[name], actual[name]):
+            for track_id, expected_info in expected_frame.items():
+                actual_info = actual_frame[track_id]
+                for field in ("position", "position_adjusted", "position_transformed"):
+                    a, b = expected_info[field], actual_info[field]
+                    if (a is None) != (b is None) or (a is not None and list(map(float, a)) != list(map(float, b))):
+                        count += 1
+    return count
+
+
+def timed(fn):
+    # The write-back allocates one tuple per field per detection; keep the cyclic
+    # GC out of the timings so runs are comparable.
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-point vs batched geometry stages.")
+    parser.add_argument("--minutes", type=float, default=5.0, help="Synthetic clip length.")
+    parser.add_argument("--fps", type=float, default=25.0, help="Synthetic frame rate.")
+    parser.add_argument("--players", type=int, default=22, help="Players per frame.")
+    parser.add_argument("--referees", type=int, default=3, help="Referees per frame.")
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+    tracks, camera_movement = synthetic_tracks(num_frames, args.players, args.referees)
+    view_transformer = ViewTransformer()
+    expected, actual = copy.deepcopy(tracks), copy.deepcopy(tracks)
+    detections = sum(len(frame) for object_tracks in tracks.values() for frame in object_tracks)
+
+    per_point_seconds = timed(lambda: per_point_geometry(expected, camera_movement, view_transformer))
+    batched_seconds = timed(lambda: add_geometry_to_tracks(actual, camera_movement, view_transformer))
+    table = TrackTable.from_tracks(tracks)
+    table_seconds = timed(lambda: add_geometry_to_table(table, camera_movement, view_transformer))
+
+    print(f"{num_frames} frames, {detections} detections (cv2 {cv2.__version__})")
+    print(f"{'implementation':<16}{'total (s)':>11}{'per det (us)':>14}")
+    print(f"{'per-point':<16}{per_point_seconds:>11.3f}{per_point_seconds / detections * 1e6:>14.2f}")
+    print(f"{'batched dicts':<16}{batched_seconds:>11.3f}{batched_seconds / detections * 1e6:>14.2f}")
+    print(f"{'batched table':<16}{table_seconds:>11.3f}{table_seconds / detections * 1e6:>14.2f}")
+    print(f"speedup dicts {per_point_seconds / batched_seconds:.1f}x, table {per_point_seconds / table_seconds:.1f}x; "
+          f"mismatched fields vs per-point: {mismatches(expected, actual)}")
+
+
+if __name__ == "__main__":
+    main()
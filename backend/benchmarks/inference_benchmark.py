@@ -0,0 +1,111 @@
+"""Detector throughput and agreement with the baseline PyTorch path on a fixed clip.
+
+Each candidate is described as backend[:imgsz=N][:batch=N|auto][:half], e.g.
+
+    python benchmarks/inference_benchmark.py --video input_videos/08fd33_4.mp4 \
+        --configs torch:batch=auto onnx openvino:imgsz=480 openvino:half
+
+The baseline is the previous Tracker.detect_frames setup: torch, 640px, batch 20.
+Agreement counts boxes of the same class matched at IoU >= --iou.
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import iter_video_frames, match_boxes
+from trackers import DetectionEngine
+
+
+def parse_config(spec):
+    parts = spec.split(":")
+    config = {"backend": parts[0], "imgsz": None, "batch_size": 20, "half": False}
+    for part in parts[1:]:
+        if part == "half":
+            config["half"] = True
+        elif part.startswith("imgsz="):
+            config["imgsz"] = int(part.split("=", 1)[1])
+        elif part.startswith("batch="):
+            value = part.split("=", 1)[1]
+            config["batch_size"] = value if value == "auto" else int(value)
+        else:
+            raise ValueError(f"Unknown option '{part}' in config '{spec}'")
+    return config
+
+
+def boxes_by_class(result):
+    # {class_name: (N, 4) xyxy array} for one frame of ultralytics output.
+    xyxy = np.asarray(result.boxes.xyxy.cpu()).reshape(-1, 4)
+    classes = np.asarray(result.boxes.cls.cpu()).astype(int)
+    grouped = {}
+    for class_id in np.unique(classes):
+        grouped[result.names[int(class_id)]] = xyxy[classes == class_id]
+    return grouped
+
+
+def agreement(baseline, candidate, iou_threshold):
+    matched = baseline_total = candidate_total = 0
+    ious = []
+    for base_frame, cand_frame in zip(baseline, candidate):
+        for name in set(base_frame) | set(cand_frame):
+            base_boxes = base_frame.get(name, np.zeros((0, 4)))
+            cand_boxes = cand_frame.get(name, np.zeros((0, 4)))
+            matches = match_boxes(base_boxes, cand_boxes, iou_threshold)
+            matched += len(matches)
+            ious += [iou for _, _, iou in matches]
+            baseline_total += len(base_boxes)
+            candidate_total += len(cand_boxes)
+    recall = matched / baseline_total if baseline_total else 1.0
+    precision = matched / candidate_total if candidate_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "recall": recall,
+        "precision": precision,
+        "f1": f1,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+    }
+
+
+def run_config(model_path, config, frames):
+    engine = DetectionEngine(model_path, **config)
+    # Warm up once so model load and graph compilation are not timed.
+    engine.predict(frames[:1])
+    start = time.perf_counter()
+    results = engine.predict(frames)
+    elapsed = time.perf_counter() - start
+    return engine.describe(), len(frames) / elapsed, [boxes_by_class(r) for r in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detector FPS and agreement vs the PyTorch baseline.")
+    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Path to input video.")
+    parser.add_argument("--model", default="models/best.pt", help="Path to detector weights.")
+    parser.add_argument("--max-frames", type=int, default=120, help="Frames in the fixed clip.")
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU threshold for matching boxes.")
+    parser.add_argument("--configs", nargs="+", default=["torch:batch=auto", "onnx", "openvino"],
+                        help="Candidate configurations to compare against the baseline.")
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(iter_video_frames(args.video), args.max_frames))
+    if not frames:
+        raise ValueError(f"No frames read from video: {args.video}")
+
+    baseline_config = {"backend": "torch", "imgsz": None, "batch_size": 20, "half": False}
+    _, baseline_fps, baseline = run_config(args.model, baseline_config, frames)
+
+    print(f"{len(frames)} frames, baseline torch@640 batch 20: {baseline_fps:.2f} fps")
+    print(f"{'config':<28}{'batch':>7}{'fps':>9}{'speedup':>9}{'recall':>8}{'prec':>8}{'f1':>7}{'mIoU':>7}")
+    for spec in args.configs:
+        described, fps, detections = run_config(args.model, parse_config(spec), frames)
+        score = agreement(baseline, detections, args.iou)
+        print(f"{spec:<28}{described['batch_size']:>7}{fps:>9.2f}{fps / baseline_fps:>9.2f}"
+              f"{score['recall']:>8.3f}{score['precision']:>8.3f}{score['f1']:>7.3f}{score['mean_iou']:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Keyframe detection speedup vs tracking quality on a reference clip.
+
+Every-frame detection is the reference. Each candidate is described as
+interval[:cam=PIXELS][:speed=PIXELS_PER_FRAME], e.g.
+
+    python benchmarks/keyframe_benchmark.py --video input_videos/08fd33_4.mp4 \
+        --configs 2 3 5 5:cam=8 5:speed=6
+
+Box quality is the IoU of candidate player boxes matched to the reference
+boxes. An ID switch is counted whenever a reference track is matched to a
+different candidate ID than on its previous matched frame.
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import iter_video_frames, iter_frame_chunks, match_boxes
+from trackers import Tracker, DetectionEngine, KeyframeDetector
+from camera_movement_estimator import CameraMovementEstimator
+
+
+def parse_config(spec):
+    parts = spec.split(":")
+    config = {"interval": int(parts[0]), "camera_motion_threshold": None, "track_speed_threshold": None}
+    for part in parts[1:]:
+        key, value = part.split("=", 1)
+        if key == "cam":
+            config["camera_motion_threshold"] = float(value)
+        elif key == "speed":
+            config["track_speed_threshold"] = float(value)
+        else:
+            raise ValueError(f"Unknown option '{part}' in config '{spec}'")
+    return config
+
+
+def run_reference(model_path, engine, frames, chunk_size):
+    tracker = Tracker(model_path, engine=engine)
+    players = []
+    start = time.perf_counter()
+    for chunk in iter_frame_chunks(frames, chunk_size):
+        players += tracker.tracks_from_detections(tracker.detect_frames(chunk))["players"]
+    return players, time.perf_counter() - start
+
+
+def run_keyframes(model_path, engine, frames, camera_movement, chunk_size, config):
+    detector = KeyframeDetector(Tracker(model_path, engine=engine), **config)
+    players = []
+    start = time.perf_counter()
+    for index, chunk in enumerate(iter_frame_chunks(frames, chunk_size)):
+        chunk_camera = camera_movement[index * chunk_size:index * chunk_size + len(chunk)]
+        players += detector.get_chunk_tracks(chunk, chunk_camera)["players"]
+    return players, time.perf_counter() - start, detector.detection_ratio()
+
+
+def compare(reference, candidate, iou_threshold):
+    ious = []
+    reference_boxes = 0
+    id_switches = 0
+    last_match = {}
+    for ref_frame, cand_frame in zip(reference, candidate):
+        ref_ids = list(ref_frame)
+        cand_ids = list(cand_frame)
+        reference_boxes += len(ref_ids)
+        matches = match_boxes([ref_frame[i]["bbox"] for i in ref_ids],
+                              [cand_frame[i]["bbox"] for i in cand_ids], iou_threshold)
+        for ref_index, cand_index, iou in matches:
+            ious.append(iou)
+            ref_id, cand_id = ref_ids[ref_index], cand_ids[cand_index]
+            if ref_id in last_match and last_match[ref_id] != cand_id:
+                id_switches += 1
+            last_match[ref_id] = cand_id
+    return {
+        "recall": len(ious) / reference_boxes if reference_boxes else 1.0,
+        "mean_iou": float(np.mean(ious)) if ious else 0.0,
+        "id_switches": id_switches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyframe detection speedup vs ID switches and box IoU.")
+    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Path to the reference clip.")
+    parser.add_argument("--model", default="models/best.pt", help="Path to detector weights.")
+    parser.add_argument("--max-frames", type=int, default=300, help="Frames of the clip to use.")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Frames per chunk, as in the streaming pipeline.")
+    parser.add_argument("--iou", type=float, default=0.3, help="IoU threshold for matching candidate to reference boxes.")
+    parser.add_argument("--configs", nargs="+", default=["2", "3", "5", "5:cam=8", "5:speed=6"],
+                        help="Keyframe configurations to compare.")
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(iter_video_frames(args.video), args.max_frames))
+    if not frames:
+        raise ValueError(f"No frames read from video: {args.video}")
+    camera_movement = CameraMovementEstimator(frames[0]).get_camera_movement(frames)
+
+    engine = DetectionEngine(args.model)
+    engine.predict(frames[:1])
+    reference, reference_seconds = run_reference(args.model, engine, frames, args.chunk_size)
+
+    print(f"{len(frames)} frames, every-frame reference: {len(frames) / reference_seconds:.2f} fps")
+    print(f"{'config':<16}{'detected':>10}{'fps':>9}{'speedup':>9}{'recall':>8}{'mIoU':>7}{'ID sw':>7}")
+    for spec in args.configs:
+        candidate, seconds, ratio = run_keyframes(args.model, engine, frames, camera_movement,
+                                                  args.chunk_size, parse_config(spec))
+        score = compare(reference, candidate, args.iou)
+        print(f"{spec:<16}{ratio * 100:>9.0f}%{len(frames) / seconds:>9.2f}{reference_seconds / seconds:>9.2f}"
+              f"{score['recall']:>8.3f}{score['mean_iou']:>7.3f}{score['id_switches']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Time to first frame and bytes per seek when a player streams a rendered MP4.
+
+Writes a clip with OpenCV (moov box after the media data, as the renderers wrote it
+before) and a faststart copy, serves them over HTTP and replays what a browser
+player does: read from byte 0 until the moov box and the first frame's sample
+have arrived (fetching the moov from the end of the file first when it is not at
+the start), then seek to --seeks random frames, fetching each from the preceding
+keyframe. Modes:
+
+    full        whole-file responses, no ranges; moov last
+    send_file   Flask send_file (the previous endpoint); moov last
+    send_media  media_server.send_media; faststart
+
+Time to first frame is measured on loopback and also modeled for a link with
+--rtt-ms latency and --mbps bandwidth (requests x RTT + bytes / bandwidth). The
+first frame is decoded from the fetched bytes alone to check the player had
+enough. Run from the backend directory:
+
+    python benchmarks/media_seek_benchmark.py --seconds 60 --seeks 20
+    python benchmarks/media_seek_benchmark.py --video output_videos/<id>_analyzed.mp4
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import cv2
+import numpy as np
+from flask import Flask, send_file
+from werkzeug.serving import make_server
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from media_server import send_media
+from utils.mp4_boxes import (faststart, iter_boxes, read_moov, top_level_boxes, video_sample_ends,
+                             video_sample_starts, video_sync_samples)
+
+READ_SIZE = 64 * 1024
+
+
+def write_clip(path, seconds, fps, width, height):
+    # Moving content with some noise, so samples have realistic, varying sizes.
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    for frame_num in range(int(seconds * fps)):
+        frame = np.roll(background, frame_num * 4, axis=1)
+        cv2.putText(frame, str(frame_num), (40, height // 2), cv2.FONT_HERSHEY_SIMPLEX, 3, (255, 255, 255), 6)
+        writer.write(frame)
+    writer.release()
+
+
+def media_app(paths):
+    app = Flask(__name__)
+
+    @app.route("/full/<name>")
+    def full(name):
+        return send_file(paths[name], mimetype="video/mp4", conditional=False)
+
+    @app.route("/send_file/<name>")
+    def send_file_mode(name):
+        return send_file(paths[name], mimetype="video/mp4")
+
+    @app.route("/send_media/<name>")
+    def send_media_mode(name):
+        return send_media(paths[name], "video/mp4")
+    return app
+
+
+class Player:
+    # Fetches byte spans of one URL like a progressive video player and records the
+    # bytes it received and the requests it made.
+    def __init__(self, url, size):
+        self.url = url
+        self.size = size
+        self.requests = 0
+        self.bytes = 0
+        self.spans = []
+
+    def open(self, start=0, end=None):
+        self.requests += 1
+        headers = {"Range": f"bytes={start}-{'' if end is None else end - 1}"}
+        response = urllib.request.urlopen(urllib.request.Request(self.url, headers=headers))
+        # A 200 answer to a Range request starts at byte 0.
+        return response, (start if response.status == 206 else 0)
+
+    def read(self, start, end):
+        # Bytes [start, end), reading a whole-file response from byte 0 if need be.
+        response, offset = self.open(start, end)
+        chunks = []
+        with response:
+            while offset < end:
+                data = response.read(min(READ_SIZE, end - offset))
+                if not data:
+                    break
+                self.bytes += len(data)
+                if offset + len(data) > start:
+                    chunks.append(data[max(start - offset, 0):])
+                offset += len(data)
+        data = b"".join(chunks)[:end - start]
+        self.spans.append((start, data))
+        return data
+
+    def start(self):
+        # Read from byte 0 box by box; returns the moov bytes and first sample span.
+        response, offset = self.open(0)
+        buffered = b""
+        with response:
+            while True:
+                data = response.read(READ_SIZE)
+                self.bytes += len(data)
+                buffered += data
+                boxes = list(iter_boxes(buffered))
+                moov = next(((start, end) for box_type, start, end in boxes if box_type == b"moov"), None)
+                mdat = next(((start, end) for box_type, start, end in boxes if box_type == b"mdat"), None)
+                if moov is not None and moov[1] <= len(buffered):
+                    moov_bytes = buffered[moov[0] - 8:moov[1]]
+                    end = int(video_sample_ends(moov_bytes)[0])
+                    while len(buffered) < end:
+                        data = response.read(READ_SIZE)
+                        self.bytes += len(data)
+                        buffered += data
+                    self.spans.append((0, buffered))
+                    return moov_bytes
+                if mdat is not None and (moov is None or moov[0] > mdat[0]) or not data:
+                    break
+        # moov after mdat: fetch it from the end, then the first sample.
+        self.spans.append((0, buffered))
+        moov_bytes = self.read(mdat[1], self.size)
+        starts, ends = video_sample_starts(moov_bytes), video_sample_ends(moov_bytes)
+        self.read(int(starts[0]), int(ends[0]))
+        return moov_bytes
+
+    def decodes_first_frame(self, directory):
+        # Decode frame 0 from a sparse copy holding only the fetched bytes.
+        path = os.path.join(directory, "fetched.mp4")
+        with open(path, 'wb') as f:
+            f.truncate(self.size)
+            for start, data in self.spans:
+                f.seek(start)
+                f.write(data)
+        capture = cv2.VideoCapture(path)
+        ok, _ = capture.read()
+        capture.release()
+        return ok
+
+
+def run_mode(base_url, mode, name, size, seek_frames, tmp):
+    url = f"{base_url}/{mode}/{name}"
+    player = Player(url, size)
+    start = time.perf_counter()
+    moov = player.start()
+    first_frame_seconds = time.perf_counter() - start
+    startup = (player.requests, player.bytes, first_frame_seconds, player.decodes_first_frame(tmp))
+
+    starts, ends = video_sample_starts(moov), video_sample_ends(moov)
+    sync = video_sync_samples(moov)
+    seek_bytes, seek_seconds = [], []
+    for frame_num in seek_frames:
+        keyframe = frame_num if sync is None else int(sync[np.searchsorted(sync, frame_num, side="right") - 1])
+        before = player.bytes
+        start = time.perf_counter()
+        player.read(int(starts[keyframe]), int(ends[frame_num]))
+        seek_seconds.append(time.perf_counter() - start)
+        seek_bytes.append(player.bytes - before)
+
+    # Revalidating the cached file: 304 without a body when validators are supported.
+    request = urllib.request.Request(url, method="HEAD")
+    with urllib.request.urlopen(request) as response:
+        etag = response.headers.get("ETag")
+    revalidation = "no ETag"
+    if etag:
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers={"If-None-Match": etag})) as response:
+                revalidation = f"{response.status} {len(response.read()) / 1e6:.1f}MB"
+        except urllib.error.HTTPError as e:
+            revalidation = str(e.code)
+    return startup, np.asarray(seek_bytes), np.asarray(seek_seconds), revalidation
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first frame and bytes per seek of a served MP4.")
+    parser.add_argument("--video", default=None, help="MP4 to serve (default: a synthetic clip).")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Synthetic clip length.")
+    parser.add_argument("--fps", type=int, default=25, help="Synthetic clip frame rate.")
+    parser.add_argument("--size", default="1280x720", help="Synthetic clip size WxH.")
+    parser.add_argument("--seeks", type=int, default=20, help="Random seeks per mode.")
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="Modeled round trip time.")
+    parser.add_argument("--mbps", type=float, default=20.0, help="Modeled bandwidth in Mbit/s.")
+    args = parser.parse_args()
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"moov_last.mp4": os.path.join(tmp, "moov_last.mp4"), "faststart.mp4": os.path.join(tmp, "faststart.mp4")}
+        if args.video:
+            shutil.copyfile(args.video, paths["moov_last.mp4"])
+        else:
+            width, height = (int(value) for value in args.size.split("x"))
+            write_clip(paths["moov_last.mp4"], args.seconds, args.fps, width, height)
+        shutil.copyfile(paths["moov_last.mp4"], paths["faststart.mp4"])
+        faststart(paths["faststart.mp4"])
+        layout = [box[0].decode() for box in top_level_boxes(paths["moov_last.mp4"])]
+        if layout.index("moov") < layout.index("mdat"):
+            print("note: the input is already faststart, so every mode reads it with the moov first")
+
+        server = make_server("127.0.0.1", 0, media_app(paths), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        size = os.path.getsize(paths["moov_last.mp4"])
+        frame_count = len(video_sample_ends(read_moov(paths["faststart.mp4"])))
+        seek_frames = np.random.default_rng(1).integers(0, frame_count, size=args.seeks)
+        print(f"{size / 1e6:.1f} MB, {frame_count} frames, {args.seeks} seeks; "
+              f"modeled link {args.rtt_ms:g} ms RTT, {args.mbps:g} Mbit/s")
+        print(f"{'mode':<12}{'req':>5}{'bytes':>11}{'loopback ms':>13}{'modeled ms':>12}"
+              f"{'decodes':>9}{'KB/seek':>10}{'seek ms':>9}{'revalidate':>14}")
+        bytes_per_second = args.mbps * 1e6 / 8
+        for mode, name in (("full", "moov_last.mp4"), ("send_file", "moov_last.mp4"),
+                           ("send_media", "faststart.mp4")):
+            (requests, fetched, seconds, decodes), seek_bytes, seek_seconds, revalidation = run_mode(
+                base_url, mode, name, size, seek_frames, tmp)
+            modeled = requests * args.rtt_ms + fetched / bytes_per_second * 1000
+            print(f"{mode:<12}{requests:>5}{fetched / 1e6:>9.2f}MB{seconds * 1000:>13.1f}{modeled:>12.0f}"
+                  f"{'yes' if decodes else 'no':>9}{seek_bytes.mean() / 1e3:>10.0f}{seek_seconds.mean() * 1000:>9.1f}"
+                  f"{revalidation:>14}")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
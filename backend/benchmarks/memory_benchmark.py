@@ -0,0 +1,102 @@
+"""Compare peak RSS of the list-based pipeline against the streaming pipeline.
+
+Each mode runs in a fresh child process so its peak resident set size is
+measured in isolation. Run from the backend directory:
+
+    python benchmarks/memory_benchmark.py --video input_videos/08fd33_4.mp4
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(BACKEND_DIR))
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def run_child(args):
+    # Executed inside the child process: run one pipeline mode and report its peak RSS.
+    import main as pipeline_main
+
+    pipeline_args = pipeline_main.build_parser().parse_args([
+        "--video", args.video,
+        "--output", args.output,
+        "--cache-dir", args.cache_dir,
+        "--chunk-size", str(args.chunk_size),
+    ] + ([] if args.use_cache else ["--no-cache"]))
+
+    start = time.perf_counter()
+    if args.mode == "stream":
+        pipeline_main.run_streaming(pipeline_args)
+    else:
+        pipeline_main.run_in_memory(pipeline_args)
+    elapsed = time.perf_counter() - start
+
+    print(json.dumps({"mode": args.mode, "peak_rss_mb": round(peak_rss_mb(), 1),
+                      "seconds": round(elapsed, 2)}))
+
+
+def run_mode(args, mode, chunk_size, output_dir):
+    output = os.path.join(output_dir, f"benchmark_{mode}_{chunk_size}.avi")
+    cmd = [
+        sys.executable, __file__, "--child", "--mode", mode,
+        "--video", args.video, "--output", output,
+        "--cache-dir", args.cache_dir, "--chunk-size", str(chunk_size),
+    ]
+    if args.use_cache:
+        cmd.append("--use-cache")
+    result = subprocess.run(cmd, cwd=str(BACKEND_DIR), check=True, capture_output=True, text=True)
+    # The report is the last JSON line; model/tracker logging may precede it.
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    report["chunk_size"] = chunk_size if mode == "stream" else None
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peak memory: list-based vs streaming pipeline.")
+    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Path to input video.")
+    parser.add_argument("--chunk-sizes", default="16,64", help="Comma-separated chunk sizes to test in streaming mode.")
+    parser.add_argument("--use-cache", action="store_true", help="Reuse the analysis cache to skip inference.")
+    parser.add_argument("--cache-dir", default="stubs/cache", help="Analysis cache directory.")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["list", "stream"], default="list", help=argparse.SUPPRESS)
+    parser.add_argument("--output", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--chunk-size", type=int, default=64, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    args.video = str(Path(args.video).resolve())
+    chunk_sizes = [int(size) for size in args.chunk_sizes.split(",") if size.strip()]
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        reports = [run_mode(args, "list", 0, output_dir)]
+        for chunk_size in chunk_sizes:
+            reports.append(run_mode(args, "stream", chunk_size, output_dir))
+
+    baseline = reports[0]["peak_rss_mb"]
+    print(f"{'mode':<8}{'chunk':>8}{'peak RSS (MB)':>16}{'vs list':>10}{'time (s)':>10}")
+    for report in reports:
+        chunk = report["chunk_size"] if report["chunk_size"] is not None else "-"
+        ratio = report["peak_rss_mb"] / baseline if baseline else 0
+        print(f"{report['mode']:<8}{chunk:>8}{report['peak_rss_mb']:>16.1f}{ratio:>10.2f}{report['seconds']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
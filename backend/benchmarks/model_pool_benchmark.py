@@ -0,0 +1,67 @@
+"""Time to first detection per job: a new detector per job vs the warm ModelPool.
+
+Runs --jobs consecutive jobs on the first --frames frames of a clip. The per-job
+path is the previous run_pipeline setup (DetectionEngine + Tracker built for every
+job, reloading best.pt); the pooled path warms the replicas once, then lends one
+to each job inside a fresh Tracker. Time to first detection is measured from the
+start of the job until the first chunk's tracks exist. Run from the backend
+directory:
+
+    python benchmarks/model_pool_benchmark.py --video input_videos/08fd33_4.mp4 --jobs 4
+"""
+
+import argparse
+import itertools
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import iter_video_frames
+from trackers import Tracker, DetectionEngine, ModelPool
+
+
+def first_detection(tracker, frames):
+    # Detect and track the first chunk, as the streaming pipeline's first stages do.
+    return tracker.tracks_from_supervision(tracker.to_supervision(tracker.detect_frames(frames)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-job detector loading vs the warm model pool.")
+    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Input clip.")
+    parser.add_argument("--model", default="models/best.pt", help="Detector weights.")
+    parser.add_argument("--jobs", type=int, default=4, help="Consecutive jobs to time.")
+    parser.add_argument("--frames", type=int, default=20, help="Frames in the first chunk.")
+    parser.add_argument("--backend", default="torch", help="Detector backend.")
+    args = parser.parse_args()
+
+    frames = list(itertools.islice(iter_video_frames(args.video), args.frames))
+
+    per_job = []
+    for _ in range(args.jobs):
+        start = time.perf_counter()
+        tracker = Tracker(args.model, engine=DetectionEngine(args.model, backend=args.backend))
+        first_detection(tracker, frames)
+        per_job.append(time.perf_counter() - start)
+
+    pool = ModelPool(args.model, replicas=1, backend=args.backend)
+    start = time.perf_counter()
+    pool.warm()
+    warm_seconds = time.perf_counter() - start
+    pooled = []
+    for _ in range(args.jobs):
+        start = time.perf_counter()
+        with pool.tracker() as tracker:
+            first_detection(tracker, frames)
+        pooled.append(time.perf_counter() - start)
+
+    print(f"{args.jobs} jobs, first chunk of {len(frames)} frames, backend {args.backend}; "
+          f"pool warm-up at startup {warm_seconds:.2f}s")
+    print(f"{'job':<6}{'per-job load (s)':>18}{'pooled (s)':>12}")
+    for index, (cold, warm) in enumerate(zip(per_job, pooled), 1):
+        print(f"{index:<6}{cold:>18.3f}{warm:>12.3f}")
+    print(pool.stats())
+
+
+if __name__ == "__main__":
+    main()
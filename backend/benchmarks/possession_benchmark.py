@@ -0,0 +1,132 @@
+"""Per-frame possession loop vs the batched possession engine.
+
+Builds synthetic tracks where the ball is passed between players and sometimes
+runs loose, then times the previous per-frame assign_ball_to_player loop (with
+its team control accumulation) against the batched engine on dicts and on a
+TrackTable, checking that possessors and team control are identical with
+hysteresis off. A last run shows how hysteresis reduces possession flicker.
+Run from the backend directory:
+
+    python benchmarks/possession_benchmark.py --minutes 10
+"""
+
+import argparse
+import copy
+import gc
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from player_ball_assigner import PlayerBallAssigner
+from track_table import TrackTable
+
+
+def synthetic_tracks(num_frames, num_players, seed=0):
+    # Players drift on a 1920x1080 frame; the ball sits at a random player's feet
+    # (changing every ~2 s), jitters around it, and is loose or missing sometimes.
+    # Integer boxes make exact distance ties common.
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform([100, 100], [1800, 1000], size=(num_players, 2))
+    teams = rng.integers(1, 3, size=num_players)
+    holder = 0
+    tracks = {"players": [], "referees": [], "ball": []}
+    for _ in range(num_frames):
+        xy = np.clip(xy + rng.normal(0, 3, size=xy.shape), [50, 100], [1870, 1050])
+        if rng.random() < 1 / 50:
+            holder = int(rng.integers(num_players))
+        players = {}
+        for player_id in rng.permutation(num_players).tolist():
+            x, y = np.round(xy[player_id]).tolist()
+            players[player_id + 1] = {"bbox": [x - 20, y - 80, x + 20, y], "team": int(teams[player_id])}
+        tracks["players"].append(players)
+        tracks["referees"].append({})
+        if rng.random() < 0.05:
+            tracks["ball"].append({})
+            continue
+        foot = xy[holder] + rng.normal(0, 40 if rng.random() < 0.8 else 120, size=2)
+        tracks["ball"].append({1: {"bbox": [foot[0] - 8, foot[1] - 8, foot[0] + 8, foot[1] + 8]}})
+    return tracks
+
+
+def per_frame_possession(tracks):
+    # The previous team_ball_control loop of main.py / StreamingPipeline.
+    player_assigner = PlayerBallAssigner()
+    team_ball_control = []
+    for frame_num, player_track in enumerate(tracks["players"]):
+        if 1 not in tracks["ball"][frame_num]:
+            assigned_player = -1
+        else:
+            ball_bbox = tracks["ball"][frame_num][1]["bbox"]
+            assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
+
+        if assigned_player != -1:
+            tracks["players"][frame_num][assigned_player]["has_ball"] = True
+            team_ball_control.append(tracks["players"][frame_num][assigned_player]["team"])
+        else:
+            team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
+    return np.array(team_ball_control)
+
+
+def has_ball_rows(tracks):
+    return [(frame_num, player_id) for frame_num, players in enumerate(tracks["players"])
+            for player_id, player in players.items() if player.get("has_ball")]
+
+
+def switches(possessor):
+    held = possessor[possessor >= 0]
+    return int(np.count_nonzero(held[1:] != held[:-1]))
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-frame vs batched ball possession.")
+    parser.add_argument("--minutes", type=float, default=10.0, help="Synthetic clip length.")
+    parser.add_argument("--fps", type=float, default=25.0, help="Synthetic frame rate.")
+    parser.add_argument("--players", type=int, default=22, help="Players per frame.")
+    parser.add_argument("--min-frames", type=int, default=5, help="Hysteresis: frames a new possessor must hold the ball.")
+    parser.add_argument("--release-frames", type=int, default=12, help="Hysteresis: loose-ball frames that keep the possessor.")
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+    tracks = synthetic_tracks(num_frames, args.players)
+    expected, actual = copy.deepcopy(tracks), copy.deepcopy(tracks)
+    table = TrackTable.from_tracks(tracks)
+
+    expected_control, loop_seconds = timed(lambda: per_frame_possession(expected))
+    assigner = PlayerBallAssigner()
+    dict_control, dict_seconds = timed(lambda: assigner.add_possession_to_tracks(actual))
+    table_control, table_seconds = timed(lambda: PlayerBallAssigner().add_possession_to_table(table))
+    table_rows = sorted((int(frame), int(player_id)) for frame, player_id in
+                        zip(table.columns["frame"][table.has_ball], table.columns["track_id"][table.has_ball]))
+
+    print(f"{num_frames} frames, {args.players} players")
+    print(f"{'implementation':<16}{'seconds':>9}{'speedup':>9}")
+    print(f"{'per-frame loop':<16}{loop_seconds:>9.3f}")
+    print(f"{'batched dicts':<16}{dict_seconds:>9.3f}{loop_seconds / dict_seconds:>8.1f}x")
+    print(f"{'batched table':<16}{table_seconds:>9.3f}{loop_seconds / table_seconds:>8.1f}x")
+    print(f"identical with hysteresis off: dict possessors {has_ball_rows(expected) == has_ball_rows(actual)}, "
+          f"dict control {np.array_equal(expected_control, dict_control)}, "
+          f"table possessors {sorted(has_ball_rows(expected)) == table_rows}, "
+          f"table control {np.array_equal(expected_control, table_control)}")
+
+    smoothed = PlayerBallAssigner(min_possession_frames=args.min_frames, release_frames=args.release_frames)
+    smoothed.add_possession_to_tracks(copy.deepcopy(tracks))
+    print(f"possession switches: raw {switches(assigner.possessor)} ({len(assigner.spells)} spells), "
+          f"hysteresis {switches(smoothed.possessor)} ({len(smoothed.spells)} spells)")
+
+
+if __name__ == "__main__":
+    main()
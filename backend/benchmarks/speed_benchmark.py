@@ -0,0 +1,154 @@
+"""Runtime of the speed/distance estimator on a full match's worth of tracks.
+
+Times the vectorized estimator in every smoothing mode on a synthetic 90-minute
+TrackTable, then compares the previous per-window dict loop with the dict path
+(which keeps that loop in window mode and adds acceleration and the per-track
+summary) and the TrackTable path the pipeline runs on a shorter clip
+(whole-match dicts take several GB) and checks that window mode reproduces its
+speeds and distances. Run from the backend directory:
+
+    python benchmarks/speed_benchmark.py --minutes 90 --dict-minutes 10
+"""
+
+import argparse
+import copy
+import gc
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.signal import lfilter
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils import measure_distance
+from track_table import TrackTable, OBJECT_TYPES
+from track_table.track_table import empty_column
+from speed_and_distance_estimator import SpeedAndDistance_Estimator, SMOOTHING_METHODS
+
+
+def synthetic_columns(num_frames, num_players, fps, seed=0):
+    # Players move with smoothly varying velocity (an AR(1) process, ~2 m/s typical
+    # with occasional bursts past sprint speed) plus 10 cm of position noise. A
+    # player's track ID changes every ~2 minutes (as ByteTrack re-identifies) and ~3%
+    # of positions fall off the pitch.
+    rng = np.random.default_rng(seed)
+    velocity = lfilter([1.0], [1.0, -0.995], rng.normal(0, 0.2, size=(num_frames, num_players, 2)), axis=0)
+    xy = np.cumsum(velocity, axis=0) / fps + rng.uniform([0, 0], [23, 68], size=(num_players, 2))
+    xy += rng.normal(0, 0.1, size=xy.shape)
+    xy[rng.random((num_frames, num_players)) < 0.03] = np.nan
+    frames = np.repeat(np.arange(num_frames), num_players)
+    generation = frames // int(120 * fps)
+    track_ids = np.tile(np.arange(1, num_players + 1), num_frames) + generation * num_players
+    num_rows = len(frames)
+    columns = {
+        "frame": frames.astype(np.int32),
+        "track_id": track_ids.astype(np.int32),
+        "object_type": np.full(num_rows, OBJECT_TYPES.index("players"), dtype=np.int8),
+    }
+    for name in ("bbox", "position_transformed"):
+        columns[name] = empty_column(name, num_rows)
+    columns["position_transformed"][:] = xy.reshape(-1, 2)
+    return columns
+
+
+def table_to_player_tracks(table):
+    # Minimal dicts (position_transformed only) for the dict-based comparison.
+    positions = table.columns["position_transformed"].astype(np.float64)
+    players = []
+    for frame_num in range(table.num_frames):
+        rows = table.frame_rows("players", frame_num)
+        players.append({int(table.columns["track_id"][row]): {
+            "position_transformed": None if np.isnan(positions[row, 0]) else positions[row].tolist()}
+            for row in range(rows.start, rows.stop)})
+    return {"players": players, "referees": [{} for _ in players], "ball": [{} for _ in players]}
+
+
+def per_window_speed(tracks, frame_window=5, frame_rate=24):
+    # The previous SpeedAndDistance_Estimator.add_speed_and_distance_to_tracks.
+    total_distance = {}
+    for object, object_tracks in tracks.items():
+        if object == "ball" or object == "referees":
+            continue
+        number_of_frames = len(object_tracks)
+        for frame_num in range(0, number_of_frames, frame_window):
+            last_frame = min(frame_num + frame_window, number_of_frames - 1)
+            for track_id, _ in object_tracks[frame_num].items():
+                if track_id not in object_tracks[last_frame]:
+                    continue
+                start_position = object_tracks[frame_num][track_id]["position_transformed"]
+                end_position = object_tracks[last_frame][track_id]["position_transformed"]
+                if start_position is None or end_position is None:
+                    continue
+                distance_covered = measure_distance(start_position, end_position)
+                time_elapsed = (last_frame - frame_num) / frame_rate
+                speed_km_per_hour = distance_covered / time_elapsed * 3.6
+                total_distance.setdefault(object, {}).setdefault(track_id, 0)
+                total_distance[object][track_id] += distance_covered
+                for frame_num_batch in range(frame_num, last_frame):
+                    if track_id not in tracks[object][frame_num_batch]:
+                        continue
+                    tracks[object][frame_num_batch][track_id]["speed"] = speed_km_per_hour
+                    tracks[object][frame_num_batch][track_id]["distance"] = total_distance[object][track_id]
+
+
+def max_relative_error(expected, actual):
+    # Largest relative speed/distance difference, or inf if the set of rows differs.
+    worst = 0.0
+    for expected_frame, actual_frame in zip(expected["players"], actual["players"]):
+        for track_id, expected_info in expected_frame.items():
+            actual_info = actual_frame[track_id]
+            for field in ("speed", "distance"):
+                if (field in expected_info) != (field in actual_info):
+                    return float("inf")
+                if field in expected_info:
+                    a, b = expected_info[field], actual_info[field]
+                    worst = max(worst, abs(a - b) / max(abs(a), 1e-12))
+    return worst
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized speed/distance estimator runtime.")
+    parser.add_argument("--minutes", type=float, default=90.0, help="Synthetic match length for the table runs.")
+    parser.add_argument("--dict-minutes", type=float, default=10.0, help="Clip length for the dict comparison.")
+    parser.add_argument("--fps", type=float, default=25.0, help="Synthetic frame rate.")
+    parser.add_argument("--players", type=int, default=22, help="Players per frame.")
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+    table = TrackTable(num_frames, synthetic_columns(num_frames, args.players, args.fps))
+    print(f"table: {num_frames} frames, {len(table)} player rows")
+    print(f"{'smoothing':<12}{'seconds':>9}{'sprints':>9}")
+    for smoothing in SMOOTHING_METHODS:
+        estimator = SpeedAndDistance_Estimator(smoothing=smoothing)
+        summary, seconds = timed(lambda: estimator.add_speed_and_distance_to_table(table, frame_rate=args.fps))
+        sprints = sum(stats["sprints"] for stats in summary.get("players", {}).values())
+        print(f"{smoothing:<12}{seconds:>9.3f}{sprints:>9}")
+
+    dict_frames = int(args.dict_minutes * 60 * args.fps)
+    small = TrackTable(dict_frames, synthetic_columns(dict_frames, args.players, args.fps, seed=1))
+    tracks = table_to_player_tracks(small)
+    expected, actual = copy.deepcopy(tracks), copy.deepcopy(tracks)
+    _, loop_seconds = timed(lambda: per_window_speed(expected, frame_rate=args.fps))
+    _, dict_seconds = timed(lambda: SpeedAndDistance_Estimator().add_speed_and_distance_to_tracks(actual, frame_rate=args.fps))
+    # Both dict variants spend most of their time reading and writing per-row dicts,
+    # so the pipeline runs the table path over the columns instead.
+    _, table_seconds = timed(lambda: SpeedAndDistance_Estimator().add_speed_and_distance_to_table(small, frame_rate=args.fps))
+    print(f"dicts: {dict_frames} frames, per-window loop {loop_seconds:.3f}s, dict path {dict_seconds:.3f}s "
+          f"({loop_seconds / dict_seconds:.1f}x), table {table_seconds:.3f}s ({loop_seconds / table_seconds:.1f}x); "
+          f"max relative difference {max_relative_error(expected, actual):.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Crops per second of per-crop KMeans jersey colors vs the batched color engine.
+
+Renders synthetic broadcast-like frames (two kits with per-player shade, skin and
+hair on a noisy grass background), extracts every player's jersey color with the
+previous one-KMeans-fit-per-crop code and with each batched method, on full and
+subsampled crops, and checks that the team labels they produce agree. A longer
+clip with occluded crops then compares labeling each track from its first crop
+with the sampled majority vote.
+Run from the backend directory:
+
+    python benchmarks/team_color_benchmark.py --frames 50 --players 22
+"""
+
+import argparse
+import gc
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from team_assigner import TeamAssigner, COLOR_METHODS
+
+KITS = ((40, 40, 190), (225, 225, 225))  # BGR: red, white
+GRASS = (60, 140, 70)
+
+
+def synthetic_frames(num_frames, num_players, seed=0, occlusion=0.0):
+    # Each player keeps a kit and a slight shade of it; boxes are 60-150 px tall. With
+    # occlusion, that share of crops has the other kit covering most of the jersey.
+    rng = np.random.default_rng(seed)
+    kits = rng.integers(0, 2, size=num_players)
+    shades = rng.normal(0, 12, size=(num_players, 3))
+    grass = np.clip(rng.normal(GRASS, 10, size=(1080, 1920, 3)), 0, 255).astype(np.uint8)
+    frames, detections, truth = [], [], {}
+    for frame_num in range(num_frames):
+        frame = np.roll(grass, int(rng.integers(0, 1920)), axis=1)
+        players = {}
+        for player_id in range(1, num_players + 1):
+            height = int(rng.integers(60, 150))
+            width = int(height * rng.uniform(0.35, 0.5))
+            x1, y1 = int(rng.integers(0, 1920 - width)), int(rng.integers(0, 1080 - height))
+            kit = kits[player_id - 1]
+            if rng.random() < occlusion:
+                kit = 1 - kit
+            jersey = np.clip(np.array(KITS[kit]) + shades[player_id - 1], 0, 255)
+            body = frame[y1:y1 + height, x1 + width // 5:x1 + width - width // 5]
+            body[height // 6:height // 2] = np.clip(rng.normal(jersey, 8, size=body[height // 6:height // 2].shape), 0, 255)
+            head = body[:height // 6, body.shape[1] // 4:-body.shape[1] // 4]
+            head[:] = np.clip(rng.normal((70, 100, 150), 8, size=head.shape), 0, 255)
+            body[height // 2:] = np.clip(rng.normal((30, 30, 30), 8, size=body[height // 2:].shape), 0, 255)
+            players[player_id] = {"bbox": [x1, y1, x1 + width, y1 + height]}
+            truth[player_id] = int(kits[player_id - 1])
+        frames.append(frame)
+        detections.append(players)
+    return frames, detections, truth
+
+
+# --- Previous per-crop implementation ---
+
+def per_crop_player_color(frame, bbox):
+    image = frame[int(bbox[1]):int(bbox[3]), int(bbox[0]):int(bbox[2])]
+    top_half_image = image[0:int(image.shape[0] / 2), :]
+    kmeans = KMeans(n_clusters=2, init="k-means++", n_init=1)
+    kmeans.fit(top_half_image.reshape(-1, 3))
+    clustered_image = kmeans.labels_.reshape(top_half_image.shape[0], top_half_image.shape[1])
+    corner_clusters = [clustered_image[0, 0], clustered_image[0, -1], clustered_image[-1, 0], clustered_image[-1, -1]]
+    non_player_cluster = max(set(corner_clusters), key=corner_clusters.count)
+    return kmeans.cluster_centers_[1 - non_player_cluster]
+
+
+def all_crops(frames, detections):
+    return [(frame, player["bbox"]) for frame, players in zip(frames, detections) for player in players.values()]
+
+
+def team_labels(colors, first_frame_colors):
+    # The TeamAssigner rule: 2-means over the first frame's colors, then predict.
+    kmeans = KMeans(n_clusters=2, init="k-means++", n_init=10, random_state=0).fit(first_frame_colors)
+    return kmeans.predict(colors)
+
+
+def agreement(labels, reference):
+    # Team ids are arbitrary cluster indices, so compare up to swapping 1 and 2.
+    same = np.mean(labels == reference)
+    return max(same, 1 - same)
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-crop KMeans vs batched jersey colors.")
+    parser.add_argument("--frames", type=int, default=50, help="Synthetic frames.")
+    parser.add_argument("--players", type=int, default=22, help="Players per frame.")
+    parser.add_argument("--max-pixels", type=int, default=256,
+                        help="Also run each method on crops subsampled to about this many pixels (0 skips).")
+    parser.add_argument("--voting-frames", type=int, default=600, help="Frames of the long clip used for voting.")
+    parser.add_argument("--occlusion", type=float, default=0.2, help="Share of crops showing the other kit in that clip.")
+    args = parser.parse_args()
+
+    frames, detections, truth = synthetic_frames(args.frames, args.players)
+    crops = all_crops(frames, detections)
+    true_teams = np.array([truth[player_id] for players in detections for player_id in players])
+    first = len(detections[0])
+
+    reference, seconds = timed(lambda: np.array([per_crop_player_color(frame, bbox) for frame, bbox in crops]))
+    reference_labels = team_labels(reference, reference[:first])
+    # KMeans seeds randomly, so the per-crop path does not fully agree with itself either.
+    rerun = np.array([per_crop_player_color(frame, bbox) for frame, bbox in crops])
+    print(f"{len(crops)} crops in {args.frames} frames; per-crop KMeans {len(crops) / seconds:,.0f} crops/s, "
+          f"agreement with true kits {agreement(reference_labels, true_teams):.4f}, "
+          f"with a rerun {agreement(team_labels(rerun, rerun[:first]), reference_labels):.4f}")
+    print(f"{'method':<18}{'crops/s':>11}{'speedup':>9}{'same teams':>12}")
+    # Every pixel (the default), then opt-in subsampling: faster, but a few labels move.
+    settings = [None] + ([args.max_pixels] if args.max_pixels else [])
+    for method in COLOR_METHODS:
+        for max_pixels in settings:
+            team_assigner = TeamAssigner(color_method=method, max_pixels=max_pixels)
+            colors, method_seconds = timed(lambda: np.concatenate([
+                team_assigner.get_player_colors(frame, [player["bbox"] for player in players.values()])
+                for frame, players in zip(frames, detections)]))
+            labels = team_labels(colors, colors[:first])
+            name = method if max_pixels is None else f"{method} ({max_pixels} px)"
+            print(f"{name:<18}{len(crops) / method_seconds:>11,.0f}{seconds / method_seconds:>8.1f}x"
+                  f"{agreement(labels, reference_labels):>12.4f}")
+
+    # Long clip with occluded crops: first-sight labels vs sampled majority voting.
+    frames, detections, truth = synthetic_frames(args.voting_frames, args.players, seed=1, occlusion=args.occlusion)
+    true_teams = np.array(list(truth.values()))
+    print(f"voting: {args.voting_frames} frames, {args.occlusion:.0%} occluded crops")
+    print(f"{'assignment':<12}{'crops':>8}{'seconds':>9}{'correct':>9}")
+    for name, options in (("first sight", dict(samples_per_track=1, sample_budget=0)), ("voting", {})):
+        team_assigner = TeamAssigner(**options)
+
+        def run():
+            crops = sum(team_assigner.sample(frame_num, frame, players)
+                        for frame_num, (frame, players) in enumerate(zip(frames, detections)))
+            team_assigner.vote()
+            return crops
+
+        crops, seconds = timed(run)
+        teams = np.array([team_assigner.player_team_dict[player_id] for player_id in truth]) - 1
+        print(f"{name:<12}{crops:>8}{seconds:>9.3f}{agreement(teams, true_teams):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
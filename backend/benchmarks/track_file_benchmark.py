@@ -0,0 +1,130 @@
+"""File size and load time of pickled/JSON track dicts vs the binary track file.
+
+Builds the synthetic match of track_table_benchmark.py, writes it as a pickle of
+the nested dicts (the stub format), as indented and compact JSON (the artifact
+format) and as a track file, then times loading each back. Player feedback is
+generated both from the unpickled dicts and from the memory-mapped track file,
+which reads only the player columns, and the two outputs are compared. Run from
+the backend directory:
+
+    python benchmarks/track_file_benchmark.py --minutes 10
+"""
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from track_table import TrackTable, save_track_file, load_track_file
+from player_feedback import generate_player_feedback
+from track_table_benchmark import synthetic_tracks
+
+
+def timed(fn):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        return result, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def json_default(value):
+    return value.tolist() if isinstance(value, np.ndarray) else str(value)
+
+
+def feedback_differences(expected, actual):
+    # Fields of matching players whose values differ beyond float32 rounding.
+    differences = 0
+    for a, b in zip(expected, actual):
+        for field, value in a.items():
+            other = b.get(field)
+            if isinstance(value, float) and isinstance(other, float):
+                differences += abs(value - other) > 0.011
+            else:
+                differences += value != other
+    return differences + abs(len(expected) - len(actual))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pickle/JSON track dicts vs the binary track file.")
+    parser.add_argument("--minutes", type=float, default=10.0, help="Synthetic match length.")
+    parser.add_argument("--fps", type=int, default=25, help="Frames per second.")
+    parser.add_argument("--players", type=int, default=22, help="Players per frame.")
+    parser.add_argument("--referees", type=int, default=3, help="Referees per frame.")
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+    tracks = synthetic_tracks(num_frames, args.players, args.referees)
+    team_ball_control = np.random.default_rng(0).integers(0, 3, size=num_frames).astype(np.int8)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, name) for name in ("tracks.pkl", "tracks.json", "tracks.min.json",
+                                                            "match.tracks")}
+
+        def write_pickle():
+            with open(paths["tracks.pkl"], 'wb') as f:
+                pickle.dump(tracks, f)
+
+        def write_json(path, **options):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(tracks, f, default=json_default, **options)
+
+        def read_pickle():
+            with open(paths["tracks.pkl"], 'rb') as f:
+                return pickle.load(f)
+
+        def read_json(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        writes = {
+            "tracks.pkl": timed(write_pickle)[1],
+            "tracks.json": timed(lambda: write_json(paths["tracks.json"], indent=2))[1],
+            "tracks.min.json": timed(lambda: write_json(paths["tracks.min.json"], separators=(",", ":")))[1],
+            "match.tracks": timed(lambda: save_track_file(paths["match.tracks"], TrackTable.from_tracks(tracks),
+                                                          arrays={"team_ball_control": team_ball_control},
+                                                          metadata={"fps": args.fps}))[1],
+        }
+        loads = {
+            "tracks.pkl": read_pickle,
+            "tracks.json": lambda: read_json(paths["tracks.json"]),
+            "tracks.min.json": lambda: read_json(paths["tracks.min.json"]),
+            "match.tracks": lambda: load_track_file(paths["match.tracks"], mmap=False),
+        }
+        labels = {"tracks.pkl": "pickle dicts", "tracks.json": "JSON indent=2", "tracks.min.json": "JSON compact",
+                  "match.tracks": "track file"}
+
+        rows = sum(len(frame) for name in ("players", "referees", "ball") for frame in tracks[name])
+        print(f"{args.minutes:g} min at {args.fps} fps: {num_frames} frames, {rows} rows")
+        print(f"{'format':<16}{'size (MB)':>11}{'write (s)':>11}{'load (s)':>10}{'pickle / size':>17}")
+        baseline = os.path.getsize(paths["tracks.pkl"])
+        for name, load in loads.items():
+            size = os.path.getsize(paths[name])
+            _, seconds = timed(load)
+            print(f"{labels[name]:<16}{size / 1e6:>11.1f}{writes[name]:>11.2f}{seconds:>10.3f}{baseline / size:>16.2f}x")
+        _, mmap_seconds = timed(lambda: load_track_file(paths["match.tracks"]))
+        print(f"{'track file mmap':<16}{'':>11}{'':>11}{mmap_seconds:>10.4f}")
+
+        # Feedback end to end: load + aggregate, from the pickle vs the mapped file.
+        options = dict(output_folder=None, use_llm=False)
+        expected, pickle_seconds = timed(lambda: generate_player_feedback(read_pickle(), args.fps, "bench", **options))
+        actual, mapped_seconds = timed(lambda: generate_player_feedback(
+            load_track_file(paths["match.tracks"])[0], args.fps, "bench", **options))
+        print(f"\nplayer feedback from pickle {pickle_seconds:.2f}s, from mapped track file {mapped_seconds:.2f}s "
+              f"({pickle_seconds / mapped_seconds:.1f}x), {len(actual)} players, "
+              f"{feedback_differences(expected, actual)} differing fields")
+
+
+if __name__ == "__main__":
+    main()
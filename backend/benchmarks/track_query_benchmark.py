@@ -0,0 +1,80 @@
+"""Track query time and response size vs. match length, with and without the level pyramid.
+
+Writes synthetic UI tracks (22 players and the ball at --hz) for each of --minutes
+match lengths and times the queries a viewer makes against ArtifactStore.tracks:
+the whole match for an overview (heatmap, minimap) at --max-points positions per
+track, a zoomed --window seconds at full resolution, and two selected players over
+the first half. "level 0" answers the overview from the full-resolution windows
+(what a client had to download before levels existed); "pyramid" picks the level
+that fits --max-points. Queries run on a cold cache (max_bytes=0: every window
+is read and parsed) and again warm. Run from the backend directory:
+
+    python benchmarks/track_query_benchmark.py --minutes 10 45 90
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from artifact_store import ArtifactStore, write_tracks, artifacts_dir, track_level
+from artifacts_benchmark import synthetic_artifacts, VIDEO_ID
+
+
+def timed(query, repeats):
+    # (median seconds, response bytes) of repeated calls of query().
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        entry = query()
+        seconds.append(time.perf_counter() - start)
+    return float(np.median(seconds)), len(entry.encoded.get("gzip", entry.body))
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track queries vs. match length, with and without levels.")
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10.0, 45.0, 90.0], help="Match lengths.")
+    parser.add_argument("--hz", type=float, default=5.0, help="Track samples per second.")
+    parser.add_argument("--max-points", type=int, default=500, help="Overview positions per track.")
+    parser.add_argument("--window", type=float, default=30.0, help="Zoomed range in seconds.")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repeats per query.")
+    args = parser.parse_args()
+
+    print(f"{'minutes':>8}{'query':>22}{'level':>7}{'cold ms':>9}{'warm ms':>9}{'gzip KB':>9}{'all/level 0 MB':>16}")
+    for minutes in args.minutes:
+        artifacts = synthetic_artifacts(minutes, args.hz)
+        duration = artifacts["meta"]["duration"]
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = artifacts_dir(tmp, VIDEO_ID)
+            write_tracks(directory, artifacts["tracks"], duration, interval=1 / args.hz)
+            size = directory_bytes(directory / "tracks")
+            level0 = directory_bytes(directory / "tracks" / "0")
+            middle = float(int(duration / 2 // args.window) * args.window)
+            queries = {
+                "overview, level 0": dict(),
+                "overview, pyramid": dict(max_points=args.max_points),
+                f"{args.window:g}s window": dict(t0=middle, t1=middle + args.window),
+                "2 players, 1st half": dict(t1=duration / 2, ids=["p_3", "p_7"], max_points=args.max_points),
+            }
+            for label, query in queries.items():
+                cold_store, warm_store = ArtifactStore(tmp, max_bytes=0), ArtifactStore(tmp)
+                cold, _ = timed(lambda: cold_store.tracks(VIDEO_ID, **query), args.repeats)
+                warm_store.tracks(VIDEO_ID, **query)
+                warm, response_bytes = timed(lambda: warm_store.tracks(VIDEO_ID, **query), args.repeats)
+                level = track_level(warm_store.track_index(VIDEO_ID)[0], query.get("t0"), query.get("t1"),
+                                    query.get("max_points"))
+                print(f"{minutes:>8g}{label:>22}{level:>7}{cold * 1000:>9.1f}{warm * 1000:>9.2f}"
+                      f"{response_bytes / 1e3:>9.1f}{size / 1e6:>11.1f}/{level0 / 1e6:<4.1f}")
+
+
+if __name__ == "__main__":
+    main()
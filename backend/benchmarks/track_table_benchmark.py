@@ -0,0 +1,157 @@
+"""Memory and speed of the nested tracks dicts vs the columnar TrackTable.
+
+Builds a synthetic full-match track set (default: 90 minutes at 25 fps with
+22 players, 3 referees and the ball) with every field the pipeline adds, then
+times typical access patterns on both representations. Run from the backend
+directory:
+
+    python benchmarks/track_table_benchmark.py --minutes 90
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from track_table import TrackTable
+
+TEAM_COLORS = {1: np.array([200.0, 40.0, 40.0]), 2: np.array([240.0, 240.0, 240.0])}
+
+
+def synthetic_tracks(num_frames, num_players, num_referees, seed=0):
+    # Random-walk players with the fields the pipeline adds after all stages.
+    rng = np.random.default_rng(seed)
+    player_xy = rng.uniform([100, 300], [1800, 1000], size=(num_players, 2))
+    referee_xy = rng.uniform([100, 300], [1800, 1000], size=(num_referees, 2))
+    distance = np.zeros(num_players)
+    tracks = {"players": [], "referees": [], "ball": []}
+    for frame_num in range(num_frames):
+        step = rng.normal(0, 2.0, size=(num_players, 2))
+        player_xy += step
+        distance += np.hypot(step[:, 0], step[:, 1]) * 0.05
+        holder = int(rng.integers(num_players))
+        players = {}
+        for index in range(num_players):
+            x, y = player_xy[index]
+            team = 1 if index < num_players // 2 else 2
+            players[index + 1] = {
+                "bbox": [x - 20, y - 80, x + 20, y],
+                "position": (int(x), int(y)),
+                "position_adjusted": (x - 1.5, y + 0.5),
+                "position_transformed": [x / 80, y / 15],
+                "speed": float(abs(step[index, 0]) * 3.6),
+                "distance": float(distance[index]),
+                "team": team,
+                "team_color": TEAM_COLORS[team],
+            }
+            if index == holder:
+                players[index + 1]["has_ball"] = True
+        referees = {}
+        for index in range(num_referees):
+            x, y = referee_xy[index]
+            referees[100 + index] = {"bbox": [x - 20, y - 80, x + 20, y], "position": (int(x), int(y))}
+        bx, by = player_xy[holder]
+        tracks["players"].append(players)
+        tracks["referees"].append(referees)
+        tracks["ball"].append({1: {"bbox": [bx - 5, by - 5, bx + 5, by + 5]}})
+    return tracks
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+# --- Access patterns: nested dicts ---
+
+def dict_trajectories(tracks):
+    trajectories = {}
+    for frame_num, frame_tracks in enumerate(tracks["players"]):
+        for track_id, info in frame_tracks.items():
+            trajectories.setdefault(track_id, []).append(info["position_transformed"])
+    return {track_id: np.asarray(points) for track_id, points in trajectories.items()}
+
+
+def dict_team_counts(tracks):
+    return [sum(1 for info in frame_tracks.values() if info.get("team") == 1)
+            for frame_tracks in tracks["players"]]
+
+
+def dict_mean_speed(tracks):
+    totals, counts = {}, {}
+    for frame_tracks in tracks["players"]:
+        for track_id, info in frame_tracks.items():
+            if "speed" in info:
+                totals[track_id] = totals.get(track_id, 0.0) + info["speed"]
+                counts[track_id] = counts.get(track_id, 0) + 1
+    return {track_id: totals[track_id] / counts[track_id] for track_id in totals}
+
+
+# --- Access patterns: track table ---
+
+def table_trajectories(table):
+    positions = table.columns["position_transformed"]
+    return {track_id: positions[rows] for track_id, rows in table.iter_tracks("players")}
+
+
+def table_team_counts(table):
+    rows = table.object_rows("players")
+    frames = table.columns["frame"][rows]
+    return np.bincount(frames[table.columns["team"][rows] == 1], minlength=table.num_frames)
+
+
+def table_mean_speed(table):
+    rows = table.object_rows("players")
+    track_ids = table.columns["track_id"][rows]
+    speed = table.columns["speed"][rows].astype(np.float64)
+    valid = ~np.isnan(speed)
+    totals = np.bincount(track_ids[valid], weights=speed[valid])
+    counts = np.bincount(track_ids[valid])
+    present = np.flatnonzero(counts)
+    return dict(zip(present.tolist(), (totals[present] / counts[present]).tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Nested dict tracks vs columnar TrackTable.")
+    parser.add_argument("--minutes", type=float, default=90.0, help="Synthetic match length.")
+    parser.add_argument("--fps", type=float, default=25.0, help="Synthetic frame rate.")
+    parser.add_argument("--players", type=int, default=22, help="Players per frame.")
+    parser.add_argument("--referees", type=int, default=3, help="Referees per frame.")
+    args = parser.parse_args()
+
+    num_frames = int(args.minutes * 60 * args.fps)
+
+    tracemalloc.start()
+    tracks = synthetic_tracks(num_frames, args.players, args.referees)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    table, build_seconds = timed(lambda: TrackTable.from_tracks(tracks))
+
+    mb = 1024 * 1024
+    print(f"{num_frames} frames, {len(table)} rows")
+    print(f"memory: dicts {dict_bytes / mb:.1f} MB, table {table.nbytes / mb:.1f} MB "
+          f"({dict_bytes / table.nbytes:.1f}x smaller); from_tracks {build_seconds:.2f}s")
+
+    # Index build is part of the first per-track query; time it separately.
+    _, index_seconds = timed(lambda: table.track_rows("players", 1))
+    print(f"per-track index build: {index_seconds:.3f}s")
+
+    print(f"{'operation':<20}{'dicts (s)':>11}{'table (s)':>11}{'speedup':>9}")
+    for name, dict_fn, table_fn in (
+        ("trajectories", dict_trajectories, table_trajectories),
+        ("per-frame counts", dict_team_counts, table_team_counts),
+        ("mean speed", dict_mean_speed, table_mean_speed),
+    ):
+        _, dict_seconds = timed(lambda: dict_fn(tracks))
+        _, table_seconds = timed(lambda: table_fn(table))
+        print(f"{name:<20}{dict_seconds:>11.3f}{table_seconds:>11.4f}{dict_seconds / table_seconds:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
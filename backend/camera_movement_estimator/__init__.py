@@ -1,2 +1,3 @@
-from .camera_movement_estimator import CameraMovementEstimator
+from .camera_movement_estimator import CameraMovementEstimator, ESTIMATION_METHODS
+from .segmented import SegmentedCameraMovement, DEFAULT_SEGMENT_FRAMES, DEFAULT_OVERLAP_FRAMES
 """Camera movement estimation utilities."""
@@ -1,15 +1,36 @@
 """Estimate camera motion between frames using optical flow."""
 
-import pickle
 import cv2
 import numpy as np
-import os
 import sys 
 sys.path.append('../')
-from utils import measure_distance,measure_xy_distance
+from utils import flatten_tracks,warp_points
+
+# max: the original estimate, the single largest feature displacement, ignored below
+# minimum_distance pixels, with features re-detected only after such a move.
+# median: per-axis median of all tracked feature displacements.
+# affine / homography: RANSAC fit of a partial affine (pan, rotation, zoom) or full
+# homography to all tracked features. The robust methods track features frame to
+# frame on a downscaled pyramid level and re-detect them on a fixed schedule.
+ESTIMATION_METHODS = ("max", "median", "affine", "homography")
 
 class CameraMovementEstimator():
-    def __init__(self,frame):
+    def __init__(self,frame,method="max",pyramid_levels=None,reseed_interval=10,min_features=20,
+                 ransac_threshold=1.0):
+        # pyramid_levels: times the grayscale frame is halved (cv2.pyrDown) before
+        # feature detection and optical flow; None is 0 for max and 1 otherwise.
+        # reseed_interval: robust methods re-detect features every this many frames, or
+        # sooner when fewer than min_features are still tracked.
+        # ransac_threshold: inlier distance in pixels at the pyramid level.
+        if method not in ESTIMATION_METHODS:
+            raise ValueError(f"Unknown camera estimation method '{method}', expected one of {ESTIMATION_METHODS}")
+        self.method = method
+        self.pyramid_levels = (0 if method == "max" else 1) if pyramid_levels is None else max(int(pyramid_levels),0)
+        self.scale = 0.5**self.pyramid_levels
+        self.reseed_interval = max(int(reseed_interval),1)
+        self.min_features = min_features
+        self.ransac_threshold = ransac_threshold
+
         # Threshold for deciding when movement is significant.
         self.minimum_distance = 5
 
@@ -19,10 +40,12 @@ class CameraMovementEstimator():
             criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT,10,0.03)
         )
 
-        first_frame_grayscale = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
-        mask_features = np.zeros_like(first_frame_grayscale)
+        first_frame_grayscale = self._to_gray(frame)
+        mask_features = np.zeros(frame.shape[:2],dtype=np.uint8)
         mask_features[:,0:20] = 1
         mask_features[:,900:1050] = 1
+        # Same strips at the pyramid level's resolution.
+        mask_features = cv2.resize(mask_features,first_frame_grayscale.shape[::-1],interpolation=cv2.INTER_NEAREST)
 
         self.features = dict(
             maxCorners = 100,
@@ -31,65 +54,164 @@ class CameraMovementEstimator():
             blockSize = 7,
             mask = mask_features
         )
-
-    def add_adjust_positions_to_tracks(self,tracks, camera_movement_per_frame):
-        # Adjust object positions by removing estimated camera motion.
-        for object, object_tracks in tracks.items():
-            for frame_num, track in enumerate(object_tracks):
-                for track_id, track_info in track.items():
-                    position = track_info['position']
-                    camera_movement = camera_movement_per_frame[frame_num]
-                    position_adjusted = (position[0]-camera_movement[0],position[1]-camera_movement[1])
-                    tracks[object][frame_num][track_id]['position_adjusted'] = position_adjusted
-                    
-
-
-    def get_camera_movement(self,frames,read_from_stub=False, stub_path=None):
-        # Read the stub 
-        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            with open(stub_path,'rb') as f:
-                return pickle.load(f)
-
+        if method != "max":
+            # The fits reject features on moving players, so the robust methods take
+            # corners from the whole frame; two narrow strips leave rotation and zoom
+            # (and any homography) poorly constrained.
+            self.features.update(maxCorners=200, mask=None)
+
+        self.reset_camera_movement()
+
+    def add_adjust_positions_to_tracks(self,tracks, camera_movement_per_frame, camera_transforms=None):
+        # Adjust object positions by removing estimated camera motion, as one array
+        # subtraction over every detection. Optical-flow motion is float32, so the
+        # difference is rounded to float32 like the scalar arithmetic it replaces.
+        # With camera_transforms (F, 3, 3), positions are instead mapped into the
+        # first frame's coordinates.
+        infos, _, frames, _ = flatten_tracks(tracks)
+        if not infos:
+            return
+        positions = np.array([info['position'] for info in infos],dtype=np.float64)
+        if camera_transforms is not None:
+            positions_adjusted = warp_points(positions,np.asarray(camera_transforms)[frames]).astype(np.float32)
+        else:
+            camera_movement = np.asarray(camera_movement_per_frame,dtype=np.float64).reshape(-1,2)
+            positions_adjusted = (positions - camera_movement[frames]).astype(np.float32)
+        for info, position_adjusted in zip(infos,positions_adjusted.tolist()):
+            info['position_adjusted'] = tuple(position_adjusted)
+
+    def reset_camera_movement(self):
+        # Forget the previous frame so the next update starts a new video.
+        self.old_gray = None
+        self.old_features = None
+        self.frames_since_seed = 0
+        # Per-frame 3x3 transforms mapping each frame's pixels into the first frame's,
+        # accumulated over the whole video (identity for the first frame).
+        self.transforms = []
+        self.cumulative_transform = np.eye(3)
+
+    @property
+    def camera_transforms(self):
+        return np.array(self.transforms).reshape(-1,3,3)
+
+    def _to_gray(self,frame):
+        gray = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+        for _ in range(self.pyramid_levels):
+            gray = cv2.pyrDown(gray)
+        return gray
+
+    def _detect_features(self,gray):
+        return cv2.goodFeaturesToTrack(gray,**self.features)
+
+    def update_camera_movement(self,frames):
+        # Estimate motion for the next consecutive frames, continuing from the last
+        # frame of the previous call so a video can be processed chunk by chunk.
         camera_movement = [[0,0]]*len(frames)
-
-        old_gray = cv2.cvtColor(frames[0],cv2.COLOR_BGR2GRAY)
-        old_features = cv2.goodFeaturesToTrack(old_gray,**self.features)
-
-        for frame_num in range(1,len(frames)):
-            frame_gray = cv2.cvtColor(frames[frame_num],cv2.COLOR_BGR2GRAY)
-            new_features, _,_ = cv2.calcOpticalFlowPyrLK(old_gray,frame_gray,old_features,None,**self.lk_params)
-
-            max_distance = 0
-            camera_movement_x, camera_movement_y = 0,0
-
-            # Use the strongest motion vector as camera displacement.
-            for i, (new,old) in enumerate(zip(new_features,old_features)):
-                new_features_point = new.ravel()
-                old_features_point = old.ravel()
-
-                distance = measure_distance(new_features_point,old_features_point)
-                if distance>max_distance:
-                    max_distance = distance
-                    camera_movement_x,camera_movement_y = measure_xy_distance(old_features_point, new_features_point ) 
-            
-            if max_distance > self.minimum_distance:
-                camera_movement[frame_num] = [camera_movement_x,camera_movement_y]
-                old_features = cv2.goodFeaturesToTrack(frame_gray,**self.features)
+        start = 0
+
+        if self.old_gray is None:
+            if len(frames) == 0:
+                return camera_movement
+            self.old_gray = self._to_gray(frames[0])
+            self.old_features = self._detect_features(self.old_gray)
+            self.frames_since_seed = 0
+            self.transforms.append(self.cumulative_transform.copy())
+            start = 1
+
+        old_gray = self.old_gray
+        old_features = self.old_features
+
+        for frame_num in range(start,len(frames)):
+            frame_gray = self._to_gray(frames[frame_num])
+            if self.method == "max":
+                movement, reseed = self._max_displacement(old_gray,frame_gray,old_features)
+                transform = np.array([[1,0,movement[0]],[0,1,movement[1]],[0,0,1]],dtype=np.float64)
+                if reseed:
+                    old_features = self._detect_features(frame_gray)
+            else:
+                movement, transform, old_features = self._robust_motion(old_gray,frame_gray,old_features)
+            camera_movement[frame_num] = movement
+            self.cumulative_transform = self.cumulative_transform @ transform
+            self.transforms.append(self.cumulative_transform.copy())
 
             old_gray = frame_gray.copy()
-        
-        if stub_path is not None:
-            # Cache camera motion for later runs on the same video.
-            with open(stub_path,'wb') as f:
-                pickle.dump(camera_movement,f)
 
+        self.old_gray = old_gray
+        self.old_features = old_features
         return camera_movement
+
+    def _max_displacement(self,old_gray,frame_gray,old_features):
+        # The strongest motion vector as camera displacement, zero below
+        # minimum_distance. Returns ([x, y], whether to re-detect features).
+        if old_features is None or len(old_features) == 0:
+            return [0,0], True
+        new_features, _,_ = cv2.calcOpticalFlowPyrLK(old_gray,frame_gray,old_features,None,**self.lk_params)
+        # Same float32 arithmetic as measure_distance per feature; argmax keeps the
+        # first of equal distances like the strict > of the original loop.
+        displacement = old_features.reshape(-1,2) - new_features.reshape(-1,2)
+        distance = np.sqrt(displacement[:,0]**2 + displacement[:,1]**2)
+        strongest = int(np.argmax(distance))
+        if distance[strongest] > self.minimum_distance:
+            camera_movement_x, camera_movement_y = displacement[strongest]/self.scale
+            return [camera_movement_x,camera_movement_y], True
+        return [0,0], False
+
+    def _robust_motion(self,old_gray,frame_gray,old_features):
+        # Track features into this frame, fit the motion from all of them at once and
+        # carry the tracked points forward. Returns ([x, y] displacement of the frame
+        # center, 3x3 transform from this frame to the previous one at full
+        # resolution, features for the next frame).
+        transform = np.eye(3)
+        new_points = np.zeros((0,2),dtype=np.float32)
+        if old_features is not None and len(old_features) > 0:
+            new_features, status, _ = cv2.calcOpticalFlowPyrLK(old_gray,frame_gray,old_features,None,**self.lk_params)
+            tracked = status.ravel() == 1
+            old_points = old_features.reshape(-1,2)[tracked]
+            new_points = new_features.reshape(-1,2)[tracked]
+            transform = self._fit_transform(new_points,old_points)
+
+        # Level coordinates -> full resolution: S^-1 T S with S = diag(scale, scale, 1).
+        transform[:2,2] /= self.scale
+        transform[2,:2] *= self.scale
+        center = np.array([frame_gray.shape[1],frame_gray.shape[0]],dtype=np.float64)/(2*self.scale)
+        movement = (warp_points(center,transform)[0] - center).tolist()
+
+        self.frames_since_seed += 1
+        if self.frames_since_seed >= self.reseed_interval or len(new_points) < self.min_features:
+            self.frames_since_seed = 0
+            return movement, transform, self._detect_features(frame_gray)
+        return movement, transform, new_points.reshape(-1,1,2)
+
+    def _fit_transform(self,new_points,old_points):
+        # 3x3 transform taking this frame's points onto the previous frame's.
+        transform = np.eye(3)
+        if self.method == "median" and len(new_points):
+            transform[:2,2] = np.median(old_points-new_points,axis=0)
+        elif self.method == "affine" and len(new_points) >= 3:
+            matrix, _ = cv2.estimateAffinePartial2D(new_points,old_points,method=cv2.RANSAC,
+                                                    ransacReprojThreshold=self.ransac_threshold)
+            if matrix is not None:
+                transform[:2] = matrix
+        elif self.method == "homography" and len(new_points) >= 4:
+            matrix, _ = cv2.findHomography(new_points,old_points,cv2.RANSAC,self.ransac_threshold)
+            # Reject degenerate fits (near-collinear inliers) in favour of no motion
+            # rather than let one bad frame skew every later accumulated transform.
+            if matrix is not None and abs(matrix[2,2]) > 1e-9:
+                matrix = matrix/matrix[2,2]
+                if 0.5 < np.linalg.det(matrix[:2,:2]) < 2 and np.abs(matrix[2,:2]).max() < 1e-3:
+                    transform = matrix
+        return transform
+
+    def get_camera_movement(self,frames):
+        # Motion of a whole list of frames; results are cached by analysis_cache.
+        self.reset_camera_movement()
+        return self.update_camera_movement(frames)
     
-    def draw_camera_movement(self,frames, camera_movement_per_frame):
+    def draw_camera_movement(self,frames, camera_movement_per_frame, start_frame=0):
         # Overlay camera motion vectors on frames.
         output_frames=[]
 
-        for frame_num, frame in enumerate(frames):
+        for frame_num, frame in enumerate(frames, start=start_frame):
             frame= frame.copy()
 
             overlay = frame.copy()
@@ -0,0 +1,123 @@
+"""Estimate camera motion over video segments in a process pool."""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import iter_video_frames, iter_frame_chunks, get_video_frame_count
+from .camera_movement_estimator import CameraMovementEstimator
+
+DEFAULT_SEGMENT_FRAMES = 250
+DEFAULT_OVERLAP_FRAMES = 15
+# Frames a worker decodes and hands to the estimator at a time.
+WORKER_CHUNK_SIZE = 32
+
+def _init_worker():
+    # One OpenCV thread per process so the pool, not OpenCV, spreads work over cores.
+    cv2.setNumThreads(1)
+
+def _estimate_segment(video_path, warmup_start, start, stop, method, estimator_options):
+    # Decode [warmup_start, stop) and estimate motion over it; the warm-up frames only
+    # prime the tracked features. Returns the motion of frames [start, stop) and
+    # their (N, 3, 3) transforms into frame start - 1 (frame 0 for the first segment).
+    estimator = None
+    frames = iter_video_frames(video_path, start_frame=warmup_start)
+    if stop is not None:
+        frames = itertools.islice(frames, stop - warmup_start)
+    camera_movement = []
+    for chunk in iter_frame_chunks(frames, WORKER_CHUNK_SIZE):
+        if estimator is None:
+            estimator = CameraMovementEstimator(chunk[0], method=method, **estimator_options)
+        camera_movement += estimator.update_camera_movement(chunk)
+    if estimator is None:
+        return [], np.zeros((0,3,3))
+
+    owned = start - warmup_start
+    transforms = estimator.camera_transforms
+    if owned > 0:
+        transforms = np.linalg.inv(transforms[owned-1]) @ transforms[owned:]
+    return camera_movement[owned:], transforms
+
+class SegmentedCameraMovement:
+    def __init__(self, method="max", workers=None, segment_frames=DEFAULT_SEGMENT_FRAMES,
+                 overlap=DEFAULT_OVERLAP_FRAMES, **estimator_options):
+        # The video is split into segment_frames-long segments that workers decode and
+        # estimate on their own, so motion runs in other processes while the caller
+        # detects. Each segment starts overlap frames early: the warm-up re-detects
+        # and tracks features up to the seam, so its first owned frame is measured
+        # against the previous one as in a serial run. Segments are stitched by
+        # chaining each one's transforms onto the last frame of the one before.
+        # estimator_options are passed to every CameraMovementEstimator.
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.segment_frames = max(int(segment_frames), 1)
+        self.overlap = max(int(overlap), 1)
+        self.estimator_options = estimator_options
+
+        self.executor = None
+        self.futures = []
+        self.camera_movement = []
+        self.transforms = []
+
+    def segments(self, num_frames):
+        # (warm-up start, start, stop) per segment; the last one runs to the end of the
+        # video (stop None) in case the container under-reports its frame count.
+        starts = list(range(0, max(num_frames,1), self.segment_frames))
+        return [(max(start-self.overlap,0), start, starts[index+1] if index+1 < len(starts) else None)
+                for index, start in enumerate(starts)]
+
+    def submit(self, video_path, num_frames=None):
+        # Queue every segment and return immediately; results are read in order.
+        self.close()
+        if num_frames is None:
+            num_frames = get_video_frame_count(video_path)
+        self.camera_movement = []
+        self.transforms = []
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self.futures = [self.executor.submit(_estimate_segment, video_path, warmup_start, start, stop,
+                                             self.method, self.estimator_options)
+                        for warmup_start, start, stop in self.segments(num_frames)]
+        return self
+
+    def _stitch_next(self):
+        camera_movement, transforms = self.futures.pop(0).result()
+        if self.transforms and len(transforms):
+            transforms = self.transforms[-1] @ transforms
+        self.camera_movement += camera_movement
+        self.transforms += list(transforms)
+
+    def get_camera_movement(self, start, stop):
+        # Motion of frames [start, stop), waiting only for the segments that cover them.
+        while len(self.camera_movement) < stop and self.futures:
+            self._stitch_next()
+        # Frames the workers could not decode count as a still camera.
+        missing = stop - len(self.camera_movement)
+        if missing > 0:
+            self.camera_movement += [[0,0]]*missing
+            self.transforms += [self.transforms[-1] if self.transforms else np.eye(3)]*missing
+        return self.camera_movement[start:stop]
+
+    def result(self):
+        # Motion of the whole video once every segment is done.
+        try:
+            while self.futures:
+                self._stitch_next()
+        finally:
+            self.close()
+        return self.camera_movement
+
+    @property
+    def camera_transforms(self):
+        return np.array(self.transforms).reshape(-1,3,3)
+
+    def close(self):
+        # Stop the pool; segments not yet started are dropped.
+        if self.executor is not None:
+            for future in self.futures:
+                future.cancel()
+            self.executor.shutdown(wait=True)
+            self.executor = None
+        self.futures = []
@@ -0,0 +1,2 @@
+from .job_queue import JobStore, JobRecord, JobScheduler, QUEUED, EXECUTORS, in_job_process
+"""Persistent job store and worker pool for the web app's analysis jobs."""
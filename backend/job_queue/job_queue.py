@@ -0,0 +1,298 @@
+"""SQLite-backed job store and a fixed-size worker pool that runs queued jobs."""
+
+import heapq
+import json
+import multiprocessing
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+QUEUED = "queued"
+EXECUTORS = ("thread", "process")
+# Statuses that never run: still uploading, waiting for a process request, and finished.
+IDLE_STATUSES = ("uploading", "uploaded", "complete", "error")
+# Jobs whose duration estimates the time per frame of the next ones.
+DURATION_HISTORY = 20
+
+def _json_default(value):
+    # NumPy scalars and arrays in stage reports.
+    return value.tolist() if hasattr(value, "tolist") else str(value)
+
+class JobRecord:
+    # One job's fields as a mutable mapping; every write goes straight to the store,
+    # so run_pipeline's job[...] = ... updates survive a restart.
+    def __init__(self, store, video_id):
+        self.store = store
+        self.video_id = video_id
+
+    def __getitem__(self, field):
+        return self.store.load(self.video_id)[field]
+
+    def get(self, field, default=None):
+        return self.store.load(self.video_id).get(field, default)
+
+    def __setitem__(self, field, value):
+        self.store.update(self.video_id, **{field: value})
+
+    def __contains__(self, field):
+        return field in self.store.load(self.video_id)
+
+class JobStore:
+    # Columns the scheduler queries; every other field is kept in the data JSON.
+    COLUMNS = ("status", "priority", "queued_at", "started_at", "finished_at")
+
+    def __init__(self, db_path):
+        # Jobs by video id, readable like the previous in-memory dict (jobs[video_id]
+        # is a JobRecord, jobs[video_id] = {...} creates a job). One connection in
+        # WAL mode, serialized by a lock, shared by request and worker threads; job
+        # processes open their own store on the same file.
+        self.db_path = str(db_path)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs (video_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "priority INTEGER NOT NULL DEFAULT 0, queued_at REAL, started_at REAL, finished_at REAL, "
+            "data TEXT NOT NULL DEFAULT '{}')")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, queued_at)")
+        # Append-only events (progress, stage timings, partial results) that clients
+        # stream; ids are increasing, so a reader resumes after the last id it saw.
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_events (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "video_id TEXT NOT NULL, type TEXT NOT NULL, data TEXT NOT NULL, created_at REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_events_video ON job_events (video_id, id)")
+
+    def __contains__(self, video_id):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM jobs WHERE video_id = ?", (video_id,)).fetchone() is not None
+
+    def __getitem__(self, video_id):
+        if video_id not in self:
+            raise KeyError(video_id)
+        return JobRecord(self, video_id)
+
+    def __setitem__(self, video_id, fields):
+        fields = dict(fields)
+        columns = {name: fields.pop(name, None) for name in self.COLUMNS}
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (video_id, status, priority, queued_at, started_at, finished_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (video_id, columns["status"] or "uploaded", columns["priority"] or 0, columns["queued_at"],
+                 columns["started_at"], columns["finished_at"], json.dumps(fields, default=_json_default)))
+
+    def load(self, video_id):
+        # Snapshot of every field of a job, or KeyError.
+        with self._lock:
+            row = self._db.execute("SELECT status, priority, queued_at, started_at, finished_at, data "
+                                   "FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None:
+            raise KeyError(video_id)
+        job = json.loads(row[-1])
+        job.update(zip(self.COLUMNS, row[:-1]))
+        return job
+
+    def update(self, video_id, **fields):
+        columns = {name: fields.pop(name) for name in self.COLUMNS if name in fields}
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT data FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+                if row is None:
+                    raise KeyError(video_id)
+                if fields:
+                    data = json.loads(row[0])
+                    data.update(fields)
+                    columns["data"] = json.dumps(data, default=_json_default)
+                if columns:
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    self._db.execute(f"UPDATE jobs SET {assignments} WHERE video_id = ?",
+                                     (*columns.values(), video_id))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def publish(self, video_id, event_type, data):
+        # Append an event for a job; data must be JSON-serializable (NumPy is converted).
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO job_events (video_id, type, data, created_at) VALUES (?, ?, ?, ?)",
+                (video_id, event_type, json.dumps(data, default=_json_default), time.time()))
+        return cursor.lastrowid
+
+    def events(self, video_id, after=0):
+        # (id, type, JSON data) of a job's events with id > after, oldest first.
+        with self._lock:
+            return self._db.execute("SELECT id, type, data FROM job_events WHERE video_id = ? AND id > ? ORDER BY id",
+                                    (video_id, int(after))).fetchall()
+
+    def claim(self, video_id, **fields):
+        # Move a queued job to processing; False if another worker (or process) got
+        # it first.
+        with self._lock:
+            cursor = self._db.execute("UPDATE jobs SET status = 'processing', started_at = ? "
+                                      "WHERE video_id = ? AND status = ?", (time.time(), video_id, QUEUED))
+            claimed = cursor.rowcount == 1
+        if claimed and fields:
+            self.update(video_id, **fields)
+        return claimed
+
+    def queued_ids(self):
+        # Waiting jobs in run order: highest priority first, then first come first served.
+        with self._lock:
+            rows = self._db.execute("SELECT video_id FROM jobs WHERE status = ? "
+                                    "ORDER BY priority DESC, queued_at ASC", (QUEUED,)).fetchall()
+        return [row[0] for row in rows]
+
+    def running(self):
+        # (video_id, started_at, data) of every job a worker is running.
+        placeholders = ", ".join("?" * (len(IDLE_STATUSES) + 1))
+        with self._lock:
+            rows = self._db.execute(f"SELECT video_id, started_at, data FROM jobs WHERE status NOT IN ({placeholders})",
+                                    (*IDLE_STATUSES, QUEUED)).fetchall()
+        return [(video_id, started_at, json.loads(data)) for video_id, started_at, data in rows]
+
+    def finished(self, limit=DURATION_HISTORY):
+        # (seconds, data) of the most recently completed jobs.
+        with self._lock:
+            rows = self._db.execute("SELECT finished_at - started_at, data FROM jobs WHERE status = 'complete' "
+                                    "AND started_at IS NOT NULL AND finished_at IS NOT NULL "
+                                    "ORDER BY finished_at DESC LIMIT ?", (limit,)).fetchall()
+        return [(seconds, json.loads(data)) for seconds, data in rows]
+
+def in_job_process():
+    # True inside a scheduler's job process (spawned children re-import the app).
+    return multiprocessing.parent_process() is not None
+
+class JobScheduler:
+    def __init__(self, store, run_job, workers=1, max_queued=8, default_seconds_per_frame=0.1,
+                 executor="thread", initializer=None):
+        # run_job(video_id) runs one job and records its own progress and final status
+        # in the store. A fixed pool of worker threads runs queued jobs one each, so
+        # at most `workers` pipelines (and detector models) exist at once. submit
+        # refuses a job with queue.Full once max_queued jobs are waiting. Start
+        # estimates use the time per frame of recent jobs (or
+        # default_seconds_per_frame before any job has finished) and each job's
+        # "frames" field.
+        # executor="process" runs each job in one of `workers` long-lived spawned
+        # processes instead of the worker thread itself, so CPU-bound Python in a job
+        # holds neither the server's GIL nor the other jobs'. run_job and initializer
+        # (run once per process, e.g. to warm models) must then be importable
+        # module-level functions, and jobs report progress through the store.
+        if executor not in EXECUTORS:
+            raise ValueError(f"Unknown job executor: {executor}. Use one of {EXECUTORS}.")
+        self.store = store
+        self.run_job = run_job
+        self.workers = max(int(workers), 1)
+        self.max_queued = max(int(max_queued), 1)
+        self.default_seconds_per_frame = default_seconds_per_frame
+        self.executor = executor
+        self.initializer = initializer
+        self._cond = threading.Condition()
+        self._threads = []
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def start(self):
+        # Jobs that were running when the server stopped go back to the queue, keeping
+        # their place; then the workers start.
+        for video_id, _, _ in self.store.running():
+            self.store.update(video_id, status=QUEUED, started_at=None, progress=0, currentStep="queued")
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, video_id, priority=0):
+        # Queue an uploaded job; raises queue.Full when the queue is at capacity.
+        with self._cond:
+            if len(self.store.queued_ids()) >= self.max_queued:
+                raise queue.Full(f"{self.max_queued} jobs are already queued")
+            self.store.update(video_id, status=QUEUED, priority=int(priority), queued_at=time.time(),
+                              progress=0, currentStep="queued", error=None)
+            self._cond.notify()
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                for video_id in self.store.queued_ids():
+                    if self.store.claim(video_id, progress=5, currentStep="starting"):
+                        return video_id
+                # Also poll, for jobs queued by another process sharing the store.
+                self._cond.wait(timeout=5.0)
+
+    def _process_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _run(self, video_id):
+        if self.executor == "thread":
+            self.run_job(video_id)
+            return
+        pool = self._process_pool()
+        try:
+            pool.submit(self.run_job, video_id).result()
+        except BrokenProcessPool:
+            # A job process died (e.g. out of memory): fail its job and start a new
+            # pool for the next ones.
+            with self._pool_lock:
+                if self._pool is pool:
+                    self._pool = None
+            pool.shutdown(wait=False)
+            raise RuntimeError("Job process exited unexpectedly")
+
+    def _work(self):
+        while True:
+            video_id = self._next_job()
+            try:
+                self._run(video_id)
+            except Exception as e:
+                self.store.update(video_id, status="error", error=str(e))
+            finally:
+                self.store.update(video_id, finished_at=time.time())
+
+    def shutdown(self):
+        # Stop the job processes (running jobs are lost and requeued on next start).
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def seconds_per_frame(self):
+        history = [(seconds, data.get("frames") or 0) for seconds, data in self.store.finished()]
+        frames = sum(frames for _, frames in history)
+        if frames <= 0:
+            return self.default_seconds_per_frame
+        return sum(seconds for seconds, _ in history) / frames
+
+    def queue_position(self, video_id):
+        # 1 for the next job to start, None when the job is not waiting.
+        queued = self.store.queued_ids()
+        return queued.index(video_id) + 1 if video_id in queued else None
+
+    def estimated_wait(self, video_id):
+        # Seconds until a queued job starts (None when it is not waiting): each worker
+        # frees up when its running job's expected duration has elapsed, and the jobs
+        # ahead take the free workers in queue order.
+        queued = self.store.queued_ids()
+        if video_id not in queued:
+            return None
+        seconds_per_frame = self.seconds_per_frame()
+        now = time.time()
+        free_at = [max((started_at or now) + seconds_per_frame * (data.get("frames") or 0) - now, 0.0)
+                   for _, started_at, data in self.store.running()]
+        free_at += [0.0] * max(self.workers - len(free_at), 0)
+        heapq.heapify(free_at)
+        for ahead in queued[:queued.index(video_id)]:
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + seconds_per_frame * (self.store.load(ahead).get("frames") or 0))
+        return free_at[0]
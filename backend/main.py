@@ -1,118 +1,268 @@
 """Run end-to-end football video analysis and render annotated output."""
 
-from utils import read_video, save_video
-from trackers import Tracker
+from utils import read_video, save_video, get_video_fps
+from trackers import Tracker, DetectionEngine, KeyframeDetector, BACKENDS
 import cv2
 import numpy as np
-from team_assigner import TeamAssigner
+from team_assigner import TeamAssigner, COLOR_METHODS
 from player_ball_assigner import PlayerBallAssigner
-from camera_movement_estimator import CameraMovementEstimator
+from camera_movement_estimator import CameraMovementEstimator, SegmentedCameraMovement, ESTIMATION_METHODS, DEFAULT_SEGMENT_FRAMES
 from view_transformer import ViewTransformer
-from speed_and_distance_estimator import SpeedAndDistance_Estimator
-from pathlib import Path
+from speed_and_distance_estimator import SpeedAndDistance_Estimator, SMOOTHING_METHODS
+from pipeline import (StreamingPipeline, DEFAULT_CHUNK_SIZE, DEFAULT_QUEUE_SIZE, format_stage_report,
+                      IncrementalStages, run_track_stages, stage_params, format_incremental_report)
+from track_table import save_track_file
+from analysis_cache import AnalysisCache, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
 import argparse
 
-def build_stub_paths(stubs_dir, video_path):
-    """Derive per-video stub paths for cached tracks and camera movement."""
-    video_stem = Path(video_path).stem
-    stubs_dir = Path(stubs_dir)
-    stubs_dir.mkdir(parents=True, exist_ok=True)
-    return (
-        stubs_dir / f"{video_stem}_tracks.pkl",
-        stubs_dir / f"{video_stem}_camera_movement.pkl",
-    )
+def build_cache(args):
+    # Content-addressed stage cache, or None with --no-cache.
+    if args.no_cache:
+        return None
+    return AnalysisCache(args.cache_dir, max_bytes=args.cache_size_mb * 1024 * 1024)
 
-def main():
-    # Parse CLI args to keep input/output flexible without code edits.
-    parser = argparse.ArgumentParser(description="Run football analysis on a video.")
-    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Path to input video.")
-    parser.add_argument("--output", default="output_videos/output_video.avi", help="Path to output video.")
-    parser.add_argument("--use-stubs", action="store_true", help="Read precomputed tracks/camera movement stubs.")
-    parser.add_argument("--stubs-dir", default="stubs", help="Directory to read/write stub files.")
-    args = parser.parse_args()
+def cache_get(cache, keys, stage):
+    return cache.get(keys[stage], stage) if cache is not None else None
 
-    # Read Video
-    video_frames = read_video(args.video)
-    if len(video_frames) == 0:
-        raise ValueError(f"No frames read from video: {args.video}")
+def cache_put(cache, keys, stage, value):
+    if cache is not None:
+        cache.put(keys[stage], stage, value)
 
-    tracks_stub_path, camera_stub_path = build_stub_paths(args.stubs_dir, args.video)
+def build_tracker(args):
+    # Detector settings come from the CLI so CPU-only workers can trade accuracy for FPS.
+    batch_size = args.batch_size if args.batch_size == "auto" else int(args.batch_size)
+    engine = DetectionEngine('models/best.pt', backend=args.backend, imgsz=args.imgsz,
+                             batch_size=batch_size, half=args.half)
+    return Tracker('models/best.pt', engine=engine)
 
-    # Initialize Tracker
-    tracker = Tracker('models/best.pt')
+def build_speed_estimator(args):
+    return SpeedAndDistance_Estimator(frame_window=args.speed_window, smoothing=args.speed_smoothing,
+                                      smoothing_window=args.smoothing_window, sprint_speed=args.sprint_speed)
 
-    tracks = tracker.get_object_tracks(video_frames,
-                                       read_from_stub=args.use_stubs,
-                                       stub_path=str(tracks_stub_path))
-    # Add foot/center positions for downstream movement and transforms.
-    tracker.add_position_to_tracks(tracks)
+def build_player_ball_assigner(args):
+    return PlayerBallAssigner(min_possession_frames=args.possession_min_frames,
+                              release_frames=args.possession_release_frames)
 
-    # Estimate camera motion to stabilize player/ball trajectories.
-    camera_movement_estimator = CameraMovementEstimator(video_frames[0])
-    camera_movement_per_frame = camera_movement_estimator.get_camera_movement(video_frames,
-                                                                                read_from_stub=args.use_stubs,
-                                                                                stub_path=str(camera_stub_path))
-    camera_movement_estimator.add_adjust_positions_to_tracks(tracks,camera_movement_per_frame)
+def build_camera_segments(args):
+    # Segment-parallel camera motion, or None to estimate it serially.
+    if args.camera_workers <= 1:
+        return None
+    return SegmentedCameraMovement(args.camera_method, workers=args.camera_workers,
+                                   segment_frames=args.camera_segment_frames)
+
+def print_analysis_summary(report, team_ball_control):
+    # Which stages were reused from the cache, and the resulting team ball control.
+    print("[stages]")
+    print(format_incremental_report(report))
+    team_ball_control = np.asarray(team_ball_control)
+    controlled = team_ball_control[team_ball_control > 0]
+    if len(controlled):
+        share = np.mean(controlled == 1)
+        print(f"Team ball control: team 1 {share:.1%}, team 2 {1 - share:.1%}")
 
+def save_tracks(path, table, team_ball_control, fps, frame_shape):
+    # Final tracks with every derived metric, memory-mappable by player_feedback.py.
+    save_track_file(path, table, arrays={"team_ball_control": np.asarray(team_ball_control, dtype=np.int8)},
+                    metadata={"fps": fps, "frame_shape": list(frame_shape or ())})
+    print(f"Wrote tracks to {path}")
 
-    # Map image coordinates into a top-down pitch reference frame.
+def run_streaming(args):
+    # Decode, analyze and render in bounded chunks so memory does not grow with video length.
+    tracker = build_tracker(args)
+
+    keyframes = None
+    if args.keyframe_interval > 1:
+        keyframes = KeyframeDetector(tracker, interval=args.keyframe_interval,
+                                     camera_motion_threshold=args.keyframe_camera_threshold,
+                                     track_speed_threshold=args.keyframe_speed_threshold)
+
+    pipeline = StreamingPipeline(tracker, chunk_size=args.chunk_size,
+                                 threaded=args.threaded, queue_size=args.queue_size,
+                                 keyframes=keyframes,
+                                 speed_and_distance_estimator=build_speed_estimator(args),
+                                 team_color_method=args.team_color_method,
+                                 player_ball_assigner=build_player_ball_assigner(args),
+                                 camera_method=args.camera_method,
+                                 camera_segments=build_camera_segments(args),
+                                 cache=build_cache(args))
+    pipeline.analyze(args.video)
+    if not args.skip_render:
+        pipeline.render(args.video, args.output, fps=get_video_fps(args.video), encoder=args.encoder)
+
+    # Per-stage throughput and queue occupancy show which stage is the bottleneck.
+    for name, report in pipeline.stage_reports.items():
+        print(f"[{name}]")
+        print(format_stage_report(report))
+    print_analysis_summary(pipeline.stages.report, pipeline.team_ball_control)
+    if args.save_tracks:
+        save_tracks(args.save_tracks, pipeline.table, pipeline.team_ball_control, pipeline.frame_rate,
+                    pipeline.frame_shape)
+
+def run_in_memory(args):
+    # Read the video only once a stage that needs frames is not cached.
+    video_frames = []
+    def frames():
+        if not video_frames:
+            video_frames.extend(read_video(args.video))
+            if len(video_frames) == 0:
+                raise ValueError(f"No frames read from video: {args.video}")
+        return video_frames
+
+    # Initialize Tracker
+    tracker = build_tracker(args)
+    team_assigner = TeamAssigner(color_method=args.team_color_method)
     view_transformer = ViewTransformer()
-    view_transformer.add_transformed_position_to_tracks(tracks)
-
-    # Interpolate ball positions across missed detections.
-    tracks["ball"] = tracker.interpolate_ball_positions(tracks["ball"])
-
-    # Estimate player speed and total distance.
-    speed_and_distance_estimator = SpeedAndDistance_Estimator()
-    speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
-
-    # Assign players to teams based on jersey color clustering.
-    team_assigner = TeamAssigner()
-    first_players_frame = next((i for i, players in enumerate(tracks['players']) if len(players) > 0), None)
-    if first_players_frame is not None:
-        team_assigner.assign_team_color(video_frames[first_players_frame], 
-                                        tracks['players'][first_players_frame])
-    
-    if first_players_frame is not None:
-        for frame_num, player_track in enumerate(tracks['players']):
-            for player_id, track in player_track.items():
-                team = team_assigner.get_player_team(video_frames[frame_num],   
-                                                     track['bbox'],
-                                                     player_id)
-                tracks['players'][frame_num][player_id]['team'] = team 
-                tracks['players'][frame_num][player_id]['team_color'] = team_assigner.team_colors[team]
-
-    
-    # Track ball possession and aggregate team control over time.
-    player_assigner =PlayerBallAssigner()
-    team_ball_control= []
-    for frame_num, player_track in enumerate(tracks['players']):
-        if 1 not in tracks['ball'][frame_num]:
-            assigned_player = -1
+    speed_and_distance_estimator = build_speed_estimator(args)
+    player_ball_assigner = build_player_ball_assigner(args)
+    frame_rate = get_video_fps(args.video)
+
+    # Stage results cached for this exact video content and configuration; a stage
+    # reruns only when its own or an upstream stage's key changed.
+    cache = build_cache(args)
+    keys = {}
+    if cache is not None:
+        keys = cache.stage_keys(args.video, tracker, stage_params=stage_params(
+            args.camera_method, view_transformer, speed_and_distance_estimator, frame_rate,
+            team_assigner, player_ball_assigner))
+    stages = IncrementalStages(cache, keys)
+
+    # With several camera workers, motion is estimated in other processes (decoding
+    # the video themselves) while the detector runs here.
+    camera = cache_get(cache, keys, "camera")
+    camera_segments = build_camera_segments(args) if camera is None else None
+    if camera_segments is not None:
+        camera_segments.submit(args.video, len(frames()))
+
+    # Detect and track, or replay cached detections through the tracker.
+    tracks = cache_get(cache, keys, "tracks")
+    if tracks is None:
+        packed_detections = cache_get(cache, keys, "detections")
+        if packed_detections is None:
+            detections = tracker.to_supervision(tracker.detect_frames(frames()))
+            cache_put(cache, keys, "detections", tracker.pack_detections(detections))
+            stages.record("detections", "computed")
         else:
-            ball_bbox = tracks['ball'][frame_num][1]['bbox']
-            assigned_player = player_assigner.assign_ball_to_player(player_track, ball_bbox)
+            detections = tracker.unpack_detections(packed_detections)
+            stages.record("detections", "cached")
+        tracks = tracker.tracks_from_supervision(detections)
+        cache_put(cache, keys, "tracks", tracks)
+        stages.record("tracks", "computed")
+    else:
+        stages.record("tracks", "cached")
 
-        if assigned_player != -1:
-            tracks['players'][frame_num][assigned_player]['has_ball'] = True
-            team_ball_control.append(tracks['players'][frame_num][assigned_player]['team'])
+    # Estimate camera motion to stabilize player/ball trajectories.
+    if camera is None:
+        if camera_segments is not None:
+            camera_movement_per_frame = camera_segments.result()
+            computed_transforms = camera_segments.camera_transforms
         else:
-            team_ball_control.append(team_ball_control[-1] if team_ball_control else 0)
-    team_ball_control= np.array(team_ball_control)
+            camera_movement_estimator = CameraMovementEstimator(frames()[0], method=args.camera_method)
+            camera_movement_per_frame = camera_movement_estimator.get_camera_movement(frames())
+            computed_transforms = camera_movement_estimator.camera_transforms
+        camera = {"camera_movement": camera_movement_per_frame, "camera_transforms": computed_transforms,
+                  "frame_shape": frames()[0].shape}
+        cache_put(cache, keys, "camera", camera)
+        stages.record("camera", "computed")
+    else:
+        stages.record("camera", "cached")
+    camera_movement_per_frame = camera["camera_movement"]
+    # Robust methods map positions through the accumulated camera transforms.
+    camera_transforms = None
+    if args.camera_method != "max" and len(camera["camera_transforms"]) == len(tracks["players"]):
+        camera_transforms = camera["camera_transforms"]
+
+    # Sample jersey colors across the video for the team vote, unless cached.
+    cached_teams = cache_get(cache, keys, "teams")
+    if cached_teams is not None:
+        team_assigner.restore_teams(cached_teams)
+        stages.record("teams", "cached")
+    else:
+        for frame_num, player_track in enumerate(tracks['players']):
+            if player_track:
+                team_assigner.sample(frame_num, frames()[frame_num], player_track)
+
+    # Positions, camera adjustment and pitch transform, ball interpolation, speed and
+    # distance, team labels and ball possession with team control over time.
+    table, _, team_ball_control, _ = run_track_stages(
+        stages, tracks, tracker, view_transformer, camera_movement_per_frame, camera_transforms,
+        speed_and_distance_estimator, frame_rate, team_assigner, player_ball_assigner)
+    if cached_teams is None:
+        cache_put(cache, keys, "teams", team_assigner.export_teams())
+        stages.record("teams", "computed")
+    tracks = table.view()
 
+    if not args.skip_render:
+        # Draw output annotations.
+        ## Draw object Tracks
+        output_video_frames = tracker.draw_annotations(frames(), tracks,team_ball_control)
 
-    # Draw output annotations.
-    ## Draw object Tracks
-    output_video_frames = tracker.draw_annotations(video_frames, tracks,team_ball_control)
+        ## Draw Camera movement
+        camera_movement_estimator = CameraMovementEstimator(frames()[0], method=args.camera_method)
+        output_video_frames = camera_movement_estimator.draw_camera_movement(output_video_frames,camera_movement_per_frame)
 
-    ## Draw Camera movement
-    output_video_frames = camera_movement_estimator.draw_camera_movement(output_video_frames,camera_movement_per_frame)
+        ## Draw Speed and Distance
+        speed_and_distance_estimator.draw_speed_and_distance(output_video_frames,tracks)
 
-    ## Draw Speed and Distance
-    speed_and_distance_estimator.draw_speed_and_distance(output_video_frames,tracks)
+        # Save video
+        save_video(output_video_frames, args.output, fps=frame_rate, encoder=args.encoder)
 
-    # Save video
-    save_video(output_video_frames, args.output)
+    print_analysis_summary(stages.report, team_ball_control)
+    if args.save_tracks:
+        save_tracks(args.save_tracks, table, team_ball_control, frame_rate, camera["frame_shape"])
+
+def build_parser():
+    # Parse CLI args to keep input/output flexible without code edits.
+    parser = argparse.ArgumentParser(description="Run football analysis on a video.")
+    parser.add_argument("--video", default="input_videos/08fd33_4.mp4", help="Path to input video.")
+    parser.add_argument("--output", default="output_videos/output_video.avi", help="Path to output video.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="Cache of detections/tracks/camera motion/teams, keyed by video content and settings.")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Least recently used cache entries are evicted beyond this size.")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the analysis cache.")
+    parser.add_argument("--save-tracks", default=None, metavar="PATH",
+                        help="Write the analyzed tracks and per-frame team ball control as a binary track file "
+                             "(e.g. output_videos/match.tracks).")
+    parser.add_argument("--skip-render", action="store_true",
+                        help="Stop after possession: re-score an analyzed video from its cached stages without rendering.")
+    parser.add_argument("--encoder", choices=["opencv", "ffmpeg"], default="opencv",
+                        help="opencv writes XVID (use .avi); ffmpeg pipes frames to libx264 (use .mp4).")
+    parser.add_argument("--backend", choices=BACKENDS, default="torch", help="Detector runtime; onnx/openvino export models/best.pt once.")
+    parser.add_argument("--imgsz", type=int, default=None, help="Detector input size in pixels (default 640).")
+    parser.add_argument("--batch-size", default="20", help="Frames per inference batch, or 'auto' to size from available memory.")
+    parser.add_argument("--half", action="store_true", help="FP16 inference (CUDA with torch, FP16 IR with openvino).")
+    parser.add_argument("--stream", action="store_true", help="Decode and render in chunks instead of loading the whole video.")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Frames held in memory per chunk in --stream mode.")
+    parser.add_argument("--threaded", action="store_true", help="In --stream mode, run each stage in its own thread.")
+    parser.add_argument("--keyframe-interval", type=int, default=1, help="In --stream mode, run the detector every N frames and interpolate between.")
+    parser.add_argument("--keyframe-camera-threshold", type=float, default=None, help="Also detect frames whose camera motion exceeds this many pixels.")
+    parser.add_argument("--keyframe-speed-threshold", type=float, default=None, help="Detect every frame while a track moves faster than this many pixels/frame.")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Chunks buffered between stages in --threaded mode.")
+    parser.add_argument("--speed-smoothing", choices=SMOOTHING_METHODS, default="window",
+                        help="window: block displacement every --speed-window frames; savgol/kalman: smoothed per-frame speed.")
+    parser.add_argument("--speed-window", type=int, default=5, help="Frames per speed block, and the span used for acceleration.")
+    parser.add_argument("--smoothing-window", type=int, default=11, help="Savitzky-Golay window in frames (odd).")
+    parser.add_argument("--sprint-speed", type=float, default=25.0, help="Speed in km/h at or above which a run counts as a sprint.")
+    parser.add_argument("--team-color-method", choices=COLOR_METHODS, default="kmeans",
+                        help="Jersey color per player crop: kmeans (per-crop 2-means), histogram mode or masked median.")
+    parser.add_argument("--camera-method", choices=ESTIMATION_METHODS, default="max",
+                        help="Camera motion: max (largest feature move), median, or RANSAC affine/homography on a downscaled frame.")
+    parser.add_argument("--camera-workers", type=int, default=1,
+                        help="Processes estimating camera motion over video segments, alongside detection (1 = serial).")
+    parser.add_argument("--camera-segment-frames", type=int, default=DEFAULT_SEGMENT_FRAMES,
+                        help="Frames per camera motion segment when --camera-workers > 1.")
+    parser.add_argument("--possession-min-frames", type=int, default=1,
+                        help="Frames a new player must be nearest the ball before possession switches (1 = no hysteresis).")
+    parser.add_argument("--possession-release-frames", type=int, default=0,
+                        help="Frames with nobody near the ball that still count as the current possessor.")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    if args.stream:
+        run_streaming(args)
+    else:
+        run_in_memory(args)
 
 if __name__ == '__main__':
     main()
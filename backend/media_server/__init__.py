@@ -0,0 +1,2 @@
+from .media_server import send_media, media_validators, FileRange, DEFAULT_MAX_AGE
+"""Serving rendered videos with HTTP range requests and cache validation."""
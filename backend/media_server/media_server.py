@@ -0,0 +1,85 @@
+"""Media file responses with byte ranges, cache validators and zero-copy bodies."""
+
+import os
+
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+# Bytes per read when the server has no sendfile-capable wsgi.file_wrapper.
+READ_BLOCK_SIZE = 256 * 1024
+DEFAULT_MAX_AGE = 3600
+
+class FileRange:
+    # File-like view of `length` bytes of an open file from its current position.
+    # read() stops at the end of the range; fileno() lets a server's
+    # wsgi.file_wrapper sendfile() it (gunicorn bounds that by Content-Length).
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+def media_validators(path):
+    # (strong ETag, Last-Modified timestamp, size) of a file from its size and mtime;
+    # outputs are replaced by rename, so a rewrite always changes the ETag.
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}", int(stat.st_mtime), stat.st_size
+
+def send_media(path, mimetype, download_name=None, max_age=DEFAULT_MAX_AGE):
+    # Response for GET/HEAD of a media file: 304 when If-None-Match/If-Modified-Since
+    # still match, 206 with one byte range for Range requests (ignored when If-Range
+    # no longer matches, 416 when unsatisfiable), otherwise 200 with the whole file.
+    # Bodies are the open file wrapped with wsgi.file_wrapper, so servers that
+    # support it (e.g. gunicorn) send full and ranged responses with sendfile.
+    etag, last_modified, size = media_validators(path)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={int(max_age)}",
+    }
+    if download_name:
+        headers["Content-Disposition"] = f'attachment; filename="{download_name}"'
+
+    def respond(status, body=b"", length=0):
+        response = Response(body, status=status, mimetype=mimetype, headers=headers, direct_passthrough=True)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.content_length = length
+        return response
+
+    if request.if_none_match:
+        if request.if_none_match.contains_weak(etag):
+            return respond(304)
+    elif request.if_modified_since and last_modified <= request.if_modified_since.timestamp():
+        return respond(304)
+
+    start, length, status = 0, size, 200
+    byte_range = request.range
+    if byte_range is not None and byte_range.units == "bytes" and len(byte_range.ranges) == 1:
+        if_range = request.if_range
+        current = (not if_range.etag and not if_range.date) or if_range.etag == etag or (
+            if_range.date is not None and last_modified <= if_range.date.timestamp())
+        if current:
+            span = byte_range.range_for_length(size)
+            if span is None:
+                headers["Content-Range"] = f"bytes */{size}"
+                return respond(416)
+            start, length, status = span[0], span[1] - span[0], 206
+            headers["Content-Range"] = f"bytes {span[0]}-{span[1] - 1}/{size}"
+
+    if request.method == "HEAD":
+        return respond(status, length=length)
+    f = open(path, 'rb')
+    f.seek(start)
+    return respond(status, wrap_file(request.environ, FileRange(f, length), READ_BLOCK_SIZE), length)
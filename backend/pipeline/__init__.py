@@ -0,0 +1,5 @@
+from .streaming import StreamingPipeline, DEFAULT_CHUNK_SIZE, DEFAULT_QUEUE_SIZE
+from .stages import Stage, StagePipeline, format_stage_report
+from .incremental import IncrementalStages, run_track_stages, stage_params, format_incremental_report
+from .geometry import compute_geometry, add_geometry_to_tracks, add_geometry_to_table
+"""Pipeline orchestration for running the analysis stages end to end."""
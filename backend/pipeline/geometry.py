@@ -0,0 +1,48 @@
+"""Batched position, camera-adjust and perspective transform over every detection at once."""
+
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import flatten_tracks, get_anchor_positions, warp_points
+
+def compute_geometry(bboxes, is_ball, frames, camera_movement_per_frame, view_transformer, camera_transforms=None):
+    # Array form of Tracker.add_position_to_tracks, add_adjust_positions_to_tracks and
+    # add_transformed_position_to_tracks. Returns (positions int64, adjusted float32,
+    # transformed float32 with NaN rows outside the pitch polygon), each (N, 2). With
+    # camera_transforms (F, 3, 3), adjusted positions are in the first frame's pixels.
+    positions = get_anchor_positions(bboxes,is_ball)
+    if camera_transforms is not None:
+        positions_adjusted = warp_points(positions,np.asarray(camera_transforms)[frames]).astype(np.float32)
+    else:
+        camera_movement = np.asarray(camera_movement_per_frame,dtype=np.float64).reshape(-1,2)
+        positions_adjusted = (positions - camera_movement[frames]).astype(np.float32)
+    positions_transformed = view_transformer.transform_points(positions_adjusted)
+    return positions.astype(np.int64), positions_adjusted, positions_transformed
+
+def add_geometry_to_tracks(tracks, camera_movement_per_frame, view_transformer, camera_transforms=None):
+    # One flatten of the nested dicts, a few array operations, one write-back pass.
+    infos, names, frames, _ = flatten_tracks(tracks)
+    if not infos:
+        return
+    positions, positions_adjusted, positions_transformed = compute_geometry(
+        [info['bbox'] for info in infos], names == 'ball', frames, camera_movement_per_frame, view_transformer, camera_transforms)
+    inside = (~np.isnan(positions_transformed[:,0])).tolist()
+    for info, position, adjusted, transformed, is_inside in zip(
+            infos, positions.tolist(), positions_adjusted.tolist(), positions_transformed.tolist(), inside):
+        info['position'] = tuple(position)
+        info['position_adjusted'] = tuple(adjusted)
+        info['position_transformed'] = transformed if is_inside else None
+
+def add_geometry_to_table(table, camera_movement_per_frame, view_transformer, camera_transforms=None):
+    # TrackTable variant: fills the position columns in place without any dicts.
+    columns = table.columns
+    is_ball = columns['object_type'] == table.object_type_id('ball')
+    positions, positions_adjusted, positions_transformed = compute_geometry(
+        columns['bbox'], is_ball, columns['frame'], camera_movement_per_frame, view_transformer, camera_transforms)
+    columns['position'][:] = positions
+    # Boxes without coordinates (e.g. a ball never detected) have no position.
+    columns['position'][np.isnan(columns['bbox']).any(axis=1)] = np.nan
+    columns['position_adjusted'][:] = positions_adjusted
+    columns['position_transformed'][:] = positions_transformed
+    for fields in table.present_fields.values():
+        fields.update(('position', 'position_adjusted', 'position_transformed'))
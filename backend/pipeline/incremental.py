@@ -0,0 +1,117 @@
+"""Stages after tracking, each reused from the analysis cache when its key matches."""
+
+import time
+import sys
+sys.path.append('../')
+from analysis_cache import CACHE_STAGES
+from track_table import TrackTable
+from .geometry import add_geometry_to_table
+
+# Track table columns each stage fills; a cached stage stores only these columns and
+# writes them back on a hit.
+STAGE_FIELDS = {
+    "positions": ("position",),
+    "transform": ("position_adjusted", "position_transformed"),
+    "speed": ("speed", "distance", "acceleration"),
+    "possession": ("has_ball",),
+}
+
+def capture_columns(table, fields):
+    # Copies of the stage's columns and, per object type, which of them it reported.
+    return {"columns": {field: table.columns[field].copy() for field in fields},
+            "present": {name: [field for field in fields if field in present]
+                        for name, present in table.present_fields.items()}}
+
+def restore_columns(table, captured):
+    for field, column in captured["columns"].items():
+        table.columns[field][:] = column
+    for name, fields in captured["present"].items():
+        table.present_fields[name].update(fields)
+
+def fits_table(entry, table):
+    # Entries cached before the stages ran on a TrackTable, or for other rows, are
+    # recomputed rather than restored.
+    columns = entry.get("columns")
+    return columns is not None and all(len(column) == len(table) for column in columns.values())
+
+class IncrementalStages:
+    def __init__(self, cache=None, keys=None):
+        # cache: analysis_cache.AnalysisCache, keys: its stage_keys for this video.
+        # Without them every stage is computed. report records per stage whether it
+        # was cached or computed and how long that took.
+        self.cache = cache
+        self.keys = keys if cache is not None else None
+        self.report = {}
+
+    def record(self, stage, status, seconds=0.0):
+        self.report[stage] = {"status": status, "seconds": round(seconds, 3)}
+
+    def run(self, stage, compute, table=None, reuse=None):
+        # Reuse the stage's cached result, or call compute() (which may fill columns of
+        # table in place) and cache what it returns plus the STAGE_FIELDS it wrote.
+        # reuse(result), if given, decides whether a cached result is still usable.
+        start = time.perf_counter()
+        key = self.keys.get(stage) if self.keys else None
+        entry = self.cache.get(key, stage) if key is not None else None
+        if entry is not None and table is not None and not fits_table(entry, table):
+            entry = None
+        if entry is not None and (reuse is None or reuse(entry["result"])):
+            if table is not None:
+                restore_columns(table, entry)
+            self.record(stage, "cached", time.perf_counter() - start)
+            return entry["result"]
+
+        result = compute()
+        if key is not None:
+            entry = capture_columns(table, STAGE_FIELDS.get(stage, ())) if table is not None else {}
+            self.cache.put(key, stage, dict(entry, result=result))
+        self.record(stage, "computed", time.perf_counter() - start)
+        return result
+
+def stage_params(camera_method, view_transformer, speed_and_distance_estimator, frame_rate, team_assigner,
+                 player_ball_assigner):
+    # Parameters of the cached stages that the pipeline configures, for stage_keys.
+    speed = speed_and_distance_estimator
+    return {
+        "camera": {"method": camera_method},
+        "transform": {"pixel_vertices": view_transformer.pixel_vertices.tolist(),
+                      "target_vertices": view_transformer.target_vertices.tolist()},
+        "speed": {"frame_rate": speed.resolve_frame_rate(frame_rate), "frame_window": speed.frame_window,
+                  "smoothing": speed.smoothing, "smoothing_window": speed.smoothing_window,
+                  "polyorder": speed.polyorder, "acceleration_noise": speed.acceleration_noise,
+                  "measurement_noise": speed.measurement_noise, "max_gap": speed.max_gap,
+                  "sprint_speed": speed.sprint_speed, "min_sprint_seconds": speed.min_sprint_seconds},
+        "teams": team_assigner.cache_params(),
+        "possession": {"max_player_ball_distance": player_ball_assigner.max_player_ball_distance,
+                       "min_possession_frames": player_ball_assigner.min_possession_frames,
+                       "release_frames": player_ball_assigner.release_frames},
+    }
+
+def run_track_stages(stages, tracks, tracker, view_transformer, camera_movement_per_frame, camera_transforms,
+                     speed_and_distance_estimator, frame_rate, team_assigner, player_ball_assigner):
+    # Ball interpolation, then positions -> transform -> speed -> teams -> possession
+    # over one TrackTable built from the finished tracks, each stage filling its
+    # columns in place; tracks itself is not modified. Team colors must already be
+    # sampled or restored on team_assigner.
+    # Returns (table, track summary, team ball control, possession spells).
+    # Interpolated ball boxes replace the detected ones and are cheap to rebuild.
+    tracks = dict(tracks, ball=tracker.interpolate_ball_positions(tracks["ball"]))
+    table = TrackTable.from_tracks(tracks)
+    stages.run("positions", lambda: tracker.add_position_to_table(table), table)
+    stages.run("transform", lambda: add_geometry_to_table(table, camera_movement_per_frame, view_transformer,
+                                                          camera_transforms), table)
+    track_summary = stages.run("speed", lambda: speed_and_distance_estimator.add_speed_and_distance_to_table(
+        table, frame_rate=frame_rate), table)
+    team_assigner.assign_teams_to_table(table)
+
+    def possession():
+        team_ball_control = player_ball_assigner.add_possession_to_table(table)
+        return team_ball_control, player_ball_assigner.spells
+    team_ball_control, spells = stages.run("possession", possession, table)
+    return table, track_summary, team_ball_control, spells
+
+def format_incremental_report(report):
+    # One line per stage in pipeline order: cached or computed, and its time.
+    order = {stage: index for index, stage in enumerate(CACHE_STAGES)}
+    return "\n".join(f"{stage:<12}{report[stage]['status']:>10}{report[stage]['seconds']:>10.3f}s"
+                     for stage in sorted(report, key=lambda stage: order.get(stage, len(order))))
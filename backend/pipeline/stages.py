@@ -0,0 +1,198 @@
+"""Stage engine that runs per-chunk pipeline steps in worker threads over bounded queues."""
+
+import queue
+import threading
+import time
+
+_END = object()
+
+
+class Stage:
+    def __init__(self, name, fn):
+        # fn takes one work item (a chunk dict) and returns the item for the next stage.
+        self.name = name
+        self.fn = fn
+
+
+class StageStats:
+    def __init__(self, name, queue_capacity=None):
+        self.name = name
+        self.items = 0
+        self.frames = 0
+        self.busy_seconds = 0.0
+        # Occupancy of the queue feeding this stage, sampled before every get.
+        self.queue_capacity = queue_capacity
+        self.queue_samples = 0
+        self.queue_total = 0
+        self.queue_max = 0
+
+    def record(self, item, seconds):
+        self.items += 1
+        self.frames += len(item.get("frames", ())) if isinstance(item, dict) else 0
+        self.busy_seconds += seconds
+
+    def sample_queue(self, size):
+        self.queue_samples += 1
+        self.queue_total += size
+        self.queue_max = max(self.queue_max, size)
+
+    def as_dict(self):
+        fps = self.frames / self.busy_seconds if self.busy_seconds > 0 else None
+        queue_avg = self.queue_total / self.queue_samples if self.queue_samples else None
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "frames": self.frames,
+            "busy_s": round(self.busy_seconds, 3),
+            "fps": round(fps, 2) if fps is not None else None,
+            "queue_avg": round(queue_avg, 2) if queue_avg is not None else None,
+            "queue_max": self.queue_max if self.queue_capacity else None,
+            "queue_capacity": self.queue_capacity,
+        }
+
+
+class StagePipeline:
+    def __init__(self, stages, threaded=True, queue_size=4):
+        # With threaded=True each stage (plus the source) runs in its own thread and
+        # stages are joined by queues of queue_size items, so a slow stage applies
+        # back-pressure instead of letting decoded chunks pile up in memory.
+        self.stages = list(stages)
+        self.threaded = threaded
+        self.queue_size = max(int(queue_size), 1)
+        self.source_stats = None
+        self.stats = []
+        self.wall_seconds = 0.0
+
+    def run(self, source, source_name="decode"):
+        # Yield the output of the last stage for every item produced by source.
+        capacity = self.queue_size if self.threaded else None
+        self.source_stats = StageStats(source_name)
+        self.stats = [StageStats(stage.name, capacity) for stage in self.stages]
+        start = time.perf_counter()
+        try:
+            if self.threaded:
+                yield from self._run_threaded(source)
+            else:
+                yield from self._run_sequential(source)
+        finally:
+            self.wall_seconds = time.perf_counter() - start
+
+    def _timed_source(self, source):
+        iterator = iter(source)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.source_stats.record(item, time.perf_counter() - started)
+            yield item
+
+    def _run_sequential(self, source):
+        for item in self._timed_source(source):
+            for stage, stats in zip(self.stages, self.stats):
+                started = time.perf_counter()
+                item = stage.fn(item)
+                stats.record(item, time.perf_counter() - started)
+            yield item
+
+    def _run_threaded(self, source):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        stop = threading.Event()
+        errors = []
+
+        def put(q, item):
+            # Block for space but give up once the pipeline is shutting down.
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q):
+            while True:
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    if stop.is_set():
+                        return _END
+
+        def produce():
+            try:
+                for item in self._timed_source(source):
+                    if not put(queues[0], item):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(queues[0], _END)
+
+        def work(stage, stats, q_in, q_out):
+            try:
+                while True:
+                    stats.sample_queue(q_in.qsize())
+                    item = get(q_in)
+                    if item is _END:
+                        break
+                    started = time.perf_counter()
+                    item = stage.fn(item)
+                    stats.record(item, time.perf_counter() - started)
+                    if not put(q_out, item):
+                        return
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(q_out, _END)
+
+        threads = [threading.Thread(target=produce, name="stage-decode", daemon=True)]
+        for index, (stage, stats) in enumerate(zip(self.stages, self.stats)):
+            threads.append(threading.Thread(
+                target=work,
+                args=(stage, stats, queues[index], queues[index + 1]),
+                name=f"stage-{stage.name}",
+                daemon=True,
+            ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = get(queues[-1])
+                if item is _END:
+                    break
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+    def report(self):
+        # Per-stage throughput and queue occupancy; the slowest stage is the bottleneck.
+        rows = [self.source_stats.as_dict()] if self.source_stats else []
+        rows += [stats.as_dict() for stats in self.stats]
+        return {
+            "threaded": self.threaded,
+            "wall_s": round(self.wall_seconds, 3),
+            "stages": rows,
+            "bottleneck": max(rows, key=lambda row: row["busy_s"])["stage"] if rows else None,
+        }
+
+
+def format_stage_report(report):
+    # Render a stage report as a fixed-width table for logs and the CLI.
+    lines = [f"{'stage':<10}{'frames':>8}{'busy (s)':>10}{'fps':>9}{'queue avg':>11}{'queue max':>11}"]
+    for row in report["stages"]:
+        fps = f"{row['fps']:.1f}" if row["fps"] is not None else "-"
+        queue_avg = f"{row['queue_avg']:.2f}" if row["queue_avg"] is not None else "-"
+        queue_max = (f"{row['queue_max']}/{row['queue_capacity']}"
+                     if row["queue_capacity"] else "-")
+        lines.append(f"{row['stage']:<10}{row['frames']:>8}{row['busy_s']:>10.2f}{fps:>9}{queue_avg:>11}{queue_max:>11}")
+    lines.append(f"wall {report['wall_s']:.2f}s, bottleneck: {report['bottleneck']}")
+    return "\n".join(lines)
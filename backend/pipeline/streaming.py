@@ -0,0 +1,386 @@
+"""Chunked two-pass analysis that keeps only a bounded window of frames in memory."""
+
+import os
+import shutil
+from pathlib import Path
+import numpy as np
+import sys
+sys.path.append('../')
+from utils import (iter_video_frames, iter_frame_chunks, open_video_writer, get_video_fps, FFmpegHLSWriter,
+                   TeeVideoWriter, DEFAULT_HLS_RENDITIONS, HLS_MASTER_PLAYLIST)
+from team_assigner import TeamAssigner
+from player_ball_assigner import PlayerBallAssigner
+from camera_movement_estimator import CameraMovementEstimator
+from view_transformer import ViewTransformer
+from speed_and_distance_estimator import SpeedAndDistance_Estimator
+from .stages import Stage, StagePipeline
+from .incremental import IncrementalStages, run_track_stages, stage_params
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_QUEUE_SIZE = 4
+
+class StreamingPipeline:
+    def __init__(self, tracker, chunk_size=DEFAULT_CHUNK_SIZE, threaded=False, queue_size=DEFAULT_QUEUE_SIZE,
+                 keyframes=None, speed_and_distance_estimator=None, team_color_method="kmeans",
+                 player_ball_assigner=None, camera_method="max", camera_segments=None, cache=None,
+                 frame_source=None):
+        # Frames are decoded lazily and only chunk_size of them are held per stage.
+        # Tracks, camera motion and team colors are small and kept for the whole video.
+        # With threaded=True decode, detect, track, camera, teams (and annotate, encode
+        # when rendering) each run in their own thread joined by bounded queues.
+        # keyframes: optional trackers.KeyframeDetector; YOLO then runs only on its
+        # keyframes and boxes on the frames in between are interpolated.
+        # speed_and_distance_estimator: configured SpeedAndDistance_Estimator; speeds
+        # use the source video's FPS unless it fixes a frame rate.
+        # team_color_method: jersey color method of the TeamAssigner built per video.
+        # player_ball_assigner: configured PlayerBallAssigner (possession hysteresis).
+        # camera_method: CameraMovementEstimator method; the robust ones (not max) map
+        # positions through the accumulated camera transforms.
+        # camera_segments: optional camera_movement_estimator.SegmentedCameraMovement;
+        # worker processes then estimate motion over video segments, ahead of and
+        # alongside detection, and the camera stage only collects their results.
+        # cache: optional analysis_cache.AnalysisCache; detections, tracks, camera
+        # motion and teams found there are reused (an identical video skips inference)
+        # and the ones computed are stored.
+        # frame_source: callable(video_path) -> frame iterator used by both passes,
+        # utils.iter_video_frames by default (e.g. a reader of a video still uploading).
+        self.tracker = tracker
+        self.keyframes = keyframes
+        self.chunk_size = max(int(chunk_size), 1)
+        self.threaded = threaded
+        self.queue_size = queue_size
+
+        self.table = None
+        self.tracks = None
+        self.camera_movement_per_frame = None
+        self.team_ball_control = None
+        self.possession_spells = []
+        self.frame_shape = None
+        self.frame_count = 0
+        self.frame_rate = None
+        self.track_summary = {}
+        self.stage_reports = {}
+
+        self.camera_method = camera_method
+        self.camera_movement_estimator = None
+        self.camera_segments = camera_segments
+        self.cache = cache
+        self.frame_source = frame_source or iter_video_frames
+        self.packed_detections = None
+        self.camera_segments_used = None
+        # Per-stage cached/computed report of the last analysis and render.
+        self.stages = IncrementalStages()
+        self.speed_and_distance_estimator = speed_and_distance_estimator or SpeedAndDistance_Estimator()
+        self.player_ball_assigner = player_ball_assigner or PlayerBallAssigner()
+        self.team_color_method = team_color_method
+        self.team_assigner = None
+
+    def _decode_chunks(self, video_path):
+        # Source for both passes: consecutive chunks tagged with their first frame index.
+        frame_num = 0
+        for frames in iter_frame_chunks(self.frame_source(video_path), self.chunk_size):
+            yield {"start_frame": frame_num, "frames": frames}
+            frame_num += len(frames)
+
+    def _run_stages(self, name, source, stages):
+        engine = StagePipeline(stages, threaded=self.threaded, queue_size=self.queue_size)
+        try:
+            yield from engine.run(source)
+        finally:
+            self.stage_reports[name] = engine.report()
+
+    # --- Pass 1 stages ---
+
+    def _detect_stage(self, chunk):
+        chunk["detections"] = self.tracker.to_supervision(self.tracker.detect_frames(chunk["frames"]))
+        if self.packed_detections is not None:
+            self.packed_detections.append(self.tracker.pack_detections(chunk["detections"], chunk["start_frame"]))
+        return chunk
+
+    def _cached_detections_stage(self, cached_detections):
+        def unpack_detections(chunk):
+            start = chunk["start_frame"]
+            chunk["detections"] = self.tracker.unpack_detections(cached_detections, start, start + len(chunk["frames"]))
+            return chunk
+        return unpack_detections
+
+    def _track_stage(self, chunk):
+        chunk["tracks"] = self.tracker.tracks_from_supervision(chunk.pop("detections"))
+        return chunk
+
+    def _keyframe_track_stage(self, chunk):
+        # Detection and tracking share one stage so keyframe choice can depend on the
+        # track speed from the previous chunk.
+        chunk["tracks"] = self.keyframes.get_chunk_tracks(chunk["frames"], chunk["camera_movement"])
+        return chunk
+
+    def _cached_tracks_stage(self, cached_tracks):
+        def slice_tracks(chunk):
+            start = chunk["start_frame"]
+            end = start + len(chunk["frames"])
+            chunk["tracks"] = {name: object_tracks[start:end]
+                               for name, object_tracks in cached_tracks.items()}
+            return chunk
+        return slice_tracks
+
+    def _camera_stage(self, chunk):
+        if self.camera_movement_estimator is None:
+            self.camera_movement_estimator = CameraMovementEstimator(chunk["frames"][0], method=self.camera_method)
+        chunk["camera_movement"] = self.camera_movement_estimator.update_camera_movement(chunk["frames"])
+        return chunk
+
+    def _segmented_camera_stage(self, chunk):
+        if self.camera_movement_estimator is None:
+            self.camera_movement_estimator = CameraMovementEstimator(chunk["frames"][0], method=self.camera_method)
+        start = chunk["start_frame"]
+        chunk["camera_movement"] = self.camera_segments.get_camera_movement(start, start + len(chunk["frames"]))
+        return chunk
+
+    def _cached_camera_stage(self, cached_camera_movement):
+        def slice_camera_movement(chunk):
+            if self.camera_movement_estimator is None:
+                self.camera_movement_estimator = CameraMovementEstimator(chunk["frames"][0], method=self.camera_method)
+            start = chunk["start_frame"]
+            chunk["camera_movement"] = cached_camera_movement[start:start + len(chunk["frames"])]
+            return chunk
+        return slice_camera_movement
+
+    def _team_stage(self, chunk):
+        # Sample jersey colors while the frames are available; teams are voted per
+        # track once the whole video has been seen.
+        team_assigner = self.team_assigner
+        for frame_num, (frame, player_track) in enumerate(zip(chunk["frames"], chunk["tracks"]["players"]),
+                                                          start=chunk["start_frame"]):
+            if player_track:
+                team_assigner.sample(frame_num, frame, player_track)
+        return chunk
+
+    def _cache_get(self, keys, stage):
+        return self.cache.get(keys[stage], stage) if keys else None
+
+    def _cache_put(self, keys, stage, value):
+        if keys:
+            self.cache.put(keys[stage], stage, value)
+
+    def run_stage(self, stage, compute, params=None, reuse=None):
+        # Run a stage after analysis (feedback, render) through the cache: its key
+        # derives from the analysis keys and params, and compute() is skipped on a hit.
+        if self.stages.keys:
+            self.stages.keys[stage] = self.cache.stage_key(stage, self.stages.keys, params)
+        return self.stages.run(stage, compute, reuse=reuse)
+
+    def analyze(self, video_path, on_progress=None, video_digest=None):
+        # Pass 1: decode chunk by chunk and run detection, tracking, camera motion and
+        # team sampling while the frames are available, then run the track stages.
+        # With a cache, each stage whose key is unchanged is reused, and the video is
+        # not decoded at all when tracks, camera motion and teams are all cached.
+        # video_digest is the video's SHA-256 when known ahead of reading the file
+        # (e.g. declared for an upload still in progress).
+        self.camera_movement_estimator = None
+        self.team_assigner = TeamAssigner(color_method=self.team_color_method)
+        self.frame_shape = None
+        self.packed_detections = None
+        self.camera_segments_used = None
+        self.frame_rate = get_video_fps(video_path)
+
+        # Cached camera motion keeps its transforms; cached teams are used only with
+        # tracks that match their key.
+        keys = {}
+        if self.cache is not None:
+            keys = self.cache.stage_keys(video_path, self.tracker, self.keyframes, stage_params(
+                self.camera_method, ViewTransformer(), self.speed_and_distance_estimator, self.frame_rate,
+                self.team_assigner, self.player_ball_assigner), video_digest=video_digest)
+        self.stages = IncrementalStages(self.cache, keys)
+        cached_camera_movement = cached_detections = cached_teams = None
+        cached_camera = self._cache_get(keys, "camera")
+        if cached_camera is not None:
+            cached_camera_movement = cached_camera["camera_movement"]
+        cached_tracks = self._cache_get(keys, "tracks")
+        if cached_tracks is None and self.keyframes is None:
+            cached_detections = self._cache_get(keys, "detections")
+        if cached_tracks is not None or cached_detections is not None:
+            cached_teams = self._cache_get(keys, "teams")
+        if keys and cached_tracks is None and cached_detections is None and self.keyframes is None:
+            self.packed_detections = []
+        for stage, cached in (("detections", cached_detections), ("tracks", cached_tracks),
+                              ("camera", cached_camera_movement), ("teams", cached_teams)):
+            if cached is not None:
+                self.stages.record(stage, "cached")
+
+        if (cached_camera is not None and cached_camera.get("frame_shape") is not None
+                and cached_teams is not None and cached_tracks is None and cached_detections is not None):
+            # ByteTrack over cached detections needs no frames.
+            cached_tracks = self.tracker.tracks_from_supervision(self.tracker.unpack_detections(cached_detections))
+            self._cache_put(keys, "tracks", cached_tracks)
+            self.stages.record("tracks", "computed")
+        if (cached_camera is not None and cached_camera.get("frame_shape") is not None
+                and cached_tracks is not None and cached_teams is not None):
+            tracks = cached_tracks
+            camera_movement_per_frame = cached_camera_movement
+            self.frame_shape = cached_camera["frame_shape"]
+            frame_num = len(tracks["players"])
+            if on_progress is not None:
+                on_progress(frame_num)
+        else:
+            tracks, camera_movement_per_frame, frame_num = self._analyze_frames(
+                video_path, keys, cached_tracks, cached_detections, cached_camera_movement, cached_teams, on_progress)
+
+        camera_transforms = None
+        if cached_camera is not None:
+            camera_transforms = cached_camera["camera_transforms"]
+            if cached_camera.get("frame_shape") is None:
+                self._cache_put(keys, "camera", dict(cached_camera, frame_shape=self.frame_shape))
+        elif cached_camera_movement is None:
+            camera_transforms = (self.camera_segments_used or self.camera_movement_estimator).camera_transforms[:frame_num]
+            self._cache_put(keys, "camera", {"camera_movement": camera_movement_per_frame,
+                                             "camera_transforms": camera_transforms, "frame_shape": self.frame_shape})
+            self.stages.record("camera", "computed")
+        if self.camera_method == "max":
+            camera_transforms = None
+
+        if cached_teams is not None:
+            self.team_assigner.restore_teams(cached_teams)
+        self.table, self.track_summary, self.team_ball_control, self.possession_spells = run_track_stages(
+            self.stages, tracks, self.tracker, ViewTransformer(), camera_movement_per_frame, camera_transforms,
+            self.speed_and_distance_estimator, self.frame_rate, self.team_assigner, self.player_ball_assigner)
+        if cached_teams is None:
+            self._cache_put(keys, "teams", self.team_assigner.export_teams())
+            self.stages.record("teams", "computed")
+
+        # Rendering reads the table through its dict-compatible view.
+        self.tracks = self.table.view()
+        self.camera_movement_per_frame = camera_movement_per_frame
+        self.frame_count = frame_num
+        return self.tracks
+
+    def _analyze_frames(self, video_path, keys, cached_tracks, cached_detections, cached_camera_movement,
+                        cached_teams, on_progress):
+        # Decode pass for the stages that need frames. Returns (tracks, camera motion,
+        # frames decoded).
+        # Camera motion runs first so keyframe selection can react to fast pans. The
+        # camera stage also builds the estimator, which rendering needs.
+        stages = []
+        camera_segments = self.camera_segments if cached_camera_movement is None else None
+        self.camera_segments_used = camera_segments
+        if camera_segments is not None:
+            camera_segments.submit(video_path)
+            stages.append(Stage("camera", self._segmented_camera_stage))
+        elif cached_camera_movement is None:
+            stages.append(Stage("camera", self._camera_stage))
+        else:
+            stages.append(Stage("camera", self._cached_camera_stage(cached_camera_movement)))
+        if cached_tracks is not None:
+            stages.append(Stage("track", self._cached_tracks_stage(cached_tracks)))
+        elif self.keyframes is not None:
+            self.keyframes.reset()
+            stages.append(Stage("detect", self._keyframe_track_stage))
+        elif cached_detections is not None:
+            stages += [Stage("detect", self._cached_detections_stage(cached_detections)), Stage("track", self._track_stage)]
+        else:
+            stages += [Stage("detect", self._detect_stage), Stage("track", self._track_stage)]
+        if cached_teams is None:
+            stages.append(Stage("teams", self._team_stage))
+
+        tracks = {"players": [], "referees": [], "ball": []}
+        camera_movement_per_frame = []
+        frame_num = 0
+
+        try:
+            for chunk in self._run_stages("analyze", self._decode_chunks(video_path), stages):
+                if self.frame_shape is None:
+                    self.frame_shape = chunk["frames"][0].shape
+                for name, object_tracks in chunk["tracks"].items():
+                    tracks.setdefault(name, []).extend(object_tracks)
+                camera_movement_per_frame += chunk["camera_movement"]
+
+                frame_num += len(chunk["frames"])
+                if on_progress is not None:
+                    on_progress(frame_num)
+        finally:
+            if camera_segments is not None:
+                camera_segments.close()
+
+        if frame_num == 0:
+            raise ValueError(f"No frames read from video: {video_path}")
+
+        if cached_tracks is None:
+            if self.packed_detections:
+                self._cache_put(keys, "detections", self.tracker.concat_packed_detections(self.packed_detections))
+                self.stages.record("detections", "computed")
+            self._cache_put(keys, "tracks", tracks)
+            self.stages.record("tracks", "computed")
+        self.packed_detections = None
+        return tracks, camera_movement_per_frame, frame_num
+
+    # --- Pass 2 stages ---
+
+    def _annotate_stage(self, chunk):
+        start_frame = chunk["start_frame"]
+        if self.camera_movement_estimator is None:
+            # Analysis fully read from the cache never built the estimator.
+            self.camera_movement_estimator = CameraMovementEstimator(chunk["frames"][0], method=self.camera_method)
+        output_frames = self.tracker.draw_annotations(chunk["frames"], self.tracks, self.team_ball_control,
+                                                      start_frame=start_frame)
+        output_frames = self.camera_movement_estimator.draw_camera_movement(
+            output_frames, self.camera_movement_per_frame, start_frame=start_frame)
+        self.speed_and_distance_estimator.draw_speed_and_distance(output_frames, self.tracks,
+                                                                  start_frame=start_frame)
+        chunk["frames"] = output_frames
+        return chunk
+
+    def _encode_stage(self, writer):
+        def encode(chunk):
+            for frame in chunk["frames"]:
+                writer.write(frame)
+            return chunk
+        return encode
+
+    def render(self, video_path, output_path, fps=24, encoder="opencv", on_progress=None,
+               hls_dir=None, hls_renditions=DEFAULT_HLS_RENDITIONS):
+        # Pass 2: decode the video again, annotate each chunk and write it out as soon
+        # as it is ready. encoder="ffmpeg" produces a browser-playable H.264 MP4 directly.
+        # With hls_dir the same frames are also encoded as adaptive HLS renditions
+        # (utils.FFmpegHLSWriter), segment by segment while rendering. When the same
+        # analysis was rendered before and those outputs are unchanged, they are
+        # copied instead.
+        def reuse(rendered):
+            previous = Path(rendered["path"])
+            if not (previous.exists() and previous.stat().st_size == rendered["size"]
+                    and previous.stat().st_mtime_ns == rendered["mtime_ns"]):
+                return False
+            previous_hls = Path(rendered["hls"]) if rendered.get("hls") else None
+            if hls_dir is not None and (previous_hls is None or not (previous_hls / HLS_MASTER_PLAYLIST).exists()):
+                return False
+            if previous.resolve() != Path(output_path).resolve():
+                shutil.copyfile(previous, output_path)
+            if hls_dir is not None and previous_hls.resolve() != Path(hls_dir).resolve():
+                shutil.rmtree(hls_dir, ignore_errors=True)
+                shutil.copytree(previous_hls, hls_dir)
+            if on_progress is not None:
+                on_progress(self.frame_count)
+            return True
+
+        params = {"fps": fps, "encoder": encoder}
+        if hls_dir is not None:
+            params["hls"] = [list(rendition) for rendition in hls_renditions]
+        self.run_stage("render", lambda: self._render(video_path, output_path, fps, encoder, on_progress,
+                                                      hls_dir, hls_renditions),
+                       params=params, reuse=reuse)
+
+    def _render(self, video_path, output_path, fps, encoder, on_progress, hls_dir=None,
+                hls_renditions=DEFAULT_HLS_RENDITIONS):
+        writer = open_video_writer(output_path, fps, encoder)
+        if hls_dir is not None:
+            writer = TeeVideoWriter(writer, FFmpegHLSWriter(hls_dir, fps, renditions=hls_renditions))
+        stages = [Stage("annotate", self._annotate_stage), Stage("encode", self._encode_stage(writer))]
+        frame_num = 0
+        try:
+            for chunk in self._run_stages("render", self._decode_chunks(video_path), stages):
+                frame_num += len(chunk["frames"])
+                if on_progress is not None:
+                    on_progress(frame_num)
+        finally:
+            writer.close()
+        stat = os.stat(output_path)
+        return {"path": os.path.abspath(output_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                "hls": os.path.abspath(hls_dir) if hls_dir is not None else None}
@@ -1,14 +1,24 @@
 """Assign ball possession to the nearest player in a frame."""
 
-import sys 
+import numpy as np
+from itertools import chain
+import sys
 sys.path.append('../')
-from utils import get_center_of_bbox, measure_distance
+from utils import get_center_of_bbox, measure_distance, flatten_tracks, get_anchor_positions
 
 class PlayerBallAssigner():
-    def __init__(self):
+    def __init__(self, max_player_ball_distance=70, min_possession_frames=1, release_frames=0):
         # Max distance (pixels) to consider a player as possessing the ball.
-        self.max_player_ball_distance = 70
-    
+        self.max_player_ball_distance = max_player_ball_distance
+        # Hysteresis for the batched engine: a new possessor must be nearest for
+        # min_possession_frames consecutive frames before possession switches, and up to
+        # release_frames frames with nobody near the ball keep the current possessor.
+        # The defaults turn it off and reproduce assign_ball_to_player frame by frame.
+        self.min_possession_frames = max(int(min_possession_frames), 1)
+        self.release_frames = max(int(release_frames), 0)
+        self.possessor = None
+        self.spells = []
+
     def assign_ball_to_player(self,players,ball_bbox):
         # Choose the closest player to the ball center at this frame.
         ball_position = get_center_of_bbox(ball_bbox)
@@ -30,3 +40,100 @@ class PlayerBallAssigner():
                     assigned_player = player_id
 
         return assigned_player
+
+    # --- Batched engine ---
+
+    def compute_possession(self,player_frames,player_ids,player_bboxes,ball_bboxes):
+        # All frames at once. player_frames/player_ids are (N,) and player_bboxes (N, 4)
+        # in per-frame insertion order; ball_bboxes is (F, 4) with NaN rows where the
+        # ball is missing. Returns the (F,) possessing player id per frame (-1 for none).
+        # There is one ball per frame, so every player row is one candidate pair and a
+        # single vectorized pass replaces a spatial index.
+        num_frames = len(ball_bboxes)
+        possessor = np.full(num_frames,-1,dtype=np.int64)
+        if len(player_frames) == 0 or num_frames == 0:
+            return possessor
+        player_bboxes = np.asarray(player_bboxes,dtype=np.float64).reshape(-1,4)
+        ball_position = get_anchor_positions(ball_bboxes,True)[player_frames]
+        # Same arithmetic as measure_distance on both feet, so ties and the threshold
+        # resolve exactly as in assign_ball_to_player.
+        foot_y = (player_bboxes[:,3]-ball_position[:,1])**2
+        distance = np.minimum(np.sqrt((player_bboxes[:,0]-ball_position[:,0])**2 + foot_y),
+                              np.sqrt((player_bboxes[:,2]-ball_position[:,0])**2 + foot_y))
+        rows = np.flatnonzero(distance < self.max_player_ball_distance)
+        # Nearest candidate per frame; equal distances keep the earlier player.
+        rows = rows[np.lexsort((rows,distance[rows],player_frames[rows]))]
+        frames = player_frames[rows]
+        first = np.r_[True,frames[1:] != frames[:-1]] if len(rows) else np.zeros(0,dtype=bool)
+        possessor[frames[first]] = player_ids[rows[first]]
+        return self._apply_hysteresis(possessor)
+
+    def _apply_hysteresis(self,possessor):
+        # Runs of the same raw possessor (or of nobody) that are too short to count are
+        # given to the possessor of the last run that did count.
+        if self.min_possession_frames <= 1 and self.release_frames == 0:
+            return possessor
+        starts = np.flatnonzero(np.r_[True,possessor[1:] != possessor[:-1]])
+        lengths = np.diff(np.r_[starts,len(possessor)])
+        values = possessor[starts]
+        stable = np.where(values >= 0,lengths >= self.min_possession_frames,lengths > self.release_frames)
+        last_stable = np.maximum.accumulate(np.where(stable,np.arange(len(values)),-1))
+        return np.repeat(np.where(last_stable >= 0,values[np.maximum(last_stable,0)],-1),lengths)
+
+    def team_control(self,possessor,player_ids,player_teams):
+        # Team of the possessor per frame, carrying the last team over frames without
+        # one (0 before the first possession).
+        unique_ids, first_rows = np.unique(player_ids,return_index=True)
+        has_possessor = possessor >= 0
+        teams = np.zeros(len(possessor),dtype=np.int64)
+        if len(unique_ids):
+            teams[has_possessor] = np.asarray(player_teams)[first_rows[np.searchsorted(unique_ids,possessor[has_possessor])]]
+        last = np.maximum.accumulate(np.where(has_possessor,np.arange(len(possessor)),-1))
+        return np.where(last >= 0,teams[np.maximum(last,0)],0)
+
+    def possession_spells(self,possessor,team_ball_control):
+        # Uninterrupted runs of one possessor: player, team, first and last frame.
+        starts = np.flatnonzero(np.r_[True,possessor[1:] != possessor[:-1]]) if len(possessor) else np.zeros(0,dtype=np.int64)
+        ends = np.r_[starts[1:],len(possessor)]-1
+        return [{"player_id": int(possessor[start]), "team": int(team_ball_control[start]),
+                 "start_frame": int(start), "end_frame": int(end), "frames": int(end-start+1)}
+                for start, end in zip(starts.tolist(),ends.tolist()) if possessor[start] >= 0]
+
+    def add_possession_to_tracks(self,tracks):
+        # Mark has_ball on each frame's possessor and return the per-frame team in
+        # control; the possessor array and possession spells are kept on the assigner.
+        infos, _, frames, player_ids = flatten_tracks(tracks,['players'])
+        ball_bboxes = np.full((len(tracks['players']),4),np.nan)
+        for frame_num, ball_track in enumerate(tracks['ball'][:len(ball_bboxes)]):
+            if 1 in ball_track:
+                ball_bboxes[frame_num] = ball_track[1]['bbox']
+        player_bboxes = np.fromiter(chain.from_iterable(info['bbox'] for info in infos),dtype=np.float64,count=4*len(infos))
+        possessor = self.compute_possession(frames,player_ids,player_bboxes,ball_bboxes)
+
+        # Only the possessors' rows are read back, for has_ball and their team.
+        rows = np.flatnonzero(possessor[frames] == player_ids)
+        possessor_infos = [infos[row] for row in rows.tolist()]
+        team_ball_control = self.team_control(possessor,player_ids[rows],[info.get('team',0) for info in possessor_infos])
+        for info in possessor_infos:
+            info['has_ball'] = True
+        self.possessor = possessor
+        self.spells = self.possession_spells(possessor,team_ball_control)
+        return team_ball_control
+
+    def add_possession_to_table(self,table):
+        # TrackTable variant: fills the has_ball column in place.
+        columns = table.columns
+        players = table.object_rows('players')
+        balls = table.object_rows('ball')
+        ball_bboxes = np.full((table.num_frames,4),np.nan)
+        is_ball = columns['track_id'][balls] == 1
+        ball_bboxes[columns['frame'][balls][is_ball]] = columns['bbox'][balls][is_ball]
+        frames, player_ids = columns['frame'][players].astype(np.int64), columns['track_id'][players].astype(np.int64)
+        possessor = self.compute_possession(frames,player_ids,columns['bbox'][players],ball_bboxes)
+        team_ball_control = self.team_control(possessor,player_ids,columns['team'][players].astype(np.int64))
+
+        columns['has_ball'][players] = possessor[frames] == player_ids
+        table.present_fields['players'].add('has_ball')
+        self.possessor = possessor
+        self.spells = self.possession_spells(possessor,team_ball_control)
+        return team_ball_control
@@ -8,8 +8,13 @@ import json
 import os
 import sys
 
+import numpy as np
 import requests as http_requests
 
+from track_table import TrackTable
+
+ROLES = ("deep", "mid", "advanced")
+
 
 def safe_mean(values):
     if not values:
@@ -175,27 +180,8 @@ def _build_windows(frame_idxs, fps):
     return windows
 
 
-def generate_player_feedback(tracks, fps, video_id, output_folder="output_videos",
-                              min_presence_sec=10.0, use_llm=True,
-                              llm_model="openai/gpt-4o-mini", llm_timeout=30):
-    """Generate per-player feedback from tracks and save as JSON.
-
-    Args:
-        tracks: dict with keys "players", "ball", "referees" from tracker pipeline
-        fps: video frames per second
-        video_id: unique identifier for this video
-        output_folder: where to save the JSON file
-        min_presence_sec: skip players present less than this
-        use_llm: whether to call OpenRouter for LLM insights
-        llm_model: model ID for OpenRouter
-        llm_timeout: LLM request timeout in seconds
-
-    Returns:
-        list of player feedback dicts (also saved to disk)
-    """
-    api_key = os.getenv("OPENROUTER_API_KEY") if use_llm else None
-
-    # Aggregate per-player stats
+def _player_stats_from_tracks(tracks):
+    """Per-player stats and the total possession frames from the nested tracks dicts."""
     raw_stats = {}
     total_possession_frames = 0
 
@@ -213,7 +199,7 @@ def generate_player_feedback(tracks, fps, video_id, output_folder="output_videos
                     "speed_samples_with_frame": [],
                     "presence_frame_idxs": [],
                     "pos_frames_with_pos": [],
-                    "pos_frames_with_pos_t": [],
+                    "transformed_xs": [],
                     "role_counts": {"deep": 0, "mid": 0, "advanced": 0},
                     "movement_frames": set(),
                 }
@@ -236,25 +222,7 @@ def generate_player_feedback(tracks, fps, video_id, output_folder="output_videos
             elif "position" in track:
                 s["pos_frames_with_pos"].append((frame_num, track["position"]))
             if "position_transformed" in track and track["position_transformed"] is not None:
-                s["pos_frames_with_pos_t"].append((frame_num, track["position_transformed"]))
-
-    # Compute relative position ranks using transformed X
-    avg_x_by_player = {}
-    for player_id, s in raw_stats.items():
-        xs = [pos[0] for _, pos in s["pos_frames_with_pos_t"] if pos is not None]
-        if xs:
-            avg_x_by_player[player_id] = sum(xs) / len(xs)
-
-    sorted_players = sorted(avg_x_by_player.items(), key=lambda x: x[1])
-    for rank, (player_id, _) in enumerate(sorted_players):
-        pct = (rank / max(len(sorted_players) - 1, 1)) * 100
-        raw_stats[player_id]["position_rank_pct"] = round(pct, 2)
-        if pct >= 66:
-            raw_stats[player_id]["position_role"] = "advanced"
-        elif pct <= 33:
-            raw_stats[player_id]["position_role"] = "deep"
-        else:
-            raw_stats[player_id]["position_role"] = "mid"
+                s["transformed_xs"].append(track["position_transformed"][0])
 
     # Per-frame role counts
     for frame_num, player_track in enumerate(tracks["players"]):
@@ -279,6 +247,127 @@ def generate_player_feedback(tracks, fps, video_id, output_folder="output_videos
             if pid in raw_stats:
                 raw_stats[pid]["role_counts"][role] += 1
 
+    return raw_stats, total_possession_frames
+
+
+def _player_stats_from_table(table):
+    """Same stats as _player_stats_from_tracks from TrackTable columns.
+
+    Works on a memory-mapped track file without materializing a dict per row:
+    each field is one array operation over the player rows.
+    """
+    columns = table.columns
+    rows = table.object_rows("players")
+    frames = np.asarray(columns["frame"][rows], dtype=np.int64)
+    track_ids = np.asarray(columns["track_id"][rows])
+    teams = np.asarray(columns["team"][rows])
+    has_ball = np.asarray(columns["has_ball"][rows])
+    speed = np.asarray(columns["speed"][rows], dtype=np.float64)
+    distance = np.asarray(columns["distance"][rows], dtype=np.float64)
+    xs = np.asarray(columns["position_transformed"][rows, 0], dtype=np.float64)
+
+    # Rows grouped by player (frame order kept), players in order of first appearance.
+    player_ids, first_rows, players, counts = np.unique(
+        track_ids, return_index=True, return_inverse=True, return_counts=True)
+    players = players.reshape(-1)
+    order = np.argsort(players, kind="stable")
+    bounds = np.r_[0, np.cumsum(counts)]
+    role_counts = _table_role_counts(frames, xs, players, len(player_ids))
+
+    raw_stats = {}
+    for index in np.argsort(first_rows, kind="stable").tolist():
+        player_rows = order[bounds[index]:bounds[index + 1]]
+        player_frames = frames[player_rows]
+        player_speed = speed[player_rows]
+        with_speed = ~np.isnan(player_speed)
+        player_distance = distance[player_rows]
+        player_xs = xs[player_rows]
+        possession_frame_idxs = player_frames[has_ball[player_rows]].tolist()
+        speed_samples = player_speed[with_speed].tolist()
+        team = int(teams[player_rows[0]])
+        player_id = int(player_ids[index])
+        raw_stats[player_id] = {
+            "player_id": player_id,
+            "team": team or None,
+            "frames_present": len(player_rows),
+            "possession_frames": len(possession_frame_idxs),
+            "speed_samples": speed_samples,
+            "distance_samples": player_distance[~np.isnan(player_distance)].tolist(),
+            "possession_frame_idxs": possession_frame_idxs,
+            "speed_samples_with_frame": list(zip(speed_samples, player_frames[with_speed].tolist())),
+            "presence_frame_idxs": player_frames.tolist(),
+            "transformed_xs": player_xs[~np.isnan(player_xs)].tolist(),
+            "role_counts": dict(zip(ROLES, role_counts[index].tolist())),
+            "movement_frames": set(player_frames[with_speed & (player_speed > 0)].tolist()),
+        }
+    return raw_stats, int(np.count_nonzero(has_ball))
+
+
+def _table_role_counts(frames, xs, players, num_players):
+    """(num_players, 3) deep/mid/advanced frame counts, as the per-frame role loop.
+
+    Within each frame with at least two transformed positions, players are ranked
+    by x (ties keep row order) and the rank percentile picks the role.
+    """
+    valid = ~np.isnan(xs)
+    frames, xs, players = frames[valid], xs[valid], players[valid]
+    order = np.lexsort((xs, frames))
+    frames, players = frames[order], players[order]
+    starts = np.searchsorted(frames, frames, side="left")
+    sizes = np.searchsorted(frames, frames, side="right") - starts
+    pct = (np.arange(len(frames)) - starts) / np.maximum(sizes - 1, 1) * 100
+    roles = np.where(pct >= 66, 2, np.where(pct <= 33, 0, 1))
+    ranked = sizes >= 2
+    counts = np.zeros((num_players, len(ROLES)), dtype=np.int64)
+    np.add.at(counts, (players[ranked], roles[ranked]), 1)
+    return counts
+
+
+def generate_player_feedback(tracks, fps, video_id, output_folder="output_videos",
+                              min_presence_sec=10.0, use_llm=True,
+                              llm_model="openai/gpt-4o-mini", llm_timeout=30):
+    """Generate per-player feedback from tracks and save as JSON.
+
+    Args:
+        tracks: dict with keys "players", "ball", "referees" from tracker pipeline,
+            or a TrackTable (e.g. from track_table.load_track_file)
+        fps: video frames per second
+        video_id: unique identifier for this video
+        output_folder: where to save the JSON file, or None to not save it
+        min_presence_sec: skip players present less than this
+        use_llm: whether to call OpenRouter for LLM insights
+        llm_model: model ID for OpenRouter
+        llm_timeout: LLM request timeout in seconds
+
+    Returns:
+        list of player feedback dicts (also saved to disk)
+    """
+    api_key = os.getenv("OPENROUTER_API_KEY") if use_llm else None
+
+    # Aggregate per-player stats
+    if isinstance(tracks, TrackTable):
+        raw_stats, total_possession_frames = _player_stats_from_table(tracks)
+    else:
+        raw_stats, total_possession_frames = _player_stats_from_tracks(tracks)
+
+    # Compute relative position ranks using transformed X
+    avg_x_by_player = {}
+    for player_id, s in raw_stats.items():
+        xs = s["transformed_xs"]
+        if xs:
+            avg_x_by_player[player_id] = sum(xs) / len(xs)
+
+    sorted_players = sorted(avg_x_by_player.items(), key=lambda x: x[1])
+    for rank, (player_id, _) in enumerate(sorted_players):
+        pct = (rank / max(len(sorted_players) - 1, 1)) * 100
+        raw_stats[player_id]["position_rank_pct"] = round(pct, 2)
+        if pct >= 66:
+            raw_stats[player_id]["position_role"] = "advanced"
+        elif pct <= 33:
+            raw_stats[player_id]["position_role"] = "deep"
+        else:
+            raw_stats[player_id]["position_role"] = "mid"
+
     # Build output
     output = []
 
@@ -388,11 +477,37 @@ def generate_player_feedback(tracks, fps, video_id, output_folder="output_videos
 
     output.sort(key=lambda x: (-x["possession_frames"], -x["distance_m"]))
 
-    # Save to disk
+    if output_folder is not None:
+        save_player_feedback(output, video_id, output_folder)
+    return output
+
+
+def save_player_feedback(output, video_id, output_folder="output_videos"):
+    """Save player feedback as <video_id>_feedback.json in output_folder."""
     os.makedirs(output_folder, exist_ok=True)
     out_path = os.path.join(output_folder, f"{video_id}_feedback.json")
     with open(out_path, "w", encoding="utf-8") as f:
         json.dump(output, f, indent=2)
 
     print(f"Wrote {len(output)} player feedback entries to {out_path}")
-    return output
+    return out_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from track_table import load_track_file
+
+    parser = argparse.ArgumentParser(description="Player feedback from a saved track file.")
+    parser.add_argument("tracks", help="Track file written by main.py --save-tracks or the web app.")
+    parser.add_argument("--video-id", default=None, help="Output name (default: the track file name).")
+    parser.add_argument("--output-folder", default="output_videos", help="Where to save the feedback JSON.")
+    parser.add_argument("--min-presence-sec", type=float, default=10.0, help="Skip players present less than this.")
+    parser.add_argument("--llm", action="store_true", help="Rewrite feedback with OpenRouter (OPENROUTER_API_KEY).")
+    cli_args = parser.parse_args()
+
+    # The track file is memory-mapped; only the player columns are read.
+    table, _, metadata = load_track_file(cli_args.tracks)
+    video_id = cli_args.video_id or metadata.get("id") or os.path.splitext(os.path.basename(cli_args.tracks))[0]
+    generate_player_feedback(table, metadata.get("fps") or 24, video_id, output_folder=cli_args.output_folder,
+                             min_presence_sec=cli_args.min_presence_sec, use_llm=cli_args.llm)
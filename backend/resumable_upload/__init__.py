@@ -0,0 +1,3 @@
+from .resumable_upload import (write_chunk, file_checksum, parse_checksum, decodable_prefix, iter_growing_video_frames,
+                               ChecksumMismatch, DEFAULT_CHUNK_SIZE)
+"""Chunked resumable video uploads and decoding of uploads still in progress."""
@@ -0,0 +1,122 @@
+"""Chunked resumable uploads written in place, and decoding a video while it uploads."""
+
+import hashlib
+import os
+import time
+
+import numpy as np
+
+from utils import iter_video_frames
+from utils.mp4_boxes import MP4_EXTENSIONS, read_moov, video_sample_ends
+
+# Bytes read from the request body and written (and hashed) per block.
+WRITE_BLOCK_SIZE = 1024 * 1024
+# Chunk size suggested to clients; any size up to the remaining bytes is accepted.
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+CHECKSUM_ALGORITHMS = {"sha256", "sha1", "md5"}
+# Frames a decoder may need beyond a sample before showing it (B-frame reordering).
+REORDER_MARGIN = 8
+
+class ChecksumMismatch(ValueError):
+    pass
+
+def parse_checksum(value):
+    # "<algorithm> <hex digest>" (as in an Upload-Checksum header) -> (algorithm, digest).
+    if not value:
+        return None
+    algorithm, _, digest = value.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS or not digest:
+        raise ValueError(f"Unsupported checksum {value!r}; use '<{'|'.join(sorted(CHECKSUM_ALGORITHMS))}> <hex>'")
+    return algorithm, digest.strip().lower()
+
+def write_chunk(path, offset, stream, length, checksum=None, block_size=WRITE_BLOCK_SIZE):
+    # Copy `length` bytes from a file-like stream (the request body) into path at
+    # offset, block by block, without buffering the chunk. With a checksum
+    # ((algorithm, hex digest)) the bytes are hashed as they are written and
+    # ChecksumMismatch is raised if they differ; bytes past offset are then simply
+    # overwritten by the retried chunk. Returns the number of bytes written.
+    hasher = hashlib.new(checksum[0]) if checksum else None
+    mode = 'r+b' if os.path.exists(path) else 'wb'
+    written = 0
+    with open(path, mode) as f:
+        f.seek(offset)
+        while written < length:
+            block = stream.read(min(block_size, length - written))
+            if not block:
+                break
+            f.write(block)
+            if hasher is not None:
+                hasher.update(block)
+            written += len(block)
+    if written != length:
+        raise IOError(f"Chunk ended after {written} of {length} bytes")
+    if hasher is not None and hasher.hexdigest() != checksum[1]:
+        raise ChecksumMismatch(f"{checksum[0]} of chunk at offset {offset} does not match")
+    return written
+
+def file_checksum(path, algorithm="sha256", block_size=WRITE_BLOCK_SIZE):
+    hasher = hashlib.new(algorithm)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+def decodable_prefix(path, received):
+    # Byte offset past each video sample (decode order) if the first `received`
+    # bytes of an MP4/MOV upload already hold its moov box, so frames can be decoded
+    # as their samples arrive; None until then, and for formats or layouts (moov
+    # after the media data) that are only decodable once complete.
+    if os.path.splitext(path)[1].lower() not in MP4_EXTENSIONS:
+        return None
+    moov = read_moov(path, received)
+    if moov is None:
+        return None
+    ends = video_sample_ends(moov)
+    if ends is None or len(ends) == 0:
+        return None
+    return ends
+
+def iter_growing_video_frames(video_path, upload_state, poll_interval=0.5, stall_timeout=300.0,
+                              reorder_margin=REORDER_MARGIN):
+    # Frames of a video that is still being uploaded. upload_state() returns
+    # (received bytes, complete) and may raise to abort. While incomplete, only
+    # frames whose samples (plus reorder_margin more) have fully arrived are
+    # decoded, reopening the file at the next frame as more arrives; once complete
+    # the rest is read as from a finished file. TimeoutError if no bytes arrive for
+    # stall_timeout seconds.
+    frame_num = 0
+    sample_ends = None
+    last_received, last_change = None, time.monotonic()
+    while True:
+        received, complete = upload_state()
+        if complete:
+            yield from iter_video_frames(video_path, start_frame=frame_num)
+            return
+        if received != last_received:
+            last_received, last_change = received, time.monotonic()
+        elif time.monotonic() - last_change > stall_timeout:
+            raise TimeoutError(f"Upload of {video_path} stalled at {received} bytes")
+        if sample_ends is None:
+            sample_ends = decodable_prefix(video_path, received)
+            if sample_ends is not None:
+                # Samples available are those before the first one not fully received.
+                sample_ends = np.maximum.accumulate(sample_ends)
+        ready = 0
+        if sample_ends is not None:
+            ready = int(np.searchsorted(sample_ends, received, side="right")) - reorder_margin
+        if ready <= frame_num:
+            time.sleep(poll_interval)
+            continue
+        start_frame = frame_num
+        frames = iter_video_frames(video_path, start_frame=frame_num)
+        try:
+            for frame in frames:
+                yield frame
+                frame_num += 1
+                if frame_num >= ready:
+                    break
+        finally:
+            frames.close()
+        if frame_num == start_frame:
+            time.sleep(poll_interval)
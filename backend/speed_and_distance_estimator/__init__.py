@@ -1,2 +1,2 @@
-from .speed_and_distance_estimator import SpeedAndDistance_Estimator
+from .speed_and_distance_estimator import SpeedAndDistance_Estimator, SMOOTHING_METHODS
 """Speed and distance estimation utilities."""
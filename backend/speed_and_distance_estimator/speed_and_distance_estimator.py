@@ -1,60 +1,477 @@
 """Compute and render player speed and distance metrics."""
 
 import cv2
-import sys 
+import numpy as np
+from itertools import chain
+from scipy.signal import savgol_coeffs
+import sys
 sys.path.append('../')
-from utils import measure_distance ,get_foot_position
+from utils import measure_distance, get_foot_position, flatten_tracks
+from track_table import OBJECT_TYPES
+
+DEFAULT_FRAME_RATE = 24
+# window: the original block estimate (displacement between the first and last frame
+# of each frame_window block); savgol and kalman smooth every contiguous trajectory
+# and differentiate it, giving a per-frame speed.
+SMOOTHING_METHODS = ("window", "savgol", "kalman")
+# Objects that never get speed and distance.
+SKIPPED_OBJECTS = ("ball", "referees")
+
+def _lookup(keys, targets, guess):
+    # Index of each target in the sorted keys, or -1 where it is absent. guess is the
+    # index the target has when the track has no missing frames in between, which is
+    # almost always right; only the misses go through searchsorted.
+    index = np.clip(guess, 0, len(keys)-1)
+    missed = np.flatnonzero(keys[index] != targets)
+    if len(missed):
+        index[missed] = np.minimum(np.searchsorted(keys, targets[missed]), len(keys)-1)
+    return np.where(keys[index] == targets, index, -1)
+
+def _norm(vectors):
+    # Row-wise length of (N, 2) vectors; faster than np.hypot on large arrays.
+    return np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+
+def _run_rows(run_starts, run_lengths):
+    # Row indices and in-run offsets of every row of the given runs.
+    offsets = np.arange(int(run_lengths.sum())) - np.repeat(np.cumsum(run_lengths)-run_lengths, run_lengths)
+    return np.repeat(run_starts, run_lengths) + offsets, offsets
 
 class SpeedAndDistance_Estimator():
-    def __init__(self):
-        # Window size (frames) and frame rate for speed estimation.
-        self.frame_window=5
-        self.frame_rate=24
-    
-    def add_speed_and_distance_to_tracks(self,tracks):
-        # Compute rolling speed and total distance per tracked player.
-        total_distance= {}
+    def __init__(self, frame_rate=None, frame_window=5, smoothing="window", smoothing_window=11,
+                 polyorder=2, acceleration_noise=3.0, measurement_noise=0.5, max_gap=5,
+                 sprint_speed=25.0, min_sprint_seconds=1.0):
+        # frame_rate: fixed frames per second; None uses the rate the caller passes
+        # (the source video's) and falls back to 24.
+        # frame_window: block length in window mode, and the span in frames over which
+        # acceleration is measured in every mode.
+        # smoothing_window / polyorder: Savitzky-Golay window (odd, frames) and order.
+        # acceleration_noise (m/s^2) / measurement_noise (m): constant-velocity Kalman
+        # model; a higher ratio follows the raw positions more closely.
+        # max_gap: with savgol/kalman, up to this many consecutive frames without a
+        # pitch position are linearly bridged instead of splitting the trajectory.
+        # sprint_speed (km/h) / min_sprint_seconds: a sprint is a run of consecutive
+        # frames at or above sprint_speed lasting at least min_sprint_seconds.
+        if smoothing not in SMOOTHING_METHODS:
+            raise ValueError(f"Unknown smoothing '{smoothing}', expected one of {SMOOTHING_METHODS}")
+        self.frame_rate = frame_rate
+        self.frame_window = max(int(frame_window), 1)
+        self.smoothing = smoothing
+        self.smoothing_window = max(int(smoothing_window), 1) | 1
+        self.polyorder = int(polyorder)
+        self.acceleration_noise = acceleration_noise
+        self.measurement_noise = measurement_noise
+        self.max_gap = max(int(max_gap), 0)
+        self.sprint_speed = sprint_speed
+        self.min_sprint_seconds = min_sprint_seconds
+        self.track_summary = {}
 
-        for object, object_tracks in tracks.items():
-            if object == "ball" or object == "referees":
-                continue 
-            number_of_frames = len(object_tracks)
-            for frame_num in range(0,number_of_frames, self.frame_window):
-                last_frame = min(frame_num+self.frame_window,number_of_frames-1 )
+    def resolve_frame_rate(self, frame_rate=None):
+        return float(self.frame_rate or frame_rate or DEFAULT_FRAME_RATE)
 
-                for track_id,_ in object_tracks[frame_num].items():
-                    if track_id not in object_tracks[last_frame]:
-                        continue
+    def add_speed_and_distance_to_tracks(self,tracks,frame_rate=None):
+        # Compute speed, cumulative distance and acceleration per tracked player and
+        # return the per-track summary {object: {track_id: {distance, max_speed, sprints}}}.
+        if self.smoothing == "window":
+            # Flattening the dicts for the vectorized core costs more than walking
+            # them once, so window mode keeps the per-window loop for dict input.
+            self.track_summary = self._window_tracks(tracks,self.resolve_frame_rate(frame_rate))
+            return self.track_summary
+        object_names = [name for name in tracks if name not in SKIPPED_OBJECTS]
+        infos, names, frames, track_ids = flatten_tracks(tracks,object_names)
+        missing = (np.nan,np.nan)
+        positions = np.fromiter(chain.from_iterable(info.get('position_transformed') or missing for info in infos),
+                                dtype=np.float64,count=2*len(infos)).reshape(-1,2)
+        object_codes = np.zeros(len(names),dtype=np.int64)
+        for code, name in enumerate(object_names[1:],start=1):
+            object_codes[names == name] = code
+        num_frames = max((len(tracks[name]) for name in object_names),default=0)
+
+        speed, distance, acceleration, summary = self.compute(
+            object_codes,track_ids,frames,positions,num_frames,self.resolve_frame_rate(frame_rate))
+
+        rows = np.flatnonzero(~np.isnan(speed))
+        for info, row_speed, row_distance, row_acceleration in zip(
+                map(infos.__getitem__,rows.tolist()),speed[rows].tolist(),distance[rows].tolist(),acceleration[rows].tolist()):
+            info['speed'] = row_speed
+            info['distance'] = row_distance
+            if row_acceleration == row_acceleration:
+                info['acceleration'] = row_acceleration
 
-                    start_position = object_tracks[frame_num][track_id]['position_transformed']
-                    end_position = object_tracks[last_frame][track_id]['position_transformed']
+        self.track_summary = {object_names[code]: tracks_stats for code, tracks_stats in summary.items()}
+        return self.track_summary
 
+    def _window_tracks(self,tracks,frame_rate):
+        # The block estimate over the dicts, block by block: each block's speed and
+        # running distance go on its frames except the end, and acceleration compares
+        # it with the track's previous block, frame_window frames earlier.
+        window = self.frame_window
+        min_frames = max(int(np.ceil(self.min_sprint_seconds*frame_rate)),1)
+        summary = {}
+        for object, object_tracks in tracks.items():
+            if object in SKIPPED_OBJECTS:
+                continue
+            # track_id -> [distance, max speed, sprints, previous block start, previous
+            # block speed, whether every previous block frame had the track,
+            # last fast frame, fast run length]
+            states = {}
+            number_of_frames = len(object_tracks)
+            for frame_num in range(0,number_of_frames,window):
+                last_frame = min(frame_num+window,number_of_frames-1)
+                if last_frame <= frame_num:
+                    continue
+                end_tracks = object_tracks[last_frame]
+                block_tracks = object_tracks[frame_num:last_frame]
+                for track_id, track_info in object_tracks[frame_num].items():
+                    end_info = end_tracks.get(track_id)
+                    if end_info is None:
+                        continue
+                    start_position = track_info.get('position_transformed')
+                    end_position = end_info.get('position_transformed')
                     if start_position is None or end_position is None:
                         continue
-                    
+
                     distance_covered = measure_distance(start_position,end_position)
-                    time_elapsed = (last_frame-frame_num)/self.frame_rate
-                    speed_meteres_per_second = distance_covered/time_elapsed
-                    speed_km_per_hour = speed_meteres_per_second*3.6
-
-                    if object not in total_distance:
-                        total_distance[object]= {}
-                    
-                    if track_id not in total_distance[object]:
-                        total_distance[object][track_id] = 0
-                    
-                    total_distance[object][track_id] += distance_covered
-
-                    for frame_num_batch in range(frame_num,last_frame):
-                        if track_id not in tracks[object][frame_num_batch]:
+                    speed = distance_covered/((last_frame-frame_num)/frame_rate)*3.6
+                    state = states.get(track_id)
+                    if state is None:
+                        state = states[track_id] = [0.0,speed,0,-1,0.0,False,-1,0]
+                    state[0] += distance_covered
+                    if speed > state[1]:
+                        state[1] = speed
+                    distance = state[0]
+                    acceleration = None
+                    if state[3] == frame_num-window:
+                        acceleration = (speed/3.6-state[4]/3.6)/(window/frame_rate)
+                    previous_complete = state[5]
+                    state[3], state[4], state[5] = frame_num, speed, True
+
+                    if acceleration is not None and previous_complete and speed < self.sprint_speed:
+                        # Common case: the whole previous block had the track, so every
+                        # present frame here has its frame_window-earlier speed.
+                        for frame_tracks in block_tracks:
+                            info = frame_tracks.get(track_id)
+                            if info is None:
+                                state[5] = False
+                            else:
+                                info['speed'] = speed
+                                info['distance'] = distance
+                                info['acceleration'] = acceleration
+                        continue
+                    fast = speed >= self.sprint_speed
+                    for frame_num_batch, frame_tracks in enumerate(block_tracks,start=frame_num):
+                        info = frame_tracks.get(track_id)
+                        if info is None:
+                            state[5] = False
                             continue
-                        tracks[object][frame_num_batch][track_id]['speed'] = speed_km_per_hour
-                        tracks[object][frame_num_batch][track_id]['distance'] = total_distance[object][track_id]
-    
-    def draw_speed_and_distance(self,frames,tracks):
+                        info['speed'] = speed
+                        info['distance'] = distance
+                        if acceleration is not None and (previous_complete or track_id in object_tracks[frame_num_batch-window]):
+                            info['acceleration'] = acceleration
+                        if fast:
+                            # Consecutive fast frames form a run; a finished run long
+                            # enough is a sprint.
+                            if state[6] != frame_num_batch-1:
+                                state[2] += state[7] >= min_frames
+                                state[7] = 0
+                            state[6] = frame_num_batch
+                            state[7] += 1
+            if states:
+                summary[object] = {track_id: {"distance": state[0], "max_speed": state[1],
+                                              "sprints": state[2] + (state[7] >= min_frames)}
+                                   for track_id, state in states.items()}
+        return summary
+
+    def add_speed_and_distance_to_table(self,table,frame_rate=None):
+        # TrackTable variant: fills the speed, distance and acceleration columns in place.
+        # Rows are grouped by object type, so each object's columns are sliced, not copied.
+        columns = table.columns
+        self.track_summary = {}
+        for object_name in OBJECT_TYPES:
+            if object_name in SKIPPED_OBJECTS:
+                continue
+            rows = table.object_rows(object_name)
+            speed, distance, acceleration, summary = self.compute(
+                np.zeros(rows.stop-rows.start,dtype=np.int64),columns['track_id'][rows],
+                columns['frame'][rows],columns['position_transformed'][rows].astype(np.float64),
+                table.num_frames,self.resolve_frame_rate(frame_rate))
+            columns['speed'][rows] = speed
+            columns['distance'][rows] = distance
+            columns['acceleration'][rows] = acceleration
+            table.present_fields[object_name].update(('speed','distance','acceleration'))
+            if summary:
+                self.track_summary[object_name] = summary[0]
+        return self.track_summary
+
+    def compute(self,object_codes,track_ids,frames,positions,num_frames,frame_rate):
+        # Core over flat rows in any order: (N,) object codes, track ids and frames and
+        # (N, 2) pitch positions in meters (NaN off the pitch). Returns speed (km/h),
+        # cumulative distance (m) and acceleration (m/s^2) per row, NaN where undefined,
+        # and {object_code: {track_id: stats}}.
+        num_rows = len(frames)
+        if num_rows == 0:
+            return np.zeros(0), np.zeros(0), np.zeros(0), {}
+
+        # Sort into contiguous per-track trajectories, in frame order.
+        order = np.lexsort((frames,track_ids,object_codes))
+        codes, ids = object_codes[order], track_ids[order]
+        # np.take is much faster than fancy indexing for gathering (N, 2) rows.
+        frames, positions = frames[order], np.take(positions,order,axis=0)
+        new_track = np.r_[True,(codes[1:] != codes[:-1]) | (ids[1:] != ids[:-1])]
+        track_index = np.cumsum(new_track)-1
+        # (track, frame) keys ascend in this order, so any row is one searchsorted away.
+        span = max(int(num_frames),int(frames.max())+1)
+        keys = track_index*span + frames
+
+        if self.smoothing == "window":
+            sorted_speed, sorted_distance = self._window_speed(keys,track_index,frames,positions,span,num_frames,frame_rate)
+        else:
+            sorted_speed, sorted_distance = self._smoothed_speed(new_track,track_index,frames,positions,frame_rate)
+
+        # Acceleration: change in speed over frame_window frames of the same track.
+        previous = np.where(frames >= self.frame_window,
+                            _lookup(keys,keys-self.frame_window,np.arange(num_rows)-self.frame_window),-1)
+        speed_ms = sorted_speed/3.6
+        sorted_acceleration = np.where(previous >= 0,(speed_ms-speed_ms[previous])/(self.frame_window/frame_rate),np.nan)
+
+        summary = self._summarize(new_track,track_index,codes,ids,frames,sorted_speed,sorted_distance,frame_rate)
+        speed, distance, acceleration = np.empty(num_rows), np.empty(num_rows), np.empty(num_rows)
+        speed[order] = sorted_speed
+        distance[order] = sorted_distance
+        acceleration[order] = sorted_acceleration
+        return speed, distance, acceleration, summary
+
+    def _window_speed(self,keys,track_index,frames,positions,span,num_frames,frame_rate):
+        # Vectorized form of the block estimate: a block starts on every frame_window-th
+        # frame a track is present and ends frame_window frames later (or on the last
+        # frame); its speed and running distance cover the block's frames except the end.
+        window = self.frame_window
+        speed = np.full(len(frames),np.nan)
+        distance = np.full(len(frames),np.nan)
+
+        phase = frames % window
+        start_rows = np.flatnonzero(phase == 0)
+        block_start = frames[start_rows]
+        block_end = np.minimum(block_start+window,num_frames-1)
+        end_rows = _lookup(keys,track_index[start_rows]*span + block_end,start_rows + block_end - block_start)
+        valid = ((end_rows >= 0) & (block_end > block_start)
+                 & ~np.isnan(positions[start_rows,0]) & ~np.isnan(positions[end_rows,0]))
+
+        delta = np.take(positions,end_rows,axis=0)-np.take(positions,start_rows,axis=0)
+        block_distance = (delta[:,0]**2 + delta[:,1]**2)**0.5
+        block_speed = block_distance/((block_end-block_start)/frame_rate)*3.6
+        # Running distance summed block by block in order, exactly as the scalar loop did.
+        block_total = np.full(len(start_rows),np.nan)
+        block_track = track_index[start_rows]
+        valid_blocks = np.flatnonzero(valid)
+        bounds = np.flatnonzero(np.r_[True,block_track[valid_blocks][1:] != block_track[valid_blocks][:-1],True])
+        for first, last in zip(bounds[:-1].tolist(),bounds[1:].tolist()):
+            block_total[valid_blocks[first:last]] = np.cumsum(block_distance[valid_blocks[first:last]])
+
+        # Each row takes the block starting at its frame rounded down to the window: the
+        # latest start row at or before it, if that is the same track and frame.
+        block_of_row = np.full(len(frames),-1,dtype=np.int64)
+        block_of_row[start_rows] = np.arange(len(start_rows))
+        latest_start = np.maximum.accumulate(block_of_row)
+        has_start = latest_start >= 0
+        row_block = np.where(has_start,latest_start,0)
+        start_of_row = start_rows[row_block]
+        assigned = (has_start & valid[row_block] & (track_index[start_of_row] == track_index)
+                    & (frames[start_of_row] == frames - phase) & (frames < block_end[row_block]))
+        row_block = row_block[assigned]
+        speed[assigned] = block_speed[row_block]
+        distance[assigned] = block_total[row_block]
+        return speed, distance
+
+    def _smoothed_speed(self,new_track,track_index,frames,positions,frame_rate):
+        # Smooth each run of consecutive frames with a position, differentiate for speed
+        # and accumulate the smoothed path length per track across runs.
+        speed = np.full(len(frames),np.nan)
+        distance = np.full(len(frames),np.nan)
+        positions = self._bridge_gaps(track_index,frames,positions)
+        rows = np.flatnonzero(~np.isnan(positions[:,0]))
+        if len(rows) == 0:
+            return speed, distance
+
+        run_track = track_index[rows]
+        new_run = np.r_[True,(run_track[1:] != run_track[:-1]) | (np.diff(frames[rows]) != 1)]
+        run_starts = np.flatnonzero(new_run)
+        run_lengths = np.diff(np.r_[run_starts,len(rows)])
+        points = np.take(positions,rows,axis=0)
+        if self.smoothing == "savgol":
+            smoothed, velocity = self._savgol_runs(points,run_starts,run_lengths,1.0/frame_rate)
+        else:
+            smoothed, velocity = self._kalman_runs(points,run_starts,run_lengths,1.0/frame_rate)
+
+        step = np.zeros(len(rows))
+        step[1:] = _norm(smoothed[1:]-smoothed[:-1])
+        step[new_run] = 0.0
+        travelled = np.cumsum(step)
+        track_first = np.flatnonzero(np.r_[True,run_track[1:] != run_track[:-1]])
+        travelled -= np.repeat(travelled[track_first],np.diff(np.r_[track_first,len(rows)]))
+
+        speed[rows] = _norm(velocity)*3.6
+        distance[rows] = travelled
+        return speed, distance
+
+    def _bridge_gaps(self,track_index,frames,positions):
+        # Linearly interpolate missing positions between two known ones of the same track
+        # when the frames in between are all present and at most max_gap are missing.
+        missing = np.isnan(positions[:,0])
+        if self.max_gap == 0 or not missing.any():
+            return positions
+        index = np.arange(len(positions))
+        before = np.maximum.accumulate(np.where(missing,-1,index))
+        after = np.minimum.accumulate(np.where(missing,len(index),index)[::-1])[::-1]
+        rows = np.flatnonzero(missing & (before >= 0) & (after < len(index)))
+        before, after = before[rows], after[rows]
+        bridged = ((track_index[before] == track_index[after])
+                   & (frames[after]-frames[before] == after-before)
+                   & (after-before-1 <= self.max_gap))
+        rows, before, after = rows[bridged], before[bridged], after[bridged]
+        weight = ((rows-before)/(after-before))[:,None]
+        positions = positions.copy()
+        positions[rows] = positions[before] + (positions[after]-positions[before])*weight
+        return positions
+
+    def _savgol_runs(self,points,run_starts,run_lengths,dt):
+        # Savitzky-Golay smoothing and first derivative of every run at once, matching
+        # scipy's savgol_filter(mode='interp') per run. Runs shorter than the window use
+        # the largest odd window that fits; runs too short for the polynomial fall back
+        # to finite differences, and single points get no velocity.
+        full_size = self.smoothing_window
+        half = full_size//2
+        run_window = np.minimum(full_size,run_lengths - (1 - run_lengths % 2))
+        coeffs = {size: (self._savgol_coeffs(size,0,dt),self._savgol_coeffs(size,1,dt))
+                  for size in np.unique(run_window).tolist() if size > self.polyorder}
+
+        # Rows centred in a full window are one correlation over all points; every other
+        # row is overwritten below.
+        smoothed = points.copy()
+        velocity = np.full(points.shape,np.nan)
+        if full_size in coeffs:
+            for output, weights in zip((smoothed,velocity),coeffs[full_size]):
+                for axis in range(2):
+                    output[:,axis] = np.correlate(np.ascontiguousarray(points[:,axis]),weights[half],'same')
+
+        # Rows fitted off-centre: the first and last half of full-window runs, where the
+        # window is clamped inside the run, and every row of shorter runs.
+        full = run_window == full_size
+        head_rows, head_offsets = _run_rows(run_starts[full],np.full(int(full.sum()),half))
+        tail_rows, tail_offsets = _run_rows(run_starts[full]+run_lengths[full]-half,np.full(int(full.sum()),half))
+        short = ~full & (run_window > self.polyorder)
+        short_rows, short_offsets = _run_rows(run_starts[short],run_lengths[short])
+        short_window = np.repeat(run_window[short],run_lengths[short])
+        short_position = short_offsets - np.clip(short_offsets-short_window//2,0,np.repeat(run_lengths[short],run_lengths[short])-short_window)
+        rows = np.concatenate([head_rows,tail_rows,short_rows])
+        window = np.concatenate([np.full(len(head_rows)+len(tail_rows),full_size),short_window])
+        position = np.concatenate([head_offsets,tail_offsets+half+1,short_position])
+
+        group_key = window*full_size + position
+        order = np.argsort(group_key,kind='stable')
+        rows, group_key = rows[order], group_key[order]
+        bounds = np.flatnonzero(np.r_[True,group_key[1:] != group_key[:-1],True])
+        for first, last in zip(bounds[:-1].tolist(),bounds[1:].tolist()):
+            selected = rows[first:last]
+            size, j = divmod(int(group_key[first]),full_size)
+            window_start = selected - j
+            for output, weights in zip((smoothed,velocity),coeffs[size]):
+                value = np.zeros((len(selected),2))
+                for k in range(size):
+                    value += weights[j,k]*np.take(points,window_start+k,axis=0)
+                output[selected] = value
+
+        # Runs too short to fit: raw positions and one-sided or central differences.
+        tiny = run_window <= self.polyorder
+        tiny_rows, tiny_offsets = _run_rows(run_starts[tiny],run_lengths[tiny])
+        tiny_lengths = np.repeat(run_lengths[tiny],run_lengths[tiny])
+        smoothed[tiny_rows] = points[tiny_rows]
+        velocity[tiny_rows] = np.nan
+        moving = tiny_lengths > 1
+        tiny_rows, tiny_offsets, tiny_lengths = tiny_rows[moving], tiny_offsets[moving], tiny_lengths[moving]
+        previous = tiny_rows - (tiny_offsets > 0)
+        following = tiny_rows + (tiny_offsets < tiny_lengths-1)
+        velocity[tiny_rows] = (points[following]-points[previous]) / ((following-previous)*dt)[:,None]
+        return smoothed, velocity
+
+    def _savgol_coeffs(self,size,deriv,dt):
+        # (size, size) weights: row j fits the window and evaluates at its j-th sample.
+        return np.array([savgol_coeffs(size,self.polyorder,deriv=deriv,delta=dt,pos=j,use='dot')
+                         for j in range(size)])
+
+    def _kalman_runs(self,points,run_starts,run_lengths,dt):
+        # Steady-state constant-velocity Kalman filter over every run in parallel: step
+        # k updates the k-th point of all runs at least k+1 long. Each run starts at its
+        # first point with the velocity of its first frame_window frames.
+        alpha, beta = self._kalman_gains(dt)
+        smoothed = points.copy()
+        velocity = np.full(points.shape,np.nan)
+
+        order = np.argsort(-run_lengths,kind='stable')
+        starts, lengths = run_starts[order], run_lengths[order]
+        ahead = np.minimum(lengths-1,self.frame_window)
+        estimate = points[starts].copy()
+        rate = np.zeros(estimate.shape)
+        moving = ahead > 0
+        rate[moving] = (points[starts[moving]+ahead[moving]]-estimate[moving]) / (ahead[moving]*dt)[:,None]
+        velocity[starts[moving]] = rate[moving]
+
+        # Outputs are collected per step and scattered once at the end.
+        stepped_rows, stepped_estimates, stepped_rates = [], [], []
+        active_counts = np.searchsorted(-lengths,-np.arange(1,int(lengths[0])),side='left')
+        for step, active in enumerate(active_counts.tolist(),start=1):
+            current = starts[:active]+step
+            predicted = estimate[:active] + dt*rate[:active]
+            residual = np.take(points,current,axis=0)-predicted
+            estimate[:active] = predicted + alpha*residual
+            rate[:active] += (beta/dt)*residual
+            stepped_rows.append(current)
+            stepped_estimates.append(estimate[:active].copy())
+            stepped_rates.append(rate[:active].copy())
+        if stepped_rows:
+            stepped_rows = np.concatenate(stepped_rows)
+            smoothed[stepped_rows] = np.concatenate(stepped_estimates)
+            velocity[stepped_rows] = np.concatenate(stepped_rates)
+        return smoothed, velocity
+
+    def _kalman_gains(self,dt):
+        # Steady-state gains of a constant-velocity Kalman filter with white acceleration
+        # noise (the alpha-beta filter with Kalata's tracking index).
+        tracking_index = self.acceleration_noise*dt*dt/self.measurement_noise
+        r = (4 + tracking_index - np.sqrt(8*tracking_index + tracking_index**2))/4
+        alpha = 1 - r*r
+        beta = 2*(2-alpha) - 4*np.sqrt(1-alpha)
+        return alpha, beta
+
+    def _summarize(self,new_track,track_index,codes,ids,frames,speed,distance,frame_rate):
+        # Per-track totals: final distance, top speed and sprint count.
+        fast = speed >= self.sprint_speed
+        continues = np.r_[False,fast[:-1] & ~new_track[1:] & (np.diff(frames) == 1)]
+        run_start = fast & ~continues
+        run_id = np.cumsum(run_start)-1
+        run_length = np.bincount(run_id[fast],minlength=int(run_start.sum()))
+        min_frames = max(int(np.ceil(self.min_sprint_seconds*frame_rate)),1)
+        sprint_tracks = track_index[np.flatnonzero(run_start)[run_length >= min_frames]]
+        num_tracks = int(track_index[-1])+1
+        sprints = np.bincount(sprint_tracks,minlength=num_tracks)
+
+        track_first = np.flatnonzero(new_track)
+        max_speed = np.fmax.reduceat(speed,track_first)
+        total_distance = np.fmax.reduceat(distance,track_first)
+        summary = {}
+        for track, row in enumerate(track_first.tolist()):
+            if np.isnan(max_speed[track]):
+                continue
+            summary.setdefault(int(codes[row]),{})[int(ids[row])] = {
+                "distance": float(total_distance[track]),
+                "max_speed": float(max_speed[track]),
+                "sprints": int(sprints[track]),
+            }
+        return summary
+
+    def draw_speed_and_distance(self,frames,tracks,start_frame=0):
         # Overlay speed and distance values for each player.
         output_frames = []
-        for frame_num, frame in enumerate(frames):
+        for frame_num, frame in enumerate(frames, start=start_frame):
             for object, object_tracks in tracks.items():
                 if object == "ball" or object == "referees":
                     continue 
@@ -1,2 +1,3 @@
 from .team_assigner import TeamAssigner
+from .jersey_colors import dominant_colors, extract_jersey_pixels, COLOR_METHODS
 """Team assignment and jersey color clustering."""
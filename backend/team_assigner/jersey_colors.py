@@ -0,0 +1,132 @@
+"""Batched dominant jersey color of many player crops at once."""
+
+import numpy as np
+
+# kmeans: a 2-means per crop, keeping the cluster that does not own most of the crop's
+# corners (the rule of the original per-crop KMeans); histogram: mean color of the most
+# common quantized color among pixels away from the corner (background) color; median:
+# per-channel median of those pixels.
+COLOR_METHODS = ("kmeans", "histogram", "median")
+
+def extract_jersey_pixels(frames, bboxes, max_pixels=None):
+    # Top half of every box, flattened into one (P, 3) uint8 pixel array. frames is a
+    # single frame shared by all boxes or one frame per box. Crops are subsampled with a
+    # uniform stride to at most about max_pixels pixels (None keeps every pixel). Returns
+    # (pixels, per-crop pixel counts, (M, 5, 3) full-resolution corner pixels followed
+    # by the center pixel, (N,) mask of boxes with a non-empty crop; the other arrays
+    # cover only those).
+    single_frame = isinstance(frames, np.ndarray) and frames.ndim == 3
+    chunks, corners, valid = [], [], []
+    for index, bbox in enumerate(bboxes):
+        frame = frames if single_frame else frames[index]
+        image = frame[int(bbox[1]):int(bbox[3]),int(bbox[0]):int(bbox[2])]
+        top_half_image = image[0:int(image.shape[0]/2),:]
+        if top_half_image.size == 0:
+            valid.append(False)
+            continue
+        valid.append(True)
+        height, width = top_half_image.shape[:2]
+        corners.append((top_half_image[0,0],top_half_image[0,-1],top_half_image[-1,0],top_half_image[-1,-1],
+                        top_half_image[height//2,width//2]))
+        if max_pixels:
+            stride = int(np.ceil(np.sqrt(height*width/max_pixels)))
+            if stride > 1:
+                top_half_image = top_half_image[::stride,::stride]
+        chunks.append(top_half_image.reshape(-1,3))
+
+    if not chunks:
+        return np.zeros((0,3),dtype=np.uint8), np.zeros(0,dtype=np.int64), np.zeros((0,5,3),dtype=np.uint8), np.array(valid,dtype=bool)
+    lengths = np.fromiter(map(len,chunks),dtype=np.int64,count=len(chunks))
+    return np.concatenate(chunks), lengths, np.asarray(corners,dtype=np.uint8), np.array(valid,dtype=bool)
+
+def dominant_colors(frames, bboxes, method="kmeans", max_pixels=None, max_iter=30, background_distance=40.0):
+    # (N, 3) float64 jersey color per box in the frame's channel order, NaN rows for
+    # boxes whose crop is empty. Subsampling (max_pixels) is opt-in: at 256 pixels kmeans
+    # is about 15x faster but about 1% of its team labels differ from full crops.
+    if method not in COLOR_METHODS:
+        raise ValueError(f"Unknown color method '{method}', expected one of {COLOR_METHODS}")
+    pixels, lengths, corners, valid = extract_jersey_pixels(frames, bboxes, max_pixels)
+    colors = np.full((len(valid),3),np.nan)
+    if len(lengths) == 0:
+        return colors
+    segments = np.repeat(np.arange(len(lengths)),lengths)
+    if method == "kmeans":
+        colors[valid] = _two_means_colors(pixels.astype(np.float64),segments,len(lengths),corners.astype(np.float64),max_iter)
+    else:
+        # Pixels clearly different from the corners' median color; crops with none keep
+        # all of their pixels.
+        background = np.median(corners[:,:4].astype(np.float64),axis=1)
+        away = _squared_distance(pixels.astype(np.float64),background[segments]) > background_distance**2
+        has_away = np.bincount(segments,weights=away,minlength=len(lengths)) > 0
+        keep = away | ~has_away[segments]
+        pixels, segments = pixels[keep], segments[keep]
+        if method == "histogram":
+            colors[valid] = _histogram_colors(pixels,segments,len(lengths))
+        else:
+            colors[valid] = _median_colors(pixels,segments,len(lengths))
+    return colors
+
+def _squared_distance(a, b):
+    difference = a - b
+    return np.einsum('ij,ij->i',difference,difference)
+
+def _two_means_colors(pixels, segments, num_crops, corners, max_iter):
+    # Lloyd iterations for every crop at once. Seeded deterministically with the crop's
+    # top-left pixel (background) and its center pixel (the chest, jersey). A pixel is
+    # nearer center 1 when x . (c1 - c0) > (|c1|^2 - |c0|^2) / 2, so each step is two
+    # per-crop gathers, a dot product and bincounts; cluster 0 sums are totals minus
+    # cluster 1 sums.
+    centers = corners[:,[0,4]].copy()
+    totals = np.stack([np.bincount(segments,weights=pixels[:,channel],minlength=num_crops) for channel in range(3)],axis=1)
+    sizes = np.bincount(segments,minlength=num_crops).astype(np.float64)
+
+    labels = None
+    for _ in range(max_iter):
+        direction = centers[:,1] - centers[:,0]
+        offset = (np.einsum('ij,ij->i',centers[:,1],centers[:,1]) - np.einsum('ij,ij->i',centers[:,0],centers[:,0]))/2
+        new_labels = np.einsum('ij,ij->i',pixels,np.take(direction,segments,axis=0)) > np.take(offset,segments)
+        if labels is not None and np.array_equal(new_labels,labels):
+            break
+        labels = new_labels
+        counts = np.bincount(segments,weights=labels,minlength=num_crops)
+        sums = np.stack([np.bincount(segments,weights=pixels[:,channel]*labels,minlength=num_crops) for channel in range(3)],axis=1)
+        # An empty cluster keeps its previous center.
+        centers[:,1] = np.where(counts[:,None] > 0,sums/np.maximum(counts,1)[:,None],centers[:,1])
+        centers[:,0] = np.where(counts[:,None] < sizes[:,None],(totals-sums)/np.maximum(sizes-counts,1)[:,None],centers[:,0])
+
+    # Label the full-resolution corners; the cluster owning at least three of them is
+    # the background (a 2-2 tie picks cluster 0, as max(set(...)) did).
+    corner_labels = np.stack([_squared_distance(corners[:,i],centers[:,1]) < _squared_distance(corners[:,i],centers[:,0])
+                              for i in range(4)],axis=1)
+    non_player_cluster = (corner_labels.sum(axis=1) >= 3).astype(np.int64)
+    return centers[np.arange(num_crops),1-non_player_cluster]
+
+def _histogram_colors(pixels, segments, num_crops, bits=3):
+    # Mode of a bits-per-channel color histogram per crop, returned as the mean of the
+    # pixels falling in that bin.
+    quantized = (pixels >> (8-bits)).astype(np.int64)
+    bins = (quantized[:,0] << (2*bits)) | (quantized[:,1] << bits) | quantized[:,2]
+    keys = segments*(1 << (3*bits)) + bins
+    unique_keys, counts = np.unique(keys,return_counts=True)
+    key_segments = unique_keys >> (3*bits)
+    order = np.lexsort((counts,key_segments))
+    last = np.r_[key_segments[order][1:] != key_segments[order][:-1],True]
+    best_keys = np.zeros(num_crops,dtype=np.int64)
+    best_keys[key_segments[order][last]] = unique_keys[order][last]
+    selected = keys == best_keys[segments]
+    counts = np.bincount(segments[selected],minlength=num_crops)
+    sums = np.stack([np.bincount(segments[selected],weights=pixels[selected,channel],minlength=num_crops)
+                     for channel in range(3)],axis=1)
+    return sums/counts[:,None]
+
+def _median_colors(pixels, segments, num_crops):
+    # Per-channel median per crop: pixel values are 0..255, so sorting one integer key
+    # per pixel orders them by crop, then value.
+    counts = np.bincount(segments,minlength=num_crops)
+    starts = np.cumsum(counts)-counts
+    low, high = starts + (counts-1)//2, starts + counts//2
+    colors = np.empty((num_crops,3))
+    for channel in range(3):
+        values = np.sort(segments*256 + pixels[:,channel]) & 255
+        colors[:,channel] = (values[low] + values[high])/2
+    return colors
@@ -1,80 +1,183 @@
 """Assign players to teams using jersey color clustering."""
 
+import numpy as np
 from sklearn.cluster import KMeans
+from .jersey_colors import dominant_colors, COLOR_METHODS
 
 class TeamAssigner:
-    def __init__(self):
+    def __init__(self, color_method="kmeans", max_pixels=None, sample_interval=24,
+                 samples_per_track=15, sample_budget=3000, batch_size=64):
+        # color_method: how a crop's jersey color is found (see jersey_colors); kmeans
+        # matches the original per-crop KMeans. max_pixels subsamples crops to about
+        # that many pixels for speed, at the cost of some labels; None (the default)
+        # uses every pixel.
+        # Every track is cropped when first seen, then again at most every
+        # sample_interval frames up to samples_per_track crops, while the video's
+        # extra crops stay under sample_budget. Sampled colors update the two team
+        # centroids in mini-batches of batch_size, and a track's team is the majority
+        # vote of its samples.
+        if color_method not in COLOR_METHODS:
+            raise ValueError(f"Unknown color method '{color_method}', expected one of {COLOR_METHODS}")
+        self.color_method = color_method
+        self.max_pixels = max_pixels
+        self.sample_interval = max(int(sample_interval), 1)
+        self.samples_per_track = max(int(samples_per_track), 1)
+        self.sample_budget = int(sample_budget)
+        self.batch_size = max(int(batch_size), 1)
+
         self.team_colors = {}
         self.player_team_dict = {}
-    
-    def get_clustering_model(self,image):
-        # Fit KMeans on pixel colors for a given image region.
-        # Reshape the image to 2D array
-        image_2d = image.reshape(-1,3)
-
-        # Preform K-means with 2 clusters
-        kmeans = KMeans(n_clusters=2, init="k-means++",n_init=1)
-        kmeans.fit(image_2d)
-
-        return kmeans
+        # Track id -> sampled jersey colors, and the frame of its latest sample.
+        self.player_colors = {}
+        self.last_sampled = {}
+        self.extra_samples = 0
+        # Team centroids (row 0 is team 1), the samples each has absorbed, and colors
+        # waiting for the next mini-batch update.
+        self.centers = None
+        self.center_counts = np.zeros(2)
+        self.pending = []
+
+    def cache_params(self):
+        return {"color_method": self.color_method, "max_pixels": self.max_pixels,
+                "sample_interval": self.sample_interval, "samples_per_track": self.samples_per_track,
+                "sample_budget": self.sample_budget, "batch_size": self.batch_size}
+
+    def export_teams(self):
+        # Voted teams and team colors, enough to label tracks again without crops.
+        return {"player_team_dict": dict(self.player_team_dict), "team_colors": dict(self.team_colors)}
+
+    def restore_teams(self,teams):
+        self.player_team_dict.update(teams["player_team_dict"])
+        self.team_colors.update(teams["team_colors"])
+
+    def get_player_colors(self,frame,bboxes):
+        # Jersey colors of many boxes in one batch; NaN rows for empty crops.
+        return dominant_colors(frame,bboxes,method=self.color_method,max_pixels=self.max_pixels)
 
     def get_player_color(self,frame,bbox):
         # Estimate jersey color from the upper half of the player box.
-        image = frame[int(bbox[1]):int(bbox[3]),int(bbox[0]):int(bbox[2])]
-
-        top_half_image = image[0:int(image.shape[0]/2),:]
-
-        # Get Clustering model
-        kmeans = self.get_clustering_model(top_half_image)
-
-        # Get the cluster labels for each pixel
-        labels = kmeans.labels_
-
-        # Reshape the labels to the image shape
-        clustered_image = labels.reshape(top_half_image.shape[0],top_half_image.shape[1])
-
-        # Get the player cluster
-        corner_clusters = [clustered_image[0,0],clustered_image[0,-1],clustered_image[-1,0],clustered_image[-1,-1]]
-        non_player_cluster = max(set(corner_clusters),key=corner_clusters.count)
-        player_cluster = 1 - non_player_cluster
-
-        player_color = kmeans.cluster_centers_[player_cluster]
-
-        return player_color
+        return self.get_player_colors(frame,[bbox])[0]
 
+    # --- Team model ---
 
     def assign_team_color(self,frame, player_detections):
-        # Learn two dominant jersey colors from the first frame with players.
-        
-        player_colors = []
-        for _, player_detection in player_detections.items():
-            bbox = player_detection["bbox"]
-            player_color =  self.get_player_color(frame,bbox)
-            player_colors.append(player_color)
-        
+        # Learn two dominant jersey colors from one frame's players.
+        player_colors = self.get_player_colors(frame,[player_detection["bbox"] for player_detection in player_detections.values()])
+        self._fit_centers(player_colors[~np.isnan(player_colors[:,0])])
+
+    def _fit_centers(self,player_colors):
         kmeans = KMeans(n_clusters=2, init="k-means++",n_init=10)
         kmeans.fit(player_colors)
-
-        self.kmeans = kmeans
-
-        self.team_colors[1] = kmeans.cluster_centers_[0]
-        self.team_colors[2] = kmeans.cluster_centers_[1]
-
+        self.centers = kmeans.cluster_centers_.copy()
+        self.center_counts = np.bincount(kmeans.labels_,minlength=2).astype(np.float64)
+        self._update_team_colors()
+
+    def _update_team_colors(self):
+        self.team_colors[1] = self.centers[0].copy()
+        self.team_colors[2] = self.centers[1].copy()
+
+    def _predict(self,player_colors):
+        # Index (0 or 1) of the nearest centroid per color.
+        distances = ((player_colors[:,None,:] - self.centers[None,:,:])**2).sum(axis=2)
+        return np.argmin(distances,axis=1)
+
+    def _partial_fit(self):
+        # Mini-batch k-means step: each centroid moves toward its share of the batch
+        # with a per-centroid learning rate of 1 / samples absorbed so far.
+        batch = np.asarray(self.pending)
+        self.pending = []
+        if self.centers is None:
+            self._fit_centers(batch)
+            return
+        labels = self._predict(batch)
+        for team_index in range(2):
+            members = batch[labels == team_index]
+            if len(members) == 0:
+                continue
+            self.center_counts[team_index] += len(members)
+            self.centers[team_index] += (members.sum(axis=0) - len(members)*self.centers[team_index])/self.center_counts[team_index]
+        self._update_team_colors()
+
+    def flush(self):
+        # Fold colors still waiting for a full mini-batch into the centroids.
+        if len(self.pending) >= 2 or (self.pending and self.centers is not None):
+            self._partial_fit()
+
+    # --- Sampling and voting ---
+
+    def sample(self,frame_num,frame,player_detections):
+        # Crop this frame's players that are due for a sample, in one batch, and feed
+        # their colors to the team model. Returns the number of crops taken.
+        player_ids = []
+        for player_id in player_detections:
+            colors = self.player_colors.get(player_id)
+            if colors is None:
+                player_ids.append(player_id)
+            elif (len(colors) < self.samples_per_track and self.extra_samples < self.sample_budget
+                  and frame_num - self.last_sampled[player_id] >= self.sample_interval):
+                player_ids.append(player_id)
+                self.extra_samples += 1
+        if not player_ids:
+            return 0
+
+        player_colors = self.get_player_colors(frame,[player_detections[player_id]["bbox"] for player_id in player_ids])
+        for player_id, color in zip(player_ids,player_colors):
+            self.last_sampled[player_id] = frame_num
+            colors = self.player_colors.setdefault(player_id,[])
+            if not np.isnan(color[0]):
+                colors.append(color)
+                self.pending.append(color)
+        # The first frame with players seeds the centroids; later samples update them.
+        if len(self.pending) >= self.batch_size or (self.centers is None and len(self.pending) >= 2):
+            self._partial_fit()
+        return len(player_ids)
+
+    def vote(self,player_ids=None):
+        # Majority team of each sampled track under the current centroids; a tie goes
+        # to the centroid nearest the track's median color. Tracks without a usable
+        # crop get team 1.
+        self.flush()
+        if player_ids is None:
+            player_ids = list(self.player_colors)
+        player_ids = [player_id for player_id in player_ids if self.player_colors.get(player_id)]
+        if not player_ids or self.centers is None:
+            return {}
+        counts = [len(self.player_colors[player_id]) for player_id in player_ids]
+        labels = self._predict(np.vstack([self.player_colors[player_id] for player_id in player_ids]))
+        track_index = np.repeat(np.arange(len(player_ids)),counts)
+        votes = np.bincount(2*track_index + labels,minlength=2*len(player_ids)).reshape(-1,2)
+        teams = np.where(votes[:,1] > votes[:,0],2,1)
+        for index in np.flatnonzero(votes[:,0] == votes[:,1]):
+            median_color = np.median(self.player_colors[player_ids[index]],axis=0)
+            teams[index] = self._predict(median_color[None,:])[0]+1
+        voted = dict(zip(player_ids,teams.tolist()))
+        self.player_team_dict.update(voted)
+        return voted
+
+    def assign_teams(self,player_tracks):
+        # Write the voted team and its color into every frame of every player track.
+        self.vote()
+        for player_track in player_tracks:
+            for player_id, track in player_track.items():
+                team = self.player_team_dict.get(player_id,1)
+                track['team'] = team
+                if team in self.team_colors:
+                    track['team_color'] = self.team_colors[team]
+
+    def assign_teams_to_table(self,table):
+        # TrackTable variant: fills the team column of every player row; the colors
+        # are kept once per team on the table.
+        self.vote()
+        columns = table.columns
+        players = table.object_rows('players')
+        track_ids, track_index = np.unique(columns['track_id'][players],return_inverse=True)
+        teams = np.array([self.player_team_dict.get(track_id,1) for track_id in track_ids.tolist()],dtype=columns['team'].dtype)
+        columns['team'][players] = teams[track_index]
+        table.team_colors.update(self.team_colors)
+        table.present_fields['players'].update(('team','team_color'))
 
     def get_player_team(self,frame,player_bbox,player_id):
-        # Cache team assignment per player to keep labels stable.
-        if player_id in self.player_team_dict:
-            return self.player_team_dict[player_id]
-
-        player_color = self.get_player_color(frame,player_bbox)
-
-        team_id = self.kmeans.predict(player_color.reshape(1,-1))[0]
-        team_id+=1
-
-        # Hardcoded exception kept from original logic.
-        if player_id ==91:
-            team_id=1
-
-        self.player_team_dict[player_id] = team_id
-
-        return team_id
+        # Current majority team of one player; its first crop is taken on first sight.
+        if player_id not in self.player_colors:
+            self.sample(0,frame,{player_id: {"bbox": player_bbox}})
+        return self.vote([player_id]).get(player_id,1)
@@ -0,0 +1,81 @@
+"""Artifact store reads racing track rewrites and legacy conversions."""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifact_store import ArtifactStore, write_section, write_tracks, artifacts_dir
+from artifact_store.artifact_store import legacy_artifacts_path
+
+
+def ui_tracks(count, duration=60):
+    return [{"id": track_id, "class": "player",
+             "positions": [{"timestamp": step * 0.5, "x": track_id, "y": step} for step in range(int(duration * 2))]}
+            for track_id in range(1, count + 1)]
+
+
+class ArtifactStoreRaceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(self.tmp.name, max_bytes=0)
+        self.directory = artifacts_dir(self.tmp.name, "v1")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_tracks_replaced_while_being_read_are_read_again(self):
+        write_section(self.directory, "meta", {"id": "v1", "duration": 60})
+        write_tracks(self.directory, ui_tracks(3), 60)
+        read_window = self.store._track_window
+        rewrites = []
+
+        def read_during_rewrite(*args):
+            # The first window read lands between write_tracks' two renames.
+            if rewrites:
+                return read_window(*args)
+            rewrites.append(True)
+            os.replace(self.directory / "tracks", self.directory / ".tracks-test-old")
+            window = read_window(*args)
+            write_tracks(self.directory, ui_tracks(5), 60)
+            shutil.rmtree(self.directory / ".tracks-test-old")
+            return window
+        self.store._track_window = read_during_rewrite
+
+        entry = self.store.tracks("v1", 0, 30)
+        self.assertIsNotNone(entry)
+        self.assertEqual(len(json.loads(entry.body)["tracks"]), 5)
+        rewrites.clear()
+        combined = self.store.combined("v1")
+        self.assertIsNotNone(combined)
+        self.assertEqual(len(json.loads(combined.body)["tracks"]), 5)
+
+    def test_concurrent_legacy_conversions(self):
+        with open(legacy_artifacts_path(self.tmp.name, "v1"), "w") as f:
+            json.dump({"meta": {"id": "v1", "duration": 60}, "events": [], "tracks": ui_tracks(4)}, f)
+        barrier = threading.Barrier(8)
+        results, errors = [], []
+
+        def request():
+            barrier.wait()
+            try:
+                results.append(self.store.tracks("v1", 0, 30))
+            except Exception as error:
+                errors.append(error)
+        threads = [threading.Thread(target=request) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertTrue(all(entry is not None for entry in results))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["v1_artifacts", "v1_artifacts.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
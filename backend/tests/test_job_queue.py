@@ -0,0 +1,38 @@
+"""Restart behavior of the job scheduler."""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from job_queue import JobStore, JobScheduler, QUEUED
+
+
+class SchedulerRestartTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = JobStore(os.path.join(self.tmp.name, "jobs.sqlite3"))
+        self.ran = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_restart_leaves_uploading_jobs_alone(self):
+        self.store["partial"] = {"status": "uploading", "progress": 0, "currentStep": "uploading"}
+        self.store["interrupted"] = {"status": "processing", "progress": 40, "currentStep": "analyzing"}
+        self.assertEqual([video_id for video_id, _, _ in self.store.running()], ["interrupted"])
+
+        JobScheduler(self.store, self.ran.append, workers=1).start()
+        self.assertEqual(self.store.load("partial")["status"], "uploading")
+        self.assertNotIn("partial", self.ran)
+
+    def test_uploading_jobs_do_not_delay_estimates(self):
+        self.store["partial"] = {"status": "uploading", "frames": 10000}
+        self.store["waiting"] = {"status": QUEUED, "queued_at": 1.0, "frames": 10}
+        scheduler = JobScheduler(self.store, self.ran.append, workers=1)
+        self.assertEqual(scheduler.estimated_wait("waiting"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
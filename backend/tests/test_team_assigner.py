@@ -0,0 +1,36 @@
+"""Jersey color sampling defaults of the team assigner."""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from team_assigner import TeamAssigner, dominant_colors
+
+
+class JerseyPixelsTest(unittest.TestCase):
+    def setUp(self):
+        # A noisy red jersey on grass, large enough that subsampling would skip pixels.
+        rng = np.random.default_rng(0)
+        self.frame = np.clip(rng.normal((60, 140, 70), 12, size=(240, 160, 3)), 0, 255).astype(np.uint8)
+        self.frame[20:200, 40:120] = np.clip(rng.normal((40, 40, 190), 25, size=(180, 80, 3)), 0, 255)
+        self.bboxes = [[20, 0, 140, 400], [30, 10, 130, 300]]
+
+    def test_kmeans_uses_every_pixel_by_default(self):
+        team_assigner = TeamAssigner()
+        self.assertIsNone(team_assigner.max_pixels)
+        np.testing.assert_array_equal(team_assigner.get_player_colors(self.frame, self.bboxes),
+                                      dominant_colors(self.frame, self.bboxes, max_pixels=None))
+
+    def test_subsampling_is_opt_in(self):
+        full = TeamAssigner().get_player_colors(self.frame, self.bboxes)
+        subsampled = TeamAssigner(max_pixels=256).get_player_colors(self.frame, self.bboxes)
+        self.assertFalse(np.array_equal(full, subsampled))
+        # A uniform kit still comes out close to the same color.
+        np.testing.assert_allclose(full, subsampled, atol=10)
+
+
+if __name__ == "__main__":
+    unittest.main()
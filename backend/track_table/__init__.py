@@ -0,0 +1,3 @@
+from .track_table import TrackTable, TracksView, OBJECT_TYPES
+from .track_file import save_track_file, load_track_file, read_track_file_header, TRACK_FILE_SUFFIX, FORMAT_VERSION
+"""Columnar track storage with a dict-compatible view and memory-mapped track files."""
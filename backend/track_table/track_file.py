@@ -0,0 +1,108 @@
+"""Versioned binary track files that load as memory-mapped TrackTable columns."""
+
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from .track_table import TrackTable, OBJECT_TYPES
+
+# File layout: 8-byte magic, uint32 format version, uint32 header length, a UTF-8
+# JSON header, then every array's raw bytes at a 64-byte aligned offset. The header
+# lists each array's dtype, shape and offset, so a reader maps the file and views
+# the arrays in place instead of deserializing them.
+MAGIC = b"TRACKTBL"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sII")
+TRACK_FILE_SUFFIX = ".tracks"
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+def save_track_file(path, table, arrays=None, metadata=None):
+    # Write a TrackTable's (or nested tracks dicts') columns and frame index, plus any
+    # per-frame arrays (e.g. team_ball_control) and JSON-serializable metadata (fps,
+    # frame shape, ...). The file is written to a temp file and renamed, so readers
+    # never see a partial file.
+    if not isinstance(table, TrackTable):
+        table = TrackTable.from_tracks(table)
+    blobs = {f"column/{name}": np.ascontiguousarray(column) for name, column in table.columns.items()}
+    blobs["frame_offsets"] = np.ascontiguousarray(table.frame_offsets, dtype=np.int64)
+    for name, array in (arrays or {}).items():
+        blobs[f"array/{name}"] = np.ascontiguousarray(array)
+
+    entries = {}
+    offset = 0
+    for name, blob in blobs.items():
+        entries[name] = {"dtype": blob.dtype.str, "shape": list(blob.shape), "offset": offset}
+        offset = _aligned(offset + blob.nbytes)
+    header = json.dumps({
+        "num_frames": table.num_frames,
+        "team_colors": {str(team): np.asarray(color).tolist() for team, color in table.team_colors.items()},
+        "present_fields": {name: sorted(fields) for name, fields in table.present_fields.items()},
+        "metadata": metadata or {},
+        "arrays": entries,
+    }, default=str).encode()
+    data_start = _aligned(PREAMBLE.size + len(header))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header)))
+            f.write(header)
+            for name, blob in blobs.items():
+                f.seek(data_start + entries[name]["offset"])
+                f.write(blob.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+def read_track_file_header(path):
+    # (header dict, byte offset of the array data); raises ValueError for files that
+    # are not track files or were written by a newer format version.
+    with open(path, 'rb') as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            raise ValueError(f"{path} is not a track file")
+        magic, version, header_length = PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a track file")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"{path} has track file version {version}; this reader supports up to {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length))
+    return header, _aligned(PREAMBLE.size + header_length)
+
+def load_track_file(path, mmap=True, writable=False):
+    # (TrackTable, {name: per-frame array}, metadata). With mmap the columns are views
+    # of one read-only memory map, so only the pages a reader touches are loaded;
+    # writable maps copy-on-write, letting stages update columns without changing the
+    # file. Without mmap every array is read into memory.
+    header, data_start = read_track_file_header(path)
+    if mmap:
+        buffer = np.memmap(path, dtype=np.uint8, mode="c" if writable else "r")
+    else:
+        buffer = np.fromfile(path, dtype=np.uint8)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        start = data_start + entry["offset"]
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        arrays[name] = buffer[start:start + nbytes].view(dtype).reshape(shape)
+
+    columns = {name[len("column/"):]: array for name, array in arrays.items() if name.startswith("column/")}
+    team_colors = {int(team): np.asarray(color) for team, color in header["team_colors"].items()}
+    table = TrackTable(header["num_frames"], columns, team_colors=team_colors,
+                       present_fields={name: header["present_fields"].get(name, ()) for name in OBJECT_TYPES},
+                       frame_offsets=arrays.get("frame_offsets"))
+    frame_arrays = {name[len("array/"):]: array for name, array in arrays.items() if name.startswith("array/")}
+    return table, frame_arrays, header["metadata"]
@@ -0,0 +1,335 @@
+"""Columnar (structure-of-arrays) storage for per-frame object tracks."""
+
+import numpy as np
+
+# Object types in the order the pipeline's tracks dict uses them.
+OBJECT_TYPES = ("players", "referees", "ball")
+
+# Column name -> (dtype, trailing shape). Missing float values are NaN, a missing
+# team is 0.
+COLUMNS = {
+    "frame": (np.int32, ()),
+    "track_id": (np.int32, ()),
+    "object_type": (np.int8, ()),
+    "bbox": (np.float32, (4,)),
+    "position": (np.float32, (2,)),
+    "position_adjusted": (np.float32, (2,)),
+    "position_transformed": (np.float32, (2,)),
+    "speed": (np.float32, ()),
+    "distance": (np.float32, ()),
+    "acceleration": (np.float32, ()),
+    "team": (np.int8, ()),
+    "has_ball": (np.bool_, ()),
+    "interpolated": (np.bool_, ()),
+}
+
+# Per-row fields that map one-to-one onto a column in the dict API.
+ROW_FIELDS = ("bbox", "position", "position_adjusted", "position_transformed",
+              "speed", "distance", "acceleration", "team", "has_ball", "interpolated")
+
+def empty_column(name, num_rows):
+    dtype, shape = COLUMNS[name]
+    if np.issubdtype(dtype, np.floating):
+        return np.full((num_rows,) + shape, np.nan, dtype=dtype)
+    return np.zeros((num_rows,) + shape, dtype=dtype)
+
+class TrackTable:
+    def __init__(self, num_frames, columns, team_colors=None, present_fields=None, frame_offsets=None):
+        # Rows are ordered by object type, then frame, then the original per-frame
+        # insertion order, so each (object, frame) is one contiguous slice.
+        # frame_offsets, when given (e.g. read from a track file), is used as the
+        # frame index instead of rebuilding it from the columns.
+        self.num_frames = int(num_frames)
+        num_rows = len(columns["frame"]) if "frame" in columns else 0
+        self.columns = {name: columns[name] if name in columns else empty_column(name, num_rows)
+                        for name in COLUMNS}
+        # team -> BGR jersey color, shared by every row of that team.
+        self.team_colors = dict(team_colors or {})
+        # Fields that existed in the source dicts, per object type; position_transformed
+        # is reported as None (rather than omitted) for NaN rows only when it was present.
+        present_fields = present_fields or {}
+        self.present_fields = {name: set(present_fields.get(name, ())) for name in OBJECT_TYPES}
+        if frame_offsets is None:
+            self._build_frame_index()
+        else:
+            self.frame_offsets = frame_offsets
+        self._track_index = None
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns")
+        if columns is not None and name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return len(self.columns["frame"])
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values()) + self.frame_offsets.nbytes
+
+    def _build_frame_index(self):
+        # frame_offsets[object_type, frame] .. frame_offsets[object_type, frame + 1]
+        # bounds the rows of one object type in one frame (CSR layout).
+        keys = self.columns["object_type"].astype(np.int64) * self.num_frames + self.columns["frame"]
+        boundaries = np.arange(len(OBJECT_TYPES) * self.num_frames + 1, dtype=np.int64)
+        self.frame_offsets = np.searchsorted(keys, boundaries, side="left")
+
+    def _build_track_index(self):
+        # Row indices grouped by (object type, track id) and sorted by frame.
+        order = np.lexsort((self.columns["frame"], self.columns["track_id"], self.columns["object_type"]))
+        object_types = self.columns["object_type"][order]
+        track_ids = self.columns["track_id"][order]
+        starts = np.flatnonzero(np.r_[True, (object_types[1:] != object_types[:-1]) |
+                                       (track_ids[1:] != track_ids[:-1])]) if len(order) else np.array([], dtype=np.int64)
+        ends = np.r_[starts[1:], len(order)].astype(np.int64)
+        index = {}
+        for start, end in zip(starts, ends):
+            index[(int(object_types[start]), int(track_ids[start]))] = (int(start), int(end))
+        self._track_index = (order, index)
+
+    @staticmethod
+    def object_type_id(object_name):
+        return OBJECT_TYPES.index(object_name)
+
+    # --- Indexes ---
+
+    def object_rows(self, object_name):
+        object_type = self.object_type_id(object_name)
+        return slice(int(self.frame_offsets[object_type * self.num_frames]),
+                     int(self.frame_offsets[(object_type + 1) * self.num_frames]))
+
+    def frame_rows(self, object_name, frame):
+        key = self.object_type_id(object_name) * self.num_frames + frame
+        return slice(int(self.frame_offsets[key]), int(self.frame_offsets[key + 1]))
+
+    def track_rows(self, object_name, track_id):
+        # Row indices of one track, in frame order.
+        if self._track_index is None:
+            self._build_track_index()
+        order, index = self._track_index
+        start, end = index.get((self.object_type_id(object_name), int(track_id)), (0, 0))
+        return order[start:end]
+
+    def track_ids(self, object_name):
+        return np.unique(self.columns["track_id"][self.object_rows(object_name)])
+
+    def iter_tracks(self, object_name):
+        # (track_id, row indices in frame order) for every track of one object type.
+        if self._track_index is None:
+            self._build_track_index()
+        order, index = self._track_index
+        object_type = self.object_type_id(object_name)
+        for (row_type, track_id), (start, end) in index.items():
+            if row_type == object_type:
+                yield track_id, order[start:end]
+
+    # --- Conversion ---
+
+    @classmethod
+    def from_tracks(cls, tracks):
+        # Build a table from the nested tracks[object][frame][track_id] dicts.
+        num_frames = max((len(tracks.get(name, [])) for name in OBJECT_TYPES), default=0)
+        frames, track_ids, object_types, infos = [], [], [], []
+        present_fields = {name: set() for name in OBJECT_TYPES}
+        team_colors = {}
+
+        for object_type, object_name in enumerate(OBJECT_TYPES):
+            object_start = len(infos)
+            for frame_num, frame_tracks in enumerate(tracks.get(object_name, [])):
+                frames.extend([frame_num] * len(frame_tracks))
+                track_ids.extend(frame_tracks.keys())
+                infos.extend(frame_tracks.values())
+            object_types.extend([object_type] * (len(infos) - object_start))
+            for info in infos[object_start:]:
+                present_fields[object_name].update(info.keys())
+                team = info.get("team")
+                if team is not None and team not in team_colors and "team_color" in info:
+                    team_colors[team] = info["team_color"]
+
+        num_rows = len(infos)
+        columns = {
+            "frame": np.asarray(frames, dtype=COLUMNS["frame"][0]).reshape(num_rows),
+            "track_id": np.asarray(track_ids, dtype=COLUMNS["track_id"][0]).reshape(num_rows),
+            "object_type": np.asarray(object_types, dtype=COLUMNS["object_type"][0]).reshape(num_rows),
+        }
+        for field in ROW_FIELDS:
+            column = empty_column(field, num_rows)
+            if any(field in fields for fields in present_fields.values()):
+                values = [info.get(field) for info in infos]
+                filled = [i for i, value in enumerate(values) if value is not None]
+                if filled:
+                    column[filled] = np.asarray([values[i] for i in filled],
+                                                dtype=column.dtype).reshape((len(filled),) + column.shape[1:])
+            columns[field] = column
+        return cls(num_frames, columns, team_colors=team_colors, present_fields=present_fields)
+
+    def row_dict(self, row):
+        # Materialize one row in the dict API's shape.
+        columns = self.columns
+        track_info = {"bbox": columns["bbox"][row].tolist()}
+        for field in ("position", "position_adjusted"):
+            if not np.isnan(columns[field][row, 0]):
+                track_info[field] = tuple(columns[field][row].tolist())
+        if not np.isnan(columns["position_transformed"][row, 0]):
+            track_info["position_transformed"] = columns["position_transformed"][row].tolist()
+        elif "position_transformed" in self.present_fields[OBJECT_TYPES[columns["object_type"][row]]]:
+            track_info["position_transformed"] = None
+        for field in ("speed", "distance", "acceleration"):
+            if not np.isnan(columns[field][row]):
+                track_info[field] = float(columns[field][row])
+        team = int(columns["team"][row])
+        if team:
+            track_info["team"] = team
+            if team in self.team_colors:
+                track_info["team_color"] = self.team_colors[team]
+        if columns["has_ball"][row]:
+            track_info["has_ball"] = True
+        if columns["interpolated"][row]:
+            track_info["interpolated"] = True
+        return track_info
+
+    def to_tracks(self):
+        # Fully materialize the nested dict representation.
+        tracks = {}
+        track_ids = self.columns["track_id"]
+        for object_name in OBJECT_TYPES:
+            object_tracks = []
+            for frame_num in range(self.num_frames):
+                rows = self.frame_rows(object_name, frame_num)
+                object_tracks.append({int(track_ids[row]): self.row_dict(row)
+                                      for row in range(rows.start, rows.stop)})
+            tracks[object_name] = object_tracks
+        return tracks
+
+    def view(self):
+        # Lazy tracks[object][frame][track_id][field] view backed by the columns.
+        return TracksView(self)
+
+
+class TracksView:
+    # Read access mirrors the nested dicts; writing an existing field of an existing
+    # row updates the column in place. Adding rows or replacing whole object lists
+    # (as interpolate_ball_positions does) needs the dict form from to_tracks().
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, object_name):
+        if object_name not in OBJECT_TYPES:
+            raise KeyError(object_name)
+        return FramesView(self.table, object_name)
+
+    def __contains__(self, object_name):
+        return object_name in OBJECT_TYPES
+
+    def __iter__(self):
+        return iter(OBJECT_TYPES)
+
+    def keys(self):
+        return list(OBJECT_TYPES)
+
+    def items(self):
+        return [(name, self[name]) for name in OBJECT_TYPES]
+
+    def get(self, object_name, default=None):
+        return self[object_name] if object_name in OBJECT_TYPES else default
+
+
+class FramesView:
+    def __init__(self, table, object_name):
+        self.table = table
+        self.object_name = object_name
+
+    def __len__(self):
+        return self.table.num_frames
+
+    def __getitem__(self, frame_num):
+        if isinstance(frame_num, slice):
+            return [self[i] for i in range(*frame_num.indices(len(self)))]
+        if frame_num < 0:
+            frame_num += len(self)
+        if not 0 <= frame_num < len(self):
+            raise IndexError(frame_num)
+        return FrameView(self.table, self.table.frame_rows(self.object_name, frame_num))
+
+    def __iter__(self):
+        for frame_num in range(len(self)):
+            yield self[frame_num]
+
+
+class FrameView:
+    def __init__(self, table, rows):
+        self.table = table
+        self.rows = rows
+
+    def _row(self, track_id):
+        track_ids = self.table.columns["track_id"][self.rows]
+        matches = np.flatnonzero(track_ids == track_id)
+        if len(matches) == 0:
+            raise KeyError(track_id)
+        return self.rows.start + int(matches[0])
+
+    def __getitem__(self, track_id):
+        return RowView(self.table, self._row(track_id))
+
+    def __contains__(self, track_id):
+        return bool(np.any(self.table.columns["track_id"][self.rows] == track_id))
+
+    def __len__(self):
+        return self.rows.stop - self.rows.start
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def keys(self):
+        return self.table.columns["track_id"][self.rows].tolist()
+
+    def items(self):
+        return [(int(self.table.columns["track_id"][row]), RowView(self.table, row))
+                for row in range(self.rows.start, self.rows.stop)]
+
+    def values(self):
+        return [RowView(self.table, row) for row in range(self.rows.start, self.rows.stop)]
+
+    def get(self, track_id, default=None):
+        return self[track_id] if track_id in self else default
+
+
+class RowView:
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def _as_dict(self):
+        return self.table.row_dict(self.row)
+
+    def __getitem__(self, field):
+        return self._as_dict()[field]
+
+    def get(self, field, default=None):
+        return self._as_dict().get(field, default)
+
+    def __contains__(self, field):
+        return field in self._as_dict()
+
+    def keys(self):
+        return self._as_dict().keys()
+
+    def items(self):
+        return self._as_dict().items()
+
+    def __setitem__(self, field, value):
+        columns = self.table.columns
+        if field == "team_color":
+            team = int(columns["team"][self.row])
+            if team:
+                self.table.team_colors[team] = value
+            return
+        if field not in ROW_FIELDS:
+            raise KeyError(f"{field} is not a track table column")
+        object_name = OBJECT_TYPES[columns["object_type"][self.row]]
+        self.table.present_fields[object_name].add(field)
+        if value is None:
+            columns[field][self.row] = empty_column(field, 1)[0]
+        else:
+            columns[field][self.row] = value
@@ -1,2 +1,5 @@
 from .tracker import Tracker
+from .inference import DetectionEngine, BACKENDS
+from .keyframes import KeyframeDetector
+from .model_pool import ModelPool
 """Tracking components and drawing helpers."""
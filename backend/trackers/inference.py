@@ -0,0 +1,160 @@
+"""Configurable YOLO inference: backend export, input size and memory-aware batching."""
+
+import functools
+import os
+import shutil
+from pathlib import Path
+import torch
+import ultralytics.nn.tasks as tasks
+from ultralytics import YOLO
+
+# Formats the detector can be exported to for faster CPU inference.
+EXPORT_BACKENDS = ("onnx", "openvino")
+BACKENDS = ("torch",) + EXPORT_BACKENDS
+
+DEFAULT_BATCH_SIZE = 20
+DEFAULT_IMGSZ = 640
+
+def load_yolo_model(model_path, task=None):
+    # Trusting the checkpoint: force torch.load(weights_only=False) during model load.
+    torch.serialization.add_safe_globals([tasks.DetectionModel])
+    original_torch_load = torch.load
+    torch.load = functools.partial(original_torch_load, weights_only=False)
+    try:
+        return YOLO(model_path, task=task) if task else YOLO(model_path)
+    finally:
+        torch.load = original_torch_load
+
+def available_memory_bytes():
+    # Free accelerator memory when running on CUDA, otherwise available system RAM.
+    if torch.cuda.is_available():
+        free, _ = torch.cuda.mem_get_info()
+        return free
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+class DetectionEngine:
+    # Rough peak bytes per input pixel during a YOLO forward pass (float activations
+    # across the backbone and neck); used only to size batches conservatively.
+    ACTIVATION_BYTES_PER_PIXEL = 96
+    # Share of available memory that auto-tuned batches may use.
+    MEMORY_BUDGET_FRACTION = 0.25
+
+    def __init__(self, model_path, backend="torch", imgsz=None, batch_size=DEFAULT_BATCH_SIZE,
+                 conf=0.1, half=False, max_batch_size=64, force_export=False):
+        # backend: "torch" runs the .pt checkpoint; "onnx"/"openvino" export it once
+        # next to the weights and run the exported model (CPU friendly).
+        # imgsz: inference size in pixels (None keeps the model default of 640);
+        # smaller values trade accuracy for speed.
+        # batch_size: an int, or "auto" to size batches from available memory.
+        # half: FP16 on CUDA for torch; FP16 IR weights for openvino. Ignored otherwise.
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {backend}. Use one of {BACKENDS}.")
+        self.model_path = str(model_path)
+        self.backend = backend
+        self.imgsz = int(imgsz) if imgsz else None
+        self.conf = conf
+        self.half = bool(half)
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.batch_size = batch_size if batch_size == "auto" else max(int(batch_size), 1)
+        self.resolved_batch_size = None if batch_size == "auto" else self.batch_size
+
+        self.model = load_yolo_model(self.model_path)
+        if backend in EXPORT_BACKENDS:
+            exported_path = self.export(force=force_export)
+            self.model = load_yolo_model(exported_path, task="detect")
+
+    def export_path(self):
+        # Where the export for the configured backend lives next to the weights.
+        # half only changes OpenVINO IRs, so FP16 and FP32 IRs get their own
+        # directories and neither is reused for the other precision. The input
+        # size is not part of the name: exports have dynamic axes and
+        # predict_kwargs always passes the size to exported models.
+        weights = Path(self.model_path)
+        if self.backend == "onnx":
+            return weights.with_suffix(".onnx")
+        precision = "fp16" if self.half else "fp32"
+        return weights.with_name(f"{weights.stem}_{precision}_openvino_model")
+
+    def export(self, force=False):
+        # Export the checkpoint for the configured backend, reusing an existing export
+        # with the same settings that is newer than the weights.
+        weights = Path(self.model_path)
+        exported = self.export_path()
+        if (not force and exported.exists()
+                and exported.stat().st_mtime >= weights.stat().st_mtime):
+            return str(exported)
+
+        export_kwargs = {
+            "format": self.backend,
+            "imgsz": self.imgsz or DEFAULT_IMGSZ,
+            # Dynamic axes let one export serve any batch size and input size.
+            "dynamic": True,
+        }
+        if self.backend == "openvino":
+            export_kwargs["half"] = self.half
+        # Ultralytics writes best.onnx or best_openvino_model/; move it to the
+        # settings-specific path.
+        written = Path(self.model.export(**export_kwargs))
+        if written.resolve() != exported.resolve():
+            if exported.is_dir():
+                shutil.rmtree(exported)
+            os.replace(written, exported)
+        return str(exported)
+
+    def _auto_batch_size(self, frame):
+        # Bytes per frame: the decoded BGR frame plus the letterboxed input and its
+        # activations at the inference size.
+        imgsz = self.imgsz or DEFAULT_IMGSZ
+        per_frame = frame.nbytes + imgsz * imgsz * self.ACTIVATION_BYTES_PER_PIXEL
+        available = available_memory_bytes()
+        if not available:
+            return DEFAULT_BATCH_SIZE
+        batch_size = int(available * self.MEMORY_BUDGET_FRACTION // per_frame)
+        return max(1, min(batch_size, self.max_batch_size))
+
+    def predict_kwargs(self):
+        kwargs = {"conf": self.conf, "verbose": False}
+        if self.imgsz or self.backend in EXPORT_BACKENDS:
+            # Exported models would otherwise fall back to the size they were
+            # exported at, which may come from another engine's settings.
+            kwargs["imgsz"] = self.imgsz or DEFAULT_IMGSZ
+        if self.half and self.backend == "torch" and torch.cuda.is_available():
+            kwargs["half"] = True
+        return kwargs
+
+    def predict(self, frames):
+        # Run batched inference over a list of frames.
+        if len(frames) == 0:
+            return []
+        if self.resolved_batch_size is None:
+            self.resolved_batch_size = self._auto_batch_size(frames[0])
+        batch_size = self.resolved_batch_size
+
+        kwargs = self.predict_kwargs()
+        detections = []
+        for i in range(0, len(frames), batch_size):
+            detections += self.model.predict(frames[i:i+batch_size], **kwargs)
+        return detections
+
+    def cache_params(self):
+        # Settings that change the detections (batch size does not).
+        return {"backend": self.backend, "imgsz": self.imgsz or DEFAULT_IMGSZ, "half": self.half, "conf": self.conf}
+
+    def describe(self):
+        return {
+            "backend": self.backend,
+            "imgsz": self.imgsz or DEFAULT_IMGSZ,
+            "batch_size": self.resolved_batch_size or self.batch_size,
+            "half": self.half,
+            "conf": self.conf,
+        }
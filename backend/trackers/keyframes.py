@@ -0,0 +1,110 @@
+"""Keyframe detection: run YOLO on a subset of frames and interpolate tracks between them."""
+
+import numpy as np
+
+# Object types whose tracked boxes are interpolated on skipped frames. The ball is
+# left empty there and filled later by Tracker.interpolate_ball_positions.
+INTERPOLATED_OBJECTS = ("players", "referees")
+
+class KeyframeDetector:
+    def __init__(self, tracker, interval=1, camera_motion_threshold=None, track_speed_threshold=None):
+        # interval: run the detector every N frames (1 detects every frame).
+        # camera_motion_threshold: also detect any frame whose camera motion (pixels)
+        # exceeds this, since boxes drift fastest while the camera pans.
+        # track_speed_threshold: detect every frame of the next chunk while any track
+        # moved faster than this (pixels per frame) between the last two keyframes.
+        self.tracker = tracker
+        self.interval = max(int(interval), 1)
+        self.camera_motion_threshold = camera_motion_threshold
+        self.track_speed_threshold = track_speed_threshold
+        self.reset()
+
+    def cache_params(self):
+        return {"interval": self.interval, "camera_motion_threshold": self.camera_motion_threshold,
+                "track_speed_threshold": self.track_speed_threshold}
+
+    def reset(self):
+        # ByteTrack only sees keyframes, so it is rebuilt for updates `interval` frames apart.
+        self.tracker.reset_tracker(self.interval)
+        self.last_keyframe_tracks = None
+        self.track_speed = 0.0
+        self.frames_seen = 0
+        self.frames_detected = 0
+
+    def select_keyframes(self, num_frames, camera_movement=None):
+        # Indices (within the chunk) to run the detector on. The last frame of every
+        # chunk is a keyframe so skipped frames never wait on the next chunk.
+        if num_frames == 0:
+            return []
+        interval = self.interval
+        if self.track_speed_threshold is not None and self.track_speed > self.track_speed_threshold:
+            interval = 1
+
+        keyframes = []
+        since_keyframe = interval if self.last_keyframe_tracks is None else 1
+        for index in range(num_frames):
+            fast_camera = False
+            if self.camera_motion_threshold is not None and camera_movement is not None:
+                dx, dy = camera_movement[index]
+                fast_camera = (dx * dx + dy * dy) ** 0.5 > self.camera_motion_threshold
+            if since_keyframe >= interval or fast_camera or index == num_frames - 1:
+                keyframes.append(index)
+                since_keyframe = 1
+            else:
+                since_keyframe += 1
+        return keyframes
+
+    def _fill_gap(self, tracks, start_tracks, end_tracks, start_index, end_index):
+        # Linearly interpolate boxes for track IDs present at both bracketing keyframes.
+        gap = end_index - start_index
+        for name in INTERPOLATED_OBJECTS:
+            shared_ids = start_tracks[name].keys() & end_tracks[name].keys()
+            for track_id in shared_ids:
+                start_bbox = np.asarray(start_tracks[name][track_id]["bbox"], dtype=float)
+                end_bbox = np.asarray(end_tracks[name][track_id]["bbox"], dtype=float)
+                for index in range(max(start_index + 1, 0), end_index):
+                    weight = (index - start_index) / gap
+                    bbox = (start_bbox + (end_bbox - start_bbox) * weight).tolist()
+                    tracks[name][index][track_id] = {"bbox": bbox, "interpolated": True}
+
+    def _update_track_speed(self, start_tracks, end_tracks, gap):
+        # Fastest box-center displacement per frame among tracks seen at both keyframes.
+        speed = 0.0
+        for name in INTERPOLATED_OBJECTS:
+            for track_id in start_tracks[name].keys() & end_tracks[name].keys():
+                x1, y1, x2, y2 = start_tracks[name][track_id]["bbox"]
+                u1, v1, u2, v2 = end_tracks[name][track_id]["bbox"]
+                dx = ((u1 + u2) - (x1 + x2)) / 2
+                dy = ((v1 + v2) - (y1 + y2)) / 2
+                speed = max(speed, (dx * dx + dy * dy) ** 0.5 / gap)
+        self.track_speed = speed
+
+    def get_chunk_tracks(self, frames, camera_movement=None):
+        # Same output shape as Tracker.tracks_from_detections for every frame of the
+        # chunk, but YOLO and ByteTrack only see the keyframes.
+        keyframes = self.select_keyframes(len(frames), camera_movement)
+        detections = self.tracker.detect_frames([frames[index] for index in keyframes])
+        key_tracks = self.tracker.tracks_from_detections(detections)
+
+        tracks = {name: [{} for _ in frames] for name in key_tracks}
+        for name, object_tracks in key_tracks.items():
+            for index, frame_tracks in zip(keyframes, object_tracks):
+                tracks[name][index] = frame_tracks
+
+        # The previous chunk's last frame is a keyframe, at index -1 relative to this one.
+        previous_index, previous_tracks = -1, self.last_keyframe_tracks
+        for index in keyframes:
+            current_tracks = {name: tracks[name][index] for name in tracks}
+            if previous_tracks is not None:
+                if index - previous_index > 1:
+                    self._fill_gap(tracks, previous_tracks, current_tracks, previous_index, index)
+                self._update_track_speed(previous_tracks, current_tracks, index - previous_index)
+            previous_index, previous_tracks = index, current_tracks
+
+        self.last_keyframe_tracks = previous_tracks
+        self.frames_seen += len(frames)
+        self.frames_detected += len(keyframes)
+        return tracks
+
+    def detection_ratio(self):
+        return self.frames_detected / self.frames_seen if self.frames_seen else 1.0
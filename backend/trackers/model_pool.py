@@ -0,0 +1,116 @@
+"""Process-wide pool of warm detector replicas handed to jobs with fresh tracker state."""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from .inference import DetectionEngine
+from .tracker import Tracker
+
+# Frame used to warm up a replica (first inference pays for lazy graph and kernel setup).
+WARMUP_FRAME_SHAPE = (720, 1280, 3)
+
+class ModelPool:
+    def __init__(self, model_path, replicas=1, warmup=True, **engine_options):
+        # Up to `replicas` DetectionEngines for model_path (engine_options as for
+        # DetectionEngine) are loaded once and shared by every job: tracker() lends
+        # one engine per job inside a new Tracker, so ByteTrack state is never
+        # shared, and blocks while all replicas are in use. warm() loads them ahead
+        # of the first job; otherwise they load on first use.
+        self.model_path = str(model_path)
+        self.replicas = max(int(replicas), 1)
+        self.warmup = warmup
+        self.engine_options = engine_options
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self.load_seconds = []
+        self.warmup_seconds = []
+        self.acquired = 0
+        self.reused = 0
+        self.wait_seconds = 0.0
+
+    def _load_engine(self):
+        start = time.perf_counter()
+        engine = DetectionEngine(self.model_path, **self.engine_options)
+        self.load_seconds.append(round(time.perf_counter() - start, 3))
+        if self.warmup:
+            start = time.perf_counter()
+            engine.predict([np.zeros(WARMUP_FRAME_SHAPE, dtype=np.uint8)])
+            self.warmup_seconds.append(round(time.perf_counter() - start, 3))
+            # An auto batch size is sized from each job's real frames, not the dummy one.
+            if engine.batch_size == "auto":
+                engine.resolved_batch_size = None
+        # Jobs served by this replica; reuse counts engines handed out again.
+        engine.jobs_served = 0
+        return engine
+
+    def _create(self):
+        # Load a replica already counted in _created; uncount it if loading fails.
+        try:
+            return self._load_engine()
+        except BaseException:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def warm(self):
+        # Load every replica not loaded yet (e.g. at server start).
+        while True:
+            with self._lock:
+                if self._created >= self.replicas:
+                    return self
+                self._created += 1
+            self._idle.put(self._create())
+
+    def acquire(self):
+        # An idle engine, a newly loaded one while fewer than `replicas` exist, or the
+        # next one released.
+        start = time.perf_counter()
+        try:
+            engine = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.replicas
+                if create:
+                    self._created += 1
+            engine = self._create() if create else self._idle.get()
+        with self._lock:
+            self._in_use += 1
+            self.acquired += 1
+            self.reused += engine.jobs_served > 0
+            self.wait_seconds += time.perf_counter() - start
+        engine.jobs_served += 1
+        return engine
+
+    def release(self, engine):
+        with self._lock:
+            self._in_use -= 1
+        self._idle.put(engine)
+
+    @contextmanager
+    def tracker(self):
+        # A Tracker with fresh ByteTrack state around a pooled engine for one job.
+        engine = self.acquire()
+        try:
+            yield Tracker(self.model_path, engine=engine)
+        finally:
+            self.release(engine)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "model": self.model_path,
+                "replicas": self.replicas,
+                "loaded": self._created,
+                "in_use": self._in_use,
+                "load_s": list(self.load_seconds),
+                "warmup_s": list(self.warmup_seconds),
+                "acquired": self.acquired,
+                "reused": self.reused,
+                "wait_s": round(self.wait_seconds, 3),
+            }
@@ -1,51 +1,60 @@
 """Tracking and annotation utilities built on YOLO and ByteTrack."""
 
-from ultralytics import YOLO
-import torch
-import ultralytics.nn.tasks as tasks
-import functools
 import supervision as sv
-import pickle
-import os
 import numpy as np
 import pandas as pd
 import cv2
 import sys 
 sys.path.append('../')
-from utils import get_center_of_bbox, get_bbox_width, get_foot_position
+from utils import get_center_of_bbox, get_bbox_width, get_anchor_positions, flatten_tracks
+from .inference import DetectionEngine
 
 class Tracker:
-    def __init__(self, model_path):
-        # Load detection model and tracker once for reuse across frames.
-        # Trusting the checkpoint: force torch.load(weights_only=False) during model load.
-        torch.serialization.add_safe_globals([tasks.DetectionModel])
-        original_torch_load = torch.load
-        torch.load = functools.partial(original_torch_load, weights_only=False)
-        try:
-            self.model = YOLO(model_path)
-        finally:
-            torch.load = original_torch_load
+    def __init__(self, model_path, engine=None):
+        # Load detection model and tracker once for reuse across frames. Pass a
+        # DetectionEngine to change backend, input size or batching.
+        self.engine = engine or DetectionEngine(model_path)
+        self.model = self.engine.model
         # Tuning to reduce ID switches: keep tracks alive longer and require a short
         # confirmation window before assigning a new ID.
-        self.tracker = sv.ByteTrack(
+        self.tracker_params = dict(
             track_activation_threshold=0.2,
             lost_track_buffer=60,
             minimum_matching_threshold=0.85,
             frame_rate=30,
             minimum_consecutive_frames=2,
         )
+        self.reset_tracker()
+        # Class name -> id of the detector, set from the first detections seen.
+        self.class_ids = None
+
+    def cache_params(self):
+        return {"bytetrack": self.tracker_params}
+
+    def reset_tracker(self, update_interval=1):
+        # Fresh ByteTrack state. ByteTrack counts updates, not video frames: when only
+        # every update_interval-th frame is tracked (keyframe mode) its frame rate is
+        # scaled down so lost tracks still expire after the same time in the video.
+        params = dict(self.tracker_params)
+        params["frame_rate"] = params["frame_rate"] / max(update_interval, 1)
+        self.tracker = sv.ByteTrack(**params)
 
     def add_position_to_tracks(sekf,tracks):
-        # Compute a representative position (foot or center) for each track.
-        for object, object_tracks in tracks.items():
-            for frame_num, track in enumerate(object_tracks):
-                for track_id, track_info in track.items():
-                    bbox = track_info['bbox']
-                    if object == 'ball':
-                        position= get_center_of_bbox(bbox)
-                    else:
-                        position = get_foot_position(bbox)
-                    tracks[object][frame_num][track_id]['position'] = position
+        # Compute a representative position (foot or center) for each track, for
+        # every detection in one vectorized pass.
+        infos, names, _, _ = flatten_tracks(tracks)
+        if not infos:
+            return
+        positions = get_anchor_positions([info['bbox'] for info in infos],names == 'ball')
+        for info, position in zip(infos,positions.astype(np.int64).tolist()):
+            info['position'] = tuple(position)
+
+    def add_position_to_table(self,table):
+        # TrackTable variant: fills the position column in place.
+        columns = table.columns
+        columns['position'][:] = get_anchor_positions(columns['bbox'],columns['object_type'] == table.object_type_id('ball'))
+        for fields in table.present_fields.values():
+            fields.add('position')
 
     def interpolate_ball_positions(self,ball_positions):
         # Fill missing ball boxes using linear interpolation over time.
@@ -62,32 +71,16 @@ class Tracker:
 
     def detect_frames(self, frames):
         # Run batched inference for efficiency.
-        batch_size=20 
-        detections = [] 
-        for i in range(0,len(frames),batch_size):
-            detections_batch = self.model.predict(frames[i:i+batch_size],conf=0.1)
-            detections += detections_batch
-        return detections
-
-    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None):
-        
-        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
-            # Load cached tracks if available.
-            with open(stub_path,'rb') as f:
-                tracks = pickle.load(f)
-            return tracks
-
-        detections = self.detect_frames(frames)
-
-        tracks={
-            "players":[],
-            "referees":[],
-            "ball":[]
-        }
+        return self.engine.predict(frames)
 
-        for frame_num, detection in enumerate(detections):
+    def to_supervision(self, detections):
+        # Ultralytics results -> supervision Detections, with goalkeepers relabelled as
+        # players. These hold no image, so they can be packed and cached.
+        detections_supervision = []
+        for detection in detections:
             cls_names = detection.names
             cls_names_inv = {v:k for k,v in cls_names.items()}
+            self.class_ids = cls_names_inv
 
             # Covert to supervision Detection format
             detection_supervision = sv.Detections.from_ultralytics(detection)
@@ -96,7 +89,56 @@ class Tracker:
             for object_ind , class_id in enumerate(detection_supervision.class_id):
                 if cls_names[class_id] == "goalkeeper":
                     detection_supervision.class_id[object_ind] = cls_names_inv["player"]
+            detections_supervision.append(detection_supervision)
+        return detections_supervision
+
+    def pack_detections(self, detections, start_frame=0):
+        # Supervision Detections of consecutive frames as flat arrays (one row per box).
+        counts = [len(detection) for detection in detections]
+        def column(name, shape, dtype):
+            values = [getattr(detection, name) for detection in detections if len(detection)]
+            return np.concatenate(values).astype(dtype) if values else np.zeros(shape, dtype=dtype)
+        return {
+            "class_ids": self.class_ids,
+            "num_frames": len(detections),
+            "frame": np.repeat(np.arange(start_frame, start_frame + len(detections)), counts).astype(np.int32),
+            "xyxy": column("xyxy", (0, 4), np.float32),
+            "confidence": column("confidence", (0,), np.float32),
+            "class_id": column("class_id", (0,), np.int64),
+        }
+
+    def concat_packed_detections(self, packed_chunks):
+        packed = {"class_ids": next((chunk["class_ids"] for chunk in packed_chunks if chunk["class_ids"]), None),
+                  "num_frames": sum(chunk["num_frames"] for chunk in packed_chunks)}
+        for name in ("frame", "xyxy", "confidence", "class_id"):
+            packed[name] = np.concatenate([chunk[name] for chunk in packed_chunks])
+        return packed
+
+    def unpack_detections(self, packed, start=0, stop=None):
+        # Supervision Detections of frames [start, stop) from pack_detections output.
+        stop = packed["num_frames"] if stop is None else min(stop, packed["num_frames"])
+        self.class_ids = packed["class_ids"]
+        bounds = np.searchsorted(packed["frame"], np.arange(start, stop + 1))
+        return [sv.Detections(xyxy=packed["xyxy"][lo:hi], confidence=packed["confidence"][lo:hi],
+                              class_id=packed["class_id"][lo:hi])
+                for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist())]
+
+    def tracks_from_detections(self, detections):
+        # Feed detections through ByteTrack in order. Tracker state persists between
+        # calls, so consecutive chunks of one video can be passed in separately.
+        return self.tracks_from_supervision(self.to_supervision(detections))
+
+    def tracks_from_supervision(self, detections):
+        # ByteTrack over supervision Detections from to_supervision (or unpacked
+        # from the cache).
+        tracks={
+            "players":[],
+            "referees":[],
+            "ball":[]
+        }
+        cls_names_inv = self.class_ids
 
+        for frame_num, detection_supervision in enumerate(detections):
             # Track Objects
             detection_with_tracks = self.tracker.update_with_detections(detection_supervision)
 
@@ -123,12 +165,12 @@ class Tracker:
                 if cls_id == cls_names_inv['ball']:
                     tracks["ball"][frame_num][1] = {"bbox":bbox}
 
-        if stub_path is not None:
-            # Persist tracks for reuse on the same video.
-            with open(stub_path,'wb') as f:
-                pickle.dump(tracks,f)
-
         return tracks
+
+    def get_object_tracks(self, frames):
+        # Detect and track a list of frames; results are cached by analysis_cache.
+        detections = self.detect_frames(frames)
+        return self.tracks_from_detections(detections)
     
     def draw_ellipse(self,frame,bbox,color,track_id=None):
         # Visualize a player/referee using an ellipse and optional ID tag.
@@ -219,10 +261,11 @@ class Tracker:
 
         return frame
 
-    def draw_annotations(self,video_frames, tracks,team_ball_control):
-        # Render all overlays onto each frame.
+    def draw_annotations(self,video_frames, tracks,team_ball_control,start_frame=0):
+        # Render all overlays onto each frame. start_frame maps a chunk of frames
+        # back to its absolute index in tracks.
         output_video_frames= []
-        for frame_num, frame in enumerate(video_frames):
+        for frame_num, frame in enumerate(video_frames, start=start_frame):
             frame = frame.copy()
 
             player_dict = tracks["players"][frame_num]
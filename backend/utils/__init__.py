@@ -1,3 +1,4 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance,measure_xy_distance,get_foot_position
+from .video_utils import read_video, save_video, VideoFrameWriter, FFmpegVideoWriter, FFmpegHLSWriter, TeeVideoWriter, open_video_writer, DEFAULT_HLS_RENDITIONS, HLS_MASTER_PLAYLIST, iter_video_frames, iter_frame_chunks, get_video_fps, get_video_frame_count
+from .bbox_utils import get_center_of_bbox, get_bbox_width, measure_distance,measure_xy_distance,get_foot_position,box_iou_matrix,match_boxes,get_anchor_positions,warp_points
+from .track_utils import flatten_tracks
 """Shared utility functions for geometry and video I/O."""
@@ -1,5 +1,7 @@
 """Bounding box geometry helpers for tracking and visualization."""
 
+import numpy as np
+
 def get_center_of_bbox(bbox):
     # Return center point (x, y) of a bounding box.
     x1,y1,x2,y2 = bbox
@@ -21,3 +23,51 @@ def get_foot_position(bbox):
     # Approximate foot position as bottom center of the box.
     x1,y1,x2,y2 = bbox
     return int((x1+x2)/2),int(y2)
+
+def box_iou_matrix(boxes_a,boxes_b):
+    # Pairwise IoU between two sets of [x1, y1, x2, y2] boxes, shape (len(a), len(b)).
+    boxes_a = np.asarray(boxes_a,dtype=np.float64).reshape(-1,4)
+    boxes_b = np.asarray(boxes_b,dtype=np.float64).reshape(-1,4)
+    x1 = np.maximum(boxes_a[:,None,0],boxes_b[None,:,0])
+    y1 = np.maximum(boxes_a[:,None,1],boxes_b[None,:,1])
+    x2 = np.minimum(boxes_a[:,None,2],boxes_b[None,:,2])
+    y2 = np.minimum(boxes_a[:,None,3],boxes_b[None,:,3])
+    intersection = np.clip(x2-x1,0,None)*np.clip(y2-y1,0,None)
+    area_a = (boxes_a[:,2]-boxes_a[:,0])*(boxes_a[:,3]-boxes_a[:,1])
+    area_b = (boxes_b[:,2]-boxes_b[:,0])*(boxes_b[:,3]-boxes_b[:,1])
+    union = area_a[:,None]+area_b[None,:]-intersection
+    return np.divide(intersection,union,out=np.zeros_like(intersection),where=union>0)
+
+def match_boxes(boxes_a,boxes_b,iou_threshold=0.5):
+    # Greedy one-to-one matching by descending IoU; returns [(index_a, index_b, iou), ...].
+    iou = box_iou_matrix(boxes_a,boxes_b)
+    if iou.size == 0:
+        return []
+    pairs = np.argwhere(iou >= iou_threshold)
+    order = np.argsort(-iou[pairs[:,0],pairs[:,1]],kind="stable")
+    used_a, used_b, matches = set(), set(), []
+    for a, b in pairs[order]:
+        if a in used_a or b in used_b:
+            continue
+        used_a.add(a)
+        used_b.add(b)
+        matches.append((int(a),int(b),float(iou[a,b])))
+    return matches
+
+def get_anchor_positions(bboxes,use_center):
+    # Vectorized get_foot_position / get_center_of_bbox for (N, 4) boxes. use_center
+    # is a bool or per-box bool mask; coordinates are truncated like int().
+    bboxes = np.asarray(bboxes,dtype=np.float64).reshape(-1,4)
+    x = np.trunc((bboxes[:,0]+bboxes[:,2])/2)
+    y = np.where(use_center,np.trunc((bboxes[:,1]+bboxes[:,3])/2),np.trunc(bboxes[:,3]))
+    return np.stack([x,y],axis=1)
+
+def warp_points(points,matrices):
+    # Apply one 3x3 projective matrix per point: (N, 2) points, (N, 3, 3) or a shared
+    # (3, 3) matrix. Affine matrices (last row 0 0 1) reduce to x' = A x + t.
+    points = np.asarray(points,dtype=np.float64).reshape(-1,2)
+    matrices = np.asarray(matrices,dtype=np.float64)
+    if matrices.ndim == 2:
+        matrices = matrices[None]
+    warped = (np.einsum('nij,nj->ni',matrices[...,:,:2],points) + matrices[...,:,2])
+    return warped[:,:2]/warped[:,2:3]
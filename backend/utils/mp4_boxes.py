@@ -0,0 +1,222 @@
+"""Minimal MP4/MOV box parsing: top-level layout, video sample byte ranges and faststart."""
+
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+
+MP4_EXTENSIONS = {".mp4", ".mov", ".m4v"}
+# Boxes whose payload is a sequence of child boxes (on the path to the sample tables).
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+def iter_boxes(data, start=0, end=None):
+    # (type, payload start, box end) of consecutive boxes in data[start:end].
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield box_type, offset + header, offset + size
+        offset += size
+
+def top_level_boxes(path, available=None):
+    # (type, offset, size) of the top-level boxes whose headers lie in the first
+    # `available` bytes of the file (all of it by default), read header by header.
+    boxes = []
+    with open(path, 'rb') as f:
+        f.seek(0, 2)
+        available = f.tell() if available is None else min(available, f.tell())
+        offset = 0
+        while offset + 8 <= available:
+            f.seek(offset)
+            header = f.read(16)
+            size, box_type = struct.unpack_from(">I4s", header)
+            if size == 1:
+                if offset + 16 > available:
+                    break
+                size = struct.unpack_from(">Q", header, 8)[0]
+            elif size == 0:
+                size = available - offset
+            if size < 8:
+                break
+            boxes.append((box_type, offset, size))
+            offset += size
+    return boxes
+
+def read_moov(path, available=None):
+    # The moov box bytes if it lies entirely before the media data (a "faststart"
+    # file) within the first `available` bytes; None while it has not arrived, or
+    # when it follows mdat and the file can only be decoded once complete.
+    for box_type, offset, size in top_level_boxes(path, available):
+        if box_type == b"mdat":
+            return None
+        if box_type == b"moov":
+            if available is not None and offset + size > available:
+                return None
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                return f.read(size)
+    return None
+
+def _child(data, start, end, box_type):
+    for child_type, child_start, child_end in iter_boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+def _find_path(data, start, end, path):
+    span = (start, end)
+    for box_type in path:
+        span = _child(data, span[0], span[1], box_type)
+        if span is None:
+            return None
+    return span
+
+def _is_video_track(moov, trak):
+    hdlr = _find_path(moov, trak[0], trak[1], (b"mdia", b"hdlr"))
+    # FullBox version/flags, pre_defined, then handler_type.
+    return hdlr is not None and moov[hdlr[0] + 8:hdlr[0] + 12] == b"vide"
+
+def _video_sample_tables(moov):
+    # {box type: (payload start, end)} of the sample table boxes (stsz, stsc, stco,
+    # stss, ...) of the first video track, or None.
+    for box_type, start, end in iter_boxes(moov, 8, len(moov)):
+        if box_type != b"trak" or not _is_video_track(moov, (start, end)):
+            continue
+        stbl = _find_path(moov, start, end, (b"mdia", b"minf", b"stbl"))
+        if stbl is None:
+            return None
+        return {child_type: (child_start, child_end) for child_type, child_start, child_end
+                in iter_boxes(moov, stbl[0], stbl[1])}
+    return None
+
+def video_sample_ends(moov):
+    # Byte offset just past each sample of the first video track, in decode order,
+    # from its sample size (stsz), sample-to-chunk (stsc) and chunk offset
+    # (stco/co64) tables; None if the moov has no such track.
+    tables = _video_sample_tables(moov)
+    if tables is None or b"stsz" not in tables or b"stsc" not in tables or not (
+            b"stco" in tables or b"co64" in tables):
+        return None
+
+    stsz = tables[b"stsz"][0]
+    sample_size, sample_count = struct.unpack_from(">II", moov, stsz + 4)
+    if sample_size:
+        sizes = np.full(sample_count, sample_size, dtype=np.int64)
+    else:
+        sizes = np.frombuffer(moov, dtype=">u4", count=sample_count, offset=stsz + 12).astype(np.int64)
+
+    if b"co64" in tables:
+        chunk_box, chunk_dtype = tables[b"co64"][0], ">u8"
+    else:
+        chunk_box, chunk_dtype = tables[b"stco"][0], ">u4"
+    chunk_count = struct.unpack_from(">I", moov, chunk_box + 4)[0]
+    chunk_offsets = np.frombuffer(moov, dtype=chunk_dtype, count=chunk_count, offset=chunk_box + 8).astype(np.int64)
+
+    # stsc runs: (first chunk, samples per chunk, description index), 1-based chunks.
+    stsc = tables[b"stsc"][0]
+    run_count = struct.unpack_from(">I", moov, stsc + 4)[0]
+    runs = np.frombuffer(moov, dtype=">u4", count=run_count * 3, offset=stsc + 8).reshape(-1, 3).astype(np.int64)
+    samples_per_chunk = np.zeros(chunk_count, dtype=np.int64)
+    for index, (first_chunk, samples, _) in enumerate(runs):
+        last_chunk = runs[index + 1][0] - 1 if index + 1 < len(runs) else chunk_count
+        samples_per_chunk[first_chunk - 1:last_chunk] = samples
+
+    # Samples are contiguous within a chunk: each ends at the chunk offset plus
+    # the sizes of the chunk's samples up to and including it.
+    sample_chunk = np.repeat(np.arange(chunk_count), samples_per_chunk)[:sample_count]
+    first_sample = np.concatenate(([0], np.cumsum(samples_per_chunk)[:-1]))
+    cumulative = np.cumsum(sizes)
+    chunk_base = cumulative[first_sample[sample_chunk]] - sizes[first_sample[sample_chunk]]
+    return chunk_offsets[sample_chunk] + cumulative[:len(sample_chunk)] - chunk_base
+
+def video_sample_starts(moov):
+    # Byte offset of each video sample, in decode order (see video_sample_ends).
+    tables = _video_sample_tables(moov)
+    ends = video_sample_ends(moov)
+    if ends is None:
+        return None
+    stsz = tables[b"stsz"][0]
+    sample_size, sample_count = struct.unpack_from(">II", moov, stsz + 4)
+    if sample_size:
+        return ends - sample_size
+    return ends - np.frombuffer(moov, dtype=">u4", count=len(ends), offset=stsz + 12).astype(np.int64)
+
+def video_sync_samples(moov):
+    # 0-based indexes of the video track's keyframes (stss); None when every sample is one.
+    tables = _video_sample_tables(moov)
+    if tables is None or b"stss" not in tables:
+        return None
+    stss = tables[b"stss"][0]
+    count = struct.unpack_from(">I", moov, stss + 4)[0]
+    return np.frombuffer(moov, dtype=">u4", count=count, offset=stss + 8).astype(np.int64) - 1
+
+def _shift_chunk_offsets(moov, start, end, delta):
+    # Add delta to every stco/co64 entry of every track, in place; False if a 32-bit
+    # offset would overflow.
+    for box_type, child_start, child_end in iter_boxes(moov, start, end):
+        if box_type in CONTAINER_BOXES:
+            if not _shift_chunk_offsets(moov, child_start, child_end, delta):
+                return False
+        elif box_type in (b"stco", b"co64"):
+            count = struct.unpack_from(">I", moov, child_start + 4)[0]
+            dtype = ">u4" if box_type == b"stco" else ">u8"
+            view = np.frombuffer(moov, dtype=dtype, count=count, offset=child_start + 8)
+            shifted = view.astype(np.uint64) + delta
+            if box_type == b"stco" and count and shifted.max() >= 2 ** 32:
+                return False
+            moov[child_start + 8:child_start + 8 + view.nbytes] = shifted.astype(dtype).tobytes()
+    return True
+
+def faststart(path, block_size=1024 * 1024):
+    # Move the moov box of an MP4/MOV ahead of its media data (as ffmpeg's
+    # -movflags +faststart does), so players and partial downloads can start before
+    # the rest of the file arrives. The file is rewritten to a temp file and renamed.
+    # Returns False when there is nothing to do (or 32-bit chunk offsets would overflow).
+    boxes = top_level_boxes(path)
+    types = [box[0] for box in boxes]
+    if b"moov" not in types or b"mdat" not in types or types.index(b"moov") < types.index(b"mdat"):
+        return False
+    first_mdat = types.index(b"mdat")
+    _, moov_offset, moov_size = boxes[types.index(b"moov")]
+    with open(path, 'rb') as src:
+        src.seek(moov_offset)
+        moov = bytearray(src.read(moov_size))
+        # Every box from the first mdat up to the old moov position moves by its size.
+        if not _shift_chunk_offsets(moov, 8, len(moov), moov_size):
+            return False
+        order = boxes[:first_mdat] + [None] + [box for box in boxes[first_mdat:] if box[0] != b"moov"]
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as dst:
+                for box in order:
+                    if box is None:
+                        dst.write(moov)
+                        continue
+                    src.seek(box[1])
+                    remaining = box[2]
+                    while remaining > 0:
+                        block = src.read(min(block_size, remaining))
+                        if not block:
+                            break
+                        dst.write(block)
+                        remaining -= len(block)
+            shutil.copymode(path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    return True
@@ -0,0 +1,18 @@
+"""Helpers for flattening nested per-frame track dicts into arrays."""
+
+import numpy as np
+
+def flatten_tracks(tracks,object_names=None):
+    # One pass over tracks[object][frame][track_id] returning the info dicts and
+    # matching (N,) arrays of object name, frame index and track id, so stages can
+    # compute on arrays and write results back through the dict references.
+    infos, names, frames, track_ids = [], [], [], []
+    for object_name, object_tracks in tracks.items():
+        if object_names is not None and object_name not in object_names:
+            continue
+        for frame_num, frame_tracks in enumerate(object_tracks):
+            infos.extend(frame_tracks.values())
+            track_ids.extend(frame_tracks.keys())
+            frames.extend([frame_num]*len(frame_tracks))
+            names.extend([object_name]*len(frame_tracks))
+    return infos, np.asarray(names,dtype=object), np.asarray(frames,dtype=np.int64), np.asarray(track_ids,dtype=np.int64)
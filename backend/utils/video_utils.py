@@ -1,22 +1,253 @@
 """Lightweight video I/O helpers using OpenCV."""
 
+import itertools
+import os
+import shutil
+import subprocess
+import tempfile
 import cv2
 
+from .mp4_boxes import MP4_EXTENSIONS, faststart
+
 def read_video(video_path):
     # Read all frames into memory for batch processing.
+    return list(iter_video_frames(video_path))
+
+def iter_video_frames(video_path, start_frame=0):
+    # Lazily decode frames one at a time so callers control how many stay in memory.
     cap = cv2.VideoCapture(video_path)
-    frames = []
+    try:
+        if start_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
+
+def iter_frame_chunks(frames, chunk_size):
+    # Group any frame iterable into lists of at most chunk_size frames.
+    frames = iter(frames)
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        chunk = list(itertools.islice(frames, chunk_size))
+        if not chunk:
             break
-        frames.append(frame)
-    return frames
-
-def save_video(ouput_video_frames,output_video_path):
-    # Write frames to disk using a fixed FPS and codec.
-    fourcc = cv2.VideoWriter_fourcc(*'XVID')
-    out = cv2.VideoWriter(output_video_path, fourcc, 24, (ouput_video_frames[0].shape[1], ouput_video_frames[0].shape[0]))
-    for frame in ouput_video_frames:
-        out.write(frame)
-    out.release()
+        yield chunk
+
+def get_video_fps(video_path, default=24.0):
+    # Read the source frame rate, falling back when the container does not report one.
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps or default
+
+def _partial_path(path):
+    # Sibling path a writer encodes to before renaming onto path, so the output is
+    # never served (or range-requested) half written; keeps the container extension.
+    root, ext = os.path.splitext(str(path))
+    return f"{root}.partial{ext}"
+
+def _is_mp4(path):
+    return os.path.splitext(str(path))[1].lower() in MP4_EXTENSIONS
+
+class VideoFrameWriter:
+    def __init__(self, output_video_path, fps=24):
+        # Incremental writer; the underlying file is opened from the first frame's size.
+        # MP4/MOV output is rewritten with the moov box first (faststart) on close.
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.writer = None
+
+    def write(self, frame):
+        if self.writer is None:
+            fourcc = cv2.VideoWriter_fourcc(*'XVID')
+            self.writer = cv2.VideoWriter(_partial_path(self.output_video_path), fourcc, self.fps,
+                                          (frame.shape[1], frame.shape[0]))
+        self.writer.write(frame)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+            self.writer = None
+            partial_path = _partial_path(self.output_video_path)
+            if _is_mp4(partial_path):
+                faststart(partial_path)
+            os.replace(partial_path, self.output_video_path)
+
+class FFmpegVideoWriter:
+    def __init__(self, output_video_path, fps=24, preset="fast", crf=23):
+        # Pipe raw BGR frames into a single ffmpeg/libx264 process so a browser-playable
+        # MP4 is produced in one encode, with no intermediate file. MP4/MOV output has
+        # its moov box first (faststart), so playback starts before the download ends.
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.preset = preset
+        self.crf = crf
+        self.process = None
+        self.stderr = None
+
+    def _input_args(self, width, height):
+        return ["ffmpeg", "-y", "-loglevel", "error",
+                "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(self.fps),
+                "-i", "-"]
+
+    def _output_args(self, width, height):
+        return [
+            # yuv420p needs even dimensions; pad by one pixel when the source is odd.
+            "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf),
+            "-pix_fmt", "yuv420p",
+            *(["-movflags", "+faststart"] if _is_mp4(self.output_video_path) else []),
+            _partial_path(self.output_video_path),
+        ]
+
+    def _open(self, width, height):
+        # ffmpeg output is spooled to a temp file so a full pipe never blocks the encoder.
+        self.stderr = tempfile.TemporaryFile()
+        cmd = self._input_args(width, height) + self._output_args(width, height)
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self.stderr)
+
+    def _finish(self):
+        os.replace(_partial_path(self.output_video_path), self.output_video_path)
+
+    def _error_output(self):
+        self.stderr.seek(0)
+        return self.stderr.read().decode("utf-8", errors="replace").strip()
+
+    def write(self, frame):
+        if self.process is None:
+            self._open(frame.shape[1], frame.shape[0])
+        try:
+            self.process.stdin.write(frame.tobytes())
+        except BrokenPipeError:
+            self.process.wait()
+            raise RuntimeError(f"ffmpeg exited while encoding {self.output_video_path}: {self._error_output()}")
+
+    def close(self):
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = process.wait()
+        try:
+            if returncode != 0:
+                raise RuntimeError(f"ffmpeg failed ({returncode}) encoding {self.output_video_path}: {self._error_output()}")
+            self._finish()
+        finally:
+            self.stderr.close()
+
+# HLS renditions as (height, video kbit/s); ones taller than the source are skipped.
+DEFAULT_HLS_RENDITIONS = ((1080, 5000), (720, 2800), (360, 800))
+HLS_MASTER_PLAYLIST = "master.m3u8"
+
+def hls_renditions_for(height, renditions=DEFAULT_HLS_RENDITIONS):
+    # Renditions no taller than the source, or just the source height if all are.
+    fitting = [(int(h), int(kbps)) for h, kbps in renditions if h <= height]
+    if fitting:
+        return fitting
+    smallest = min(renditions, key=lambda rendition: rendition[0])
+    return [(height - height % 2, int(smallest[1]))]
+
+class FFmpegHLSWriter(FFmpegVideoWriter):
+    def __init__(self, output_dir, fps=24, renditions=DEFAULT_HLS_RENDITIONS, segment_seconds=4,
+                 preset="veryfast"):
+        # One ffmpeg process scales the raw frames to each rendition and writes HLS
+        # into output_dir: <height>p/index.m3u8 with its numbered .ts segments per
+        # rendition, and master.m3u8 listing them with their bandwidth. Keyframes are
+        # aligned across renditions at segment boundaries so players can switch. The
+        # playlists are "event" playlists written as each segment completes, so
+        # playback can start while the video is still rendering.
+        super().__init__(output_dir, fps, preset=preset)
+        self.output_dir = output_dir
+        self.renditions = renditions
+        self.segment_seconds = segment_seconds
+        self.rendition_names = []
+
+    def _open(self, width, height):
+        # Start from an empty output_dir with one directory per rendition.
+        self.rendition_names = [f"{h}p" for h, _ in hls_renditions_for(height, self.renditions)]
+        if os.path.isdir(self.output_dir):
+            shutil.rmtree(self.output_dir)
+        for name in self.rendition_names:
+            os.makedirs(os.path.join(self.output_dir, name))
+        super()._open(width, height)
+
+    def _output_args(self, width, height):
+        renditions = hls_renditions_for(height, self.renditions)
+        names = [f"{h}p" for h, _ in renditions]
+        split = "".join(f"[v{index}]" for index in range(len(renditions)))
+        filters = [f"[0:v]split={len(renditions)}{split}"] + [
+            f"[v{index}]scale=-2:{h}[out{index}]" for index, (h, _) in enumerate(renditions)]
+        gop = max(int(round(self.fps * self.segment_seconds)), 1)
+        args = ["-filter_complex", ";".join(filters)]
+        for index, (_, kbps) in enumerate(renditions):
+            args += ["-map", f"[out{index}]", f"-c:v:{index}", "libx264", f"-b:v:{index}", f"{kbps}k",
+                     f"-maxrate:v:{index}", f"{int(kbps * 1.1)}k", f"-bufsize:v:{index}", f"{int(kbps * 1.5)}k"]
+        args += [
+            "-preset", self.preset, "-pix_fmt", "yuv420p",
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-f", "hls", "-hls_time", str(self.segment_seconds), "-hls_playlist_type", "event",
+            # Segments are written under a temp name and renamed, so none is served partial.
+            "-hls_flags", "independent_segments+temp_file",
+            "-hls_segment_filename", os.path.join(self.output_dir, "%v", "segment_%05d.ts"),
+            "-master_pl_name", HLS_MASTER_PLAYLIST,
+            "-var_stream_map", " ".join(f"v:{index},name:{name}" for index, name in enumerate(names)),
+            os.path.join(self.output_dir, "%v", "index.m3u8"),
+        ]
+        return args
+
+    def _finish(self):
+        pass
+
+class TeeVideoWriter:
+    def __init__(self, *writers):
+        # Hand every frame to several writers (e.g. the MP4 and its HLS renditions).
+        self.writers = writers
+
+    def write(self, frame):
+        for writer in self.writers:
+            writer.write(frame)
+
+    def close(self):
+        # Close every writer, then raise the first error.
+        error = None
+        for writer in self.writers:
+            try:
+                writer.close()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+VIDEO_ENCODERS = {
+    "opencv": VideoFrameWriter,
+    "ffmpeg": FFmpegVideoWriter,
+}
+
+def open_video_writer(output_video_path, fps=24, encoder="opencv"):
+    # Pick an incremental frame writer by name; see VIDEO_ENCODERS.
+    if encoder not in VIDEO_ENCODERS:
+        raise ValueError(f"Unknown video encoder: {encoder}")
+    return VIDEO_ENCODERS[encoder](output_video_path, fps)
+
+def save_video(ouput_video_frames,output_video_path,fps=24,encoder="opencv"):
+    # Write frames to disk using the given FPS and encoder. Accepts a list or any
+    # frame iterable, so generators are encoded as they are produced.
+    writer = open_video_writer(output_video_path, fps, encoder)
+    try:
+        for frame in ouput_video_frames:
+            writer.write(frame)
+    finally:
+        writer.close()
+
+def get_video_frame_count(video_path):
+    # Frame count reported by the container; may be 0 or approximate for some codecs.
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return max(frame_count, 0)
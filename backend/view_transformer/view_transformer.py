@@ -2,6 +2,9 @@
 
 import numpy as np 
 import cv2
+import sys
+sys.path.append('../')
+from utils import flatten_tracks, warp_points
 
 class ViewTransformer():
     def __init__(self):
@@ -37,14 +40,52 @@ class ViewTransformer():
         tranform_point = cv2.perspectiveTransform(reshaped_point,self.persepctive_trasnformer)
         return tranform_point.reshape(-1,2)
 
+    def points_inside(self,points):
+        # Vectorized pointPolygonTest(..., False) >= 0 for (N, 2) points: points are
+        # truncated to ints like transform_point, and points on an edge count as inside.
+        points = np.trunc(np.asarray(points,dtype=np.float64).reshape(-1,2))
+        px, py = points[:,0:1], points[:,1:2]
+        vertices = self.pixel_vertices.astype(np.float64)
+        x1, y1 = vertices[:,0], vertices[:,1]
+        x2, y2 = np.roll(x1,-1), np.roll(y1,-1)
+
+        # Even-odd ray casting towards +x.
+        crosses = ((y1 > py) != (y2 > py))
+        with np.errstate(divide='ignore',invalid='ignore'):
+            x_at_y = x1 + (py-y1)*(x2-x1)/(y2-y1)
+        inside = np.count_nonzero(crosses & (px < x_at_y),axis=1) % 2 == 1
+
+        # Exact on-edge test: collinear with an edge and within its bounding box.
+        cross = (x2-x1)*(py-y1) - (y2-y1)*(px-x1)
+        on_edge = ((cross == 0)
+                   & (px >= np.minimum(x1,x2)) & (px <= np.maximum(x1,x2))
+                   & (py >= np.minimum(y1,y2)) & (py <= np.maximum(y1,y2)))
+        return inside | on_edge.any(axis=1)
+
+    def transform_points(self,points,camera_transforms=None):
+        # Transform (N, 2) points in one call; rows outside the polygon are NaN. With
+        # camera_transforms ((N, 3, 3) or one (3, 3), see CameraMovementEstimator),
+        # points are first mapped into the frame the pitch vertices were drawn on.
+        points = np.asarray(points,dtype=np.float64).reshape(-1,2)
+        if camera_transforms is not None and len(points):
+            points = warp_points(points,camera_transforms)
+        transformed = np.full((len(points),2),np.nan,dtype=np.float32)
+        if len(points) == 0:
+            return transformed
+        inside = self.points_inside(points)
+        if inside.any():
+            reshaped_points = points[inside].reshape(-1,1,2).astype(np.float32)
+            transformed[inside] = cv2.perspectiveTransform(reshaped_points,self.persepctive_trasnformer).reshape(-1,2)
+        return transformed
+
     def add_transformed_position_to_tracks(self,tracks):
-        # Add top-down transformed positions to each track where applicable.
-        for object, object_tracks in tracks.items():
-            for frame_num, track in enumerate(object_tracks):
-                for track_id, track_info in track.items():
-                    position = track_info['position_adjusted']
-                    position = np.array(position)
-                    position_trasnformed = self.transform_point(position)
-                    if position_trasnformed is not None:
-                        position_trasnformed = position_trasnformed.squeeze().tolist()
-                    tracks[object][frame_num][track_id]['position_transformed'] = position_trasnformed
+        # Add top-down transformed positions to each track where applicable, with one
+        # batched transform over every detection in the video.
+        infos, _, _, _ = flatten_tracks(tracks)
+        if not infos:
+            return
+        positions = np.array([info['position_adjusted'] for info in infos],dtype=np.float64)
+        transformed = self.transform_points(positions)
+        inside = ~np.isnan(transformed[:,0])
+        for info, point, is_inside in zip(infos,transformed.tolist(),inside.tolist()):
+            info['position_transformed'] = point if is_inside else None
@@ -20,9 +20,11 @@ export default function ViewerPage() {
   const videoRef = useRef<VideoPlayerHandle>(null)
   const [timelineFilter, setTimelineFilter] = useState<'top' | 'all' | 'risk' | 'attack'>('top')
   const [videoSrc, setVideoSrc] = useState<string | undefined>(undefined)
+  const [hlsSrc, setHlsSrc] = useState<string | undefined>(undefined)
 
   const {
     artifacts,
+    overviewTracks,
     isLoading,
     overlaySettings,
     setOverlaySettings,
@@ -35,10 +37,11 @@ export default function ViewerPage() {
   } = useVideo({ videoId })
 
   useEffect(() => {
-    // Use processed video from Flask backend, fall back to local upload
-    const backendUrl = videoApi.getVideoUrl(videoId)
-    setVideoSrc(backendUrl)
-  }, [videoId])
+    // Use processed video from Flask backend, streamed adaptively when available
+    if (isLoading) return
+    setVideoSrc(videoApi.getVideoUrl(videoId))
+    setHlsSrc(videoApi.getHlsUrl(artifacts.meta.hls))
+  }, [videoId, isLoading, artifacts.meta.hls])
 
   // Handle event click - seek video and select event
   const handleEventClick = useCallback(
@@ -185,8 +188,10 @@ export default function ViewerPage() {
             {/* Video Player */}
             <VideoPlayerWithOverlay
               videoSrc={videoSrc}
+              hlsSrc={hlsSrc}
               ref={videoRef}
               tracks={artifacts.tracks}
+              heatmapTracks={overviewTracks}
               riskScores={artifacts.predictions.riskScores}
               overlaySettings={overlaySettings}
             onTimeUpdate={setCurrentTime}
@@ -154,64 +154,74 @@ export function UploadCard({
     setError(null)
 
     try {
-      // Step 1: Upload video
+      // Step 1: Upload video in resumable chunks
       setProcessingStatus('uploading')
       console.log('Uploading video to backend...')
-      const { videoId } = await videoApi.uploadVideo(file, 'soccer')
+      const { videoId } = await videoApi.uploadVideoChunked(file, {
+        // Step 2: Trigger processing; the backend starts once the upload is decodable
+        onCreated: async (id) => {
+          console.log('Triggering video processing...')
+          await videoApi.processVideo(id)
+          console.log('Processing triggered')
+        },
+      })
       console.log('Video uploaded, videoId:', videoId)
-
-      // Step 2: Trigger processing
       setProcessingStatus('processing')
-      console.log('Triggering video processing...')
-      await videoApi.processVideo(videoId)
-      console.log('Processing triggered')
 
-      // Step 3: Poll for status updates
+      // Step 3: Follow status updates pushed over server-sent events, falling
+      // back to polling if the stream fails
+      let finished = false
+
+      // Map a backend status onto the progress steps; true once processing ended
+      const applyStatus = async (status: { status: string; progress: number; error?: string }): Promise<boolean> => {
+        let frontendStatus: ProcessingStatus = 'processing'
+        const statusLower = status.status.toLowerCase()
+
+        if (statusLower.includes('upload')) {
+          frontendStatus = 'uploading'
+        } else if (statusLower.includes('detect')) {
+          frontendStatus = 'detecting'
+        } else if (statusLower.includes('track')) {
+          frontendStatus = 'tracking'
+        } else if (statusLower.includes('analyz')) {
+          frontendStatus = 'analyzing'
+        } else if (statusLower.includes('complete') || statusLower.includes('done')) {
+          frontendStatus = 'complete'
+        } else if (statusLower.includes('error') || statusLower.includes('fail')) {
+          finished = true
+          setError(status.error || 'Processing failed')
+          setIsProcessing(false)
+          return true
+        }
+
+        setProcessingStatus(frontendStatus)
+
+        // Check if complete
+        if (status.status === 'complete' || status.progress >= 100) {
+          finished = true
+          console.log('Processing complete!')
+          setProcessingStatus('complete')
+          await new Promise((resolve) => setTimeout(resolve, 1000)) // Brief delay to show completion
+
+          // Navigate to viewer
+          onUploadComplete?.(videoId)
+          router.push(`/viewer/${videoId}`)
+          return true
+        }
+        return false
+      }
+
       let attempts = 0
       const maxAttempts = 3600 // 30 minutes max (0.5s * 3600 = 1800s) - detection can take a while
       const pollInterval = 500 // Poll every 500ms
 
       const pollStatus = async (): Promise<void> => {
         attempts++
-        
+
         try {
           const status = await videoApi.getStatus(videoId)
           console.log(`Status update (attempt ${attempts}):`, status)
-
-          // Map backend status to frontend status
-          let frontendStatus: ProcessingStatus = 'processing'
-          const statusLower = status.status.toLowerCase()
-
-          if (statusLower.includes('upload')) {
-            frontendStatus = 'uploading'
-          } else if (statusLower.includes('detect')) {
-            frontendStatus = 'detecting'
-          } else if (statusLower.includes('track')) {
-            frontendStatus = 'tracking'
-          } else if (statusLower.includes('analyz')) {
-            frontendStatus = 'analyzing'
-          } else if (statusLower.includes('complete') || statusLower.includes('done')) {
-            frontendStatus = 'complete'
-          } else if (statusLower.includes('error') || statusLower.includes('fail')) {
-            frontendStatus = 'error'
-            setError(status.error || 'Processing failed')
-            setIsProcessing(false)
-            return
-          }
-
-          setProcessingStatus(frontendStatus)
-
-          // Check if complete
-          if (status.status === 'complete' || status.progress >= 100) {
-            console.log('Processing complete!')
-            setProcessingStatus('complete')
-            await new Promise((resolve) => setTimeout(resolve, 1000)) // Brief delay to show completion
-
-      // Navigate to viewer
-      onUploadComplete?.(videoId)
-      router.push(`/viewer/${videoId}`)
-            return
-          }
+          if (await applyStatus(status)) return
 
           // Continue polling if not complete
           if (attempts < maxAttempts) {
@@ -233,8 +243,18 @@ export function UploadCard({
         }
       }
 
-      // Start polling
-      setTimeout(pollStatus, pollInterval)
+      videoApi.subscribeEvents(videoId, {
+        onStatus: (status) => {
+          console.log('Status update:', status)
+          applyStatus(status)
+        },
+        onProgress: (progress) => console.log('Progress:', progress),
+        onError: () => {
+          if (finished) return
+          console.warn('Event stream unavailable, polling status instead')
+          setTimeout(pollStatus, pollInterval)
+        },
+      })
     } catch (err) {
       console.error('Error processing video:', err)
       const errorMessage = err instanceof Error ? err.message : 'Failed to process video'
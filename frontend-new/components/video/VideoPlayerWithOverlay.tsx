@@ -8,6 +8,7 @@ import {
   forwardRef,
   useImperativeHandle,
 } from 'react'
+import type Hls from 'hls.js'
 import { cn } from '@/lib/utils'
 import { formatTime, getRiskColor } from '@/lib/utils'
 import type { Track, OverlaySettings, RiskScore } from '@/lib/types'
@@ -22,7 +23,9 @@ export interface VideoPlayerHandle {
 
 interface VideoPlayerWithOverlayProps {
   videoSrc?: string
+  hlsSrc?: string // adaptive HLS master playlist; videoSrc is the fallback
   tracks?: Track[]
+  heatmapTracks?: Track[] // whole-match tracks for the heatmap; defaults to tracks
   riskScores?: RiskScore[]
   overlaySettings: OverlaySettings
   onTimeUpdate?: (time: number) => void
@@ -37,7 +40,9 @@ export const VideoPlayerWithOverlay = forwardRef<
   (
     {
       videoSrc,
+      hlsSrc,
       tracks = [],
+      heatmapTracks,
       riskScores = [],
       overlaySettings,
       onTimeUpdate,
@@ -56,13 +61,57 @@ export const VideoPlayerWithOverlay = forwardRef<
     const [isLoaded, setIsLoaded] = useState(false)
     const [heatmapData, setHeatmapData] = useState<number[][] | null>(null)
 
+    // Play HLS natively (Safari), through hls.js over Media Source Extensions
+    // (Chrome, Firefox, Edge), and fall back to the single MP4 without either or
+    // when hls.js hits a fatal error.
+    useEffect(() => {
+      const video = videoRef.current
+      if (!video) return
+      const play = (src?: string) => {
+        if (src) video.src = src
+        else video.removeAttribute('src')
+      }
+      if (!hlsSrc || video.canPlayType('application/vnd.apple.mpegurl')) {
+        play(hlsSrc ?? videoSrc)
+        return
+      }
+      let hls: Hls | null = null
+      let cancelled = false
+      import('hls.js')
+        .then(({ default: HlsPlayer }) => {
+          if (cancelled) return
+          if (!HlsPlayer.isSupported()) {
+            play(videoSrc)
+            return
+          }
+          const player = new HlsPlayer()
+          hls = player
+          player.on(HlsPlayer.Events.ERROR, (_event, data) => {
+            if (!data.fatal) return
+            player.destroy()
+            hls = null
+            play(videoSrc)
+          })
+          player.loadSource(hlsSrc)
+          player.attachMedia(video)
+        })
+        .catch(() => {
+          if (!cancelled) play(videoSrc)
+        })
+      return () => {
+        cancelled = true
+        hls?.destroy()
+      }
+    }, [hlsSrc, videoSrc])
+
     // Generate heatmap data when tracks change
     useEffect(() => {
-      if (tracks.length > 0 && overlaySettings.showHeatmap) {
-        const data = generateHeatmapData(tracks, 20)
+      const source = heatmapTracks && heatmapTracks.length > 0 ? heatmapTracks : tracks
+      if (source.length > 0 && overlaySettings.showHeatmap) {
+        const data = generateHeatmapData(source, 20)
         setHeatmapData(data)
       }
-    }, [tracks, overlaySettings.showHeatmap])
+    }, [tracks, heatmapTracks, overlaySettings.showHeatmap])
 
     // Expose methods via ref
     useImperativeHandle(ref, () => ({
@@ -273,7 +322,6 @@ export const VideoPlayerWithOverlay = forwardRef<
           {/* Video Element */}
           <video
             ref={videoRef}
-            src={videoSrc}
             className="w-full h-full object-contain"
             preload="metadata"
             onTimeUpdate={handleTimeUpdate}
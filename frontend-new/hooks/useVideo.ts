@@ -1,9 +1,17 @@
 'use client'
 
 import { useState, useCallback, useMemo, useEffect } from 'react'
-import type { VideoArtifacts, OverlaySettings, VideoEvent } from '@/lib/types'
+import type { VideoArtifacts, OverlaySettings, VideoEvent, Track } from '@/lib/types'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000'
+const MAX_HASHED_UPLOAD_BYTES = 512 * 1024 * 1024
+// Track positions are fetched per window of this many seconds: the one being
+// played plus the next, keeping the previous one for short seeks back.
+const TRACK_WINDOW_SECONDS = 30
+// Positions per track of the whole-match overview behind the heatmap.
+const OVERVIEW_POINTS = 600
+
+type ArtifactSection = 'meta' | 'events' | 'metrics' | 'predictions' | 'insights'
 
 interface UseVideoOptions {
   videoId: string
@@ -11,6 +19,7 @@ interface UseVideoOptions {
 
 interface UseVideoReturn {
   artifacts: VideoArtifacts
+  overviewTracks: Track[]
   isLoading: boolean
   error: string | null
   overlaySettings: OverlaySettings
@@ -62,34 +71,95 @@ export function useVideo({ videoId }: UseVideoOptions): UseVideoReturn {
     tracks: [],
   }), [videoId])
 
-  const [artifacts, setArtifacts] = useState<VideoArtifacts>(emptyArtifacts)
+  const [sections, setSections] = useState<Omit<VideoArtifacts, 'tracks'>>(emptyArtifacts)
+  const [trackWindows, setTrackWindows] = useState<Map<number, Track[]>>(new Map())
 
   useEffect(() => {
     let cancelled = false
     setIsLoading(true)
     setError(null)
+    setSections(emptyArtifacts)
+    setTrackWindows(new Map())
 
-    videoApi.getArtifacts(videoId)
-      .then((data) => {
-        if (!cancelled) {
-          setArtifacts(data)
-        }
+    // Each section is applied as it arrives; the page renders once meta is in.
+    const load = (section: ArtifactSection) =>
+      videoApi.getArtifactSection(videoId, section).then((value) => {
+        if (!cancelled) setSections((prev) => ({ ...prev, [section]: value }))
       })
+
+    load('meta')
       .catch((err) => {
         if (!cancelled) {
           setError(err instanceof Error ? err.message : 'Failed to load artifacts')
-          setArtifacts(emptyArtifacts)
+          setSections(emptyArtifacts)
         }
       })
       .finally(() => {
         if (!cancelled) setIsLoading(false)
       })
+    const others: ArtifactSection[] = ['events', 'metrics', 'predictions', 'insights']
+    others.forEach((section) => load(section).catch(() => undefined))
 
     return () => {
       cancelled = true
     }
   }, [videoId, emptyArtifacts])
 
+  // Fetch only the track windows around the playhead
+  const trackWindow = Math.floor(currentTime / TRACK_WINDOW_SECONDS)
+  useEffect(() => {
+    if (isLoading || error) return
+    let cancelled = false
+    const wanted = [trackWindow - 1, trackWindow, trackWindow + 1].filter((w) => w >= 0)
+    setTrackWindows((prev) => new Map(Array.from(prev).filter(([w]) => wanted.includes(w))))
+    wanted.forEach((w) => {
+      const t0 = w * TRACK_WINDOW_SECONDS
+      videoApi
+        .getTracks(videoId, t0, t0 + TRACK_WINDOW_SECONDS)
+        .then((tracks) => {
+          if (!cancelled) setTrackWindows((prev) => (prev.has(w) ? prev : new Map(prev).set(w, tracks)))
+        })
+        .catch(() => undefined)
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [videoId, trackWindow, isLoading, error])
+
+  // Downsampled tracks of the whole match, fetched once the heatmap is shown
+  const [overviewTracks, setOverviewTracks] = useState<Track[]>([])
+  const showHeatmap = overlaySettings.showHeatmap
+  useEffect(() => {
+    setOverviewTracks([])
+  }, [videoId])
+  useEffect(() => {
+    if (!showHeatmap || isLoading || error || overviewTracks.length > 0) return
+    let cancelled = false
+    videoApi
+      .getTracks(videoId, undefined, undefined, { maxPoints: OVERVIEW_POINTS })
+      .then((tracks) => {
+        if (!cancelled) setOverviewTracks(tracks)
+      })
+      .catch(() => undefined)
+    return () => {
+      cancelled = true
+    }
+  }, [videoId, showHeatmap, isLoading, error, overviewTracks.length])
+
+  const artifacts = useMemo<VideoArtifacts>(() => {
+    const merged = new Map<string, Track>()
+    Array.from(trackWindows.keys())
+      .sort((a, b) => a - b)
+      .forEach((w) => {
+        trackWindows.get(w)!.forEach((track) => {
+          const existing = merged.get(track.id)
+          if (existing) existing.positions.push(...track.positions)
+          else merged.set(track.id, { ...track, positions: [...track.positions] })
+        })
+      })
+    return { ...sections, tracks: Array.from(merged.values()) }
+  }, [sections, trackWindows])
+
   // Update overlay settings
   const setOverlaySettings = useCallback(
     (newSettings: Partial<OverlaySettings>) => {
@@ -105,6 +175,7 @@ export function useVideo({ videoId }: UseVideoOptions): UseVideoReturn {
 
   return {
     artifacts,
+    overviewTracks,
     isLoading,
     error,
     overlaySettings,
@@ -137,6 +208,74 @@ export const videoApi = {
     return res.json()
   },
 
+  // Chunked, resumable upload: each chunk is sent with its SHA-256 and retried from
+  // the server's offset after a failure. onCreated runs once the upload exists, so
+  // processing can be requested while the chunks are still being sent.
+  async uploadVideoChunked(
+    file: File,
+    options: { onCreated?: (videoId: string) => Promise<void> | void; onProgress?: (fraction: number) => void } = {}
+  ): Promise<{ videoId: string }> {
+    const sha256 = async (data: ArrayBuffer) =>
+      Array.from(new Uint8Array(await crypto.subtle.digest('SHA-256', data)))
+        .map((byte) => byte.toString(16).padStart(2, '0'))
+        .join('')
+
+    const res = await fetch(`${API_BASE}/api/uploads`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        filename: file.name,
+        size: file.size,
+        // The whole-file digest lets the backend analyze the upload while it arrives;
+        // WebCrypto hashes in memory, so very large files go without it.
+        sha256: file.size <= MAX_HASHED_UPLOAD_BYTES ? await sha256(await file.arrayBuffer()) : undefined,
+      }),
+    })
+    const created = await res.json()
+    if (!res.ok) {
+      throw new Error(created.error || 'Upload failed')
+    }
+    const { videoId, chunkSize } = created as { videoId: string; chunkSize: number }
+    await options.onCreated?.(videoId)
+
+    let offset = 0
+    let failures = 0
+    while (offset < file.size) {
+      const chunk = await file.slice(offset, offset + chunkSize).arrayBuffer()
+      try {
+        const chunkRes = await fetch(`${API_BASE}/api/uploads/${videoId}`, {
+          method: 'PATCH',
+          headers: {
+            'Content-Type': 'application/octet-stream',
+            'Upload-Offset': String(offset),
+            'Upload-Checksum': `sha256 ${await sha256(chunk)}`,
+          },
+          body: chunk,
+        })
+        const data = await chunkRes.json()
+        if (!chunkRes.ok && chunkRes.status !== 409) {
+          throw new Error(data.error || 'Chunk upload failed')
+        }
+        // 409: the server has a different offset (e.g. a retried chunk had arrived)
+        offset = data.offset
+        failures = 0
+      } catch (err) {
+        if (++failures > 5) throw err
+        await new Promise((resolve) => setTimeout(resolve, 1000 * failures))
+        const status = await fetch(`${API_BASE}/api/uploads/${videoId}`).then((r) => r.json()).catch(() => null)
+        if (status) offset = status.offset
+      }
+      options.onProgress?.(offset / file.size)
+    }
+
+    const done = await fetch(`${API_BASE}/api/uploads/${videoId}/complete`, { method: 'POST' })
+    if (!done.ok) {
+      const data = await done.json()
+      throw new Error(data.error || 'Upload failed')
+    }
+    return { videoId }
+  },
+
   async processVideo(videoId: string): Promise<{ jobId: string }> {
     const res = await fetch(`${API_BASE}/api/process/${videoId}`, {
       method: 'POST',
@@ -166,6 +305,44 @@ export const videoApi = {
     return res.json()
   },
 
+  // Server-sent events for a job: status changes plus fine-grained progress,
+  // per-stage timings and partial artifacts. Returns a function that closes the stream.
+  subscribeEvents(
+    videoId: string,
+    handlers: {
+      onStatus?: (status: { status: string; progress: number; currentStep: string; error?: string }) => void
+      onProgress?: (progress: {
+        phase: string
+        frames: number
+        totalFrames: number
+        progress: number
+        fps: number
+        etaSeconds: number
+      }) => void
+      onStages?: (stages: { pass: string; report: unknown; cache?: unknown }) => void
+      onArtifact?: (artifact: { name: string; value: unknown }) => void
+      onError?: () => void
+    }
+  ): () => void {
+    const source = new EventSource(`${API_BASE}/api/events/${videoId}`)
+    const listen = <T,>(type: string, handler?: (data: T) => void) => {
+      if (handler) {
+        source.addEventListener(type, (e) => handler(JSON.parse((e as MessageEvent).data)))
+      }
+    }
+    listen('status', handlers.onStatus)
+    listen('progress', handlers.onProgress)
+    listen('stages', handlers.onStages)
+    listen('artifact', handlers.onArtifact)
+    // The server closes the stream once the job finishes; EventSource would
+    // otherwise reconnect, so any error closes it and is left to the caller.
+    source.onerror = () => {
+      source.close()
+      handlers.onError?.()
+    }
+    return () => source.close()
+  },
+
   async getArtifacts(videoId: string): Promise<VideoArtifacts> {
     const res = await fetch(`${API_BASE}/api/artifacts/${videoId}`)
     if (!res.ok) {
@@ -175,7 +352,45 @@ export const videoApi = {
     return res.json()
   },
 
+  // One artifact section; the browser revalidates it with its ETag.
+  async getArtifactSection<K extends ArtifactSection>(videoId: string, section: K): Promise<VideoArtifacts[K]> {
+    const res = await fetch(`${API_BASE}/api/artifacts/${videoId}/${section}`)
+    if (!res.ok) {
+      const data = await res.json()
+      throw new Error(data.error || 'Artifacts not available')
+    }
+    return res.json()
+  },
+
+  // Track positions from t0 up to t1 seconds (the whole match when omitted),
+  // optionally only some track ids and at most maxPoints positions per track,
+  // which the backend answers from a coarser sampling level.
+  async getTracks(
+    videoId: string,
+    t0?: number,
+    t1?: number,
+    options: { ids?: string[]; maxPoints?: number } = {}
+  ): Promise<Track[]> {
+    const params = new URLSearchParams()
+    if (t0 !== undefined) params.set('t0', String(t0))
+    if (t1 !== undefined) params.set('t1', String(t1))
+    if (options.ids?.length) params.set('ids', options.ids.join(','))
+    if (options.maxPoints) params.set('maxPoints', String(options.maxPoints))
+    const res = await fetch(`${API_BASE}/api/artifacts/${videoId}/tracks?${params}`)
+    if (!res.ok) {
+      const data = await res.json()
+      throw new Error(data.error || 'Tracks not available')
+    }
+    const data: { tracks: Track[] } = await res.json()
+    return data.tracks
+  },
+
   getVideoUrl(videoId: string): string {
     return `${API_BASE}/api/video/${videoId}`
   },
+
+  // Master playlist of the adaptive HLS renditions, when the backend rendered them.
+  getHlsUrl(hlsPath?: string | null): string | undefined {
+    return hlsPath ? `${API_BASE}${hlsPath}` : undefined
+  },
 }
@@ -98,6 +98,7 @@ export interface VideoMeta {
   sport: Sport
   uploadedAt: string
   status: ProcessingStatus
+  hls?: string | null // HLS master playlist path, when adaptive renditions were rendered
 }
 
 export type ProcessingStatus =